@@ -1,10 +1,19 @@
+import os
 import random
 import re
+import argparse
+from collections import deque
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional, Tuple
 
+import numpy as np
 import pandas as pd
 
+# Shared compiled keyword rules (common package at the repo root)
+from common.textrules import KeywordRules
+
 try:
     from sklearn.feature_extraction.text import TfidfVectorizer
     from sklearn.metrics.pairwise import cosine_similarity
@@ -90,12 +99,57 @@ CLASS_KEYWORDS = {
     ],
 }
 
+REASON_ISSUES = [
+    "vacuum leak", "hydrogen embrittlement in bolts", "unexpected power loss", "incorrect electronic marker placement",
+    "packaging seal failure", "false reactive rate increase", "dose miscalculation", "label text mismatch",
+    "shelf-life data gap", "battery defect", "software freeze", "unhooking carabiner", "over infusion risk",
+]
+REASON_ACTIONS = [
+    "stop use", "remove from service", "update IFU", "install software update", "return affected stock",
+    "quarantine affected lots", "perform inspection", "replace component", "recalibrate system",
+]
+SUMMARY_VERBS = ["recall", "field correction", "safety alert", "advisory notice"]
+SUMMARY_SUBJECTS = [
+    "software anomaly", "labelling discrepancy", "packaging integrity issue", "dose calculation risk",
+    "false result rate", "power loss risk", "sterility concern",
+]
+N_REASON_TEMPLATES = 3  # see infer_reason
+
 _norm = lambda s: re.sub(r"\s+", " ", (s or "").strip()).lower()
 
+# Keyword rule families, in priority order (first matching rule wins unless scoring="most")
+ACTION_KEYWORD_RULES = KeywordRules([
+    ("Recall", ["remove", "return", "destroy", "stop use", "cease use", "quarantine", "withdraw", "recall", "retrieve", "dispose"]),
+    ("FSN", ["field safety notice", "field action", "advisory notice", "customer letter", "communication to", "distributor", "hospital"]),
+    ("Safety Alert", ["incorrect label", "label", "labelling", "labeling", "ifu", "dfu", "instructions", "malfunction", "software", "bug", "anomaly", "update", "correction", "product correction", "field correction", "warning", "alert", "dose", "monitor units"]),
+], normalize=_norm)
+
+TYPE_RULES = KeywordRules([
+    ("Recall", ["remove", "return", "destroy", "stop use", "quarantine", "withdraw", "recall", "retrieve", "dispose"]),
+    ("FSN", ["distributor", "hospital", "field safety notice", "advisory notice", "field action", "customer letter", "communication"]),
+    ("Safety Alert", ["alert", "warning", "label", "labelling", "labeling", "ifu", "dfu", "instructions", "malfunction", "software", "update", "correction", "product correction", "field correction"]),
+], normalize=_norm)
+
+# Most keyword hits wins; ties go to the earlier class (I > II > III)
+SEVERITY_CLASS_RULES = KeywordRules(list(CLASS_KEYWORDS.items()), scoring="most", normalize=_norm)
+
+# Used when no CLASS_KEYWORDS hit: heuristic by action intensity
+SEVERITY_CLASS_FALLBACK_RULES = KeywordRules([
+    ("Class I", ["recall", "remove", "stop use", "electric", "shock", "over infusion", "dose"]),
+    ("Class II", ["false", "inaccurate", "sterility", "malfunction", "label", "software"]),
+], default="Class III", normalize=_norm)
+
 
-def _contains_any(text: str, keywords) -> bool:
-    t = _norm(text)
-    return any(k in t for k in keywords)
+_ACTION_VECTORIZER = None
+
+
+def _action_vectorizer():
+    """TF-IDF fitted once on ACTION_PROTOTYPES (instead of per row on row + prototypes)."""
+    global _ACTION_VECTORIZER
+    if _ACTION_VECTORIZER is None:
+        vec = TfidfVectorizer(ngram_range=(1, 2), min_df=1).fit(list(ACTION_PROTOTYPES.values()))
+        _ACTION_VECTORIZER = (vec, vec.transform(list(ACTION_PROTOTYPES.values())))
+    return _ACTION_VECTORIZER
 
 
 def classify_action(reason: Optional[str], summary: Optional[str], action_existing: Optional[str]) -> str:
@@ -105,24 +159,14 @@ def classify_action(reason: Optional[str], summary: Optional[str], action_existi
     reason = reason or ""
     summary = summary or ""
     combined = f"{reason} {summary}"
-    
-    recall_kw = ["remove", "return", "destroy", "stop use", "cease use", "quarantine", "withdraw", "recall", "retrieve", "dispose"]
-    fsn_kw = ["field safety notice", "field action", "advisory notice", "customer letter", "communication to", "distributor", "hospital"]
-    corr_kw = ["incorrect label", "label", "labelling", "labeling", "ifu", "dfu", "instructions", "malfunction", "software", "bug", "anomaly", "update", "correction", "product correction", "field correction", "warning", "alert", "dose", "monitor units"]
-
-    combo = _norm(combined)
 
-    if _contains_any(combo, recall_kw):
-        return "Recall"
-    if _contains_any(combo, fsn_kw):
-        return "FSN"
-    if _contains_any(combo, corr_kw):
-        return "Safety Alert"
+    label = ACTION_KEYWORD_RULES.match(combined)
+    if label is not None:
+        return label
 
     if SKLEARN_AVAILABLE and combined.strip():
-        texts = [combined] + list(ACTION_PROTOTYPES.values())
-        vec = TfidfVectorizer(ngram_range=(1, 2), min_df=1).fit_transform(texts)
-        sims = cosine_similarity(vec[0:1], vec[1:]).flatten()
+        vec, protos = _action_vectorizer()
+        sims = cosine_similarity(vec.transform([combined]), protos).flatten()
         labels = list(ACTION_PROTOTYPES.keys())
         best = labels[int(sims.argmax())]
         return best
@@ -156,7 +200,8 @@ def generate_summary(action: Optional[str], reason: Optional[str]) -> str:
     return f"Safety alert: {short.strip()}"[:180]
 
 
-def infer_reason(action: Optional[str], summary: Optional[str]) -> str:
+def infer_reason(action: Optional[str], summary: Optional[str], template: Optional[int] = None) -> str:
+    # template: index into the paraphrase templates (random when None)
     if summary:
         # Try to paraphrase into a reason
         s = summary.strip().rstrip('.')
@@ -168,7 +213,7 @@ def infer_reason(action: Optional[str], summary: Optional[str]) -> str:
             f"Initiated after reports indicating {s}.",
             f"Mitigation implemented because {s}.",
         ]
-        return random.choice(templates)
+        return random.choice(templates) if template is None else templates[template]
     # ultimate fallback
     return {
         "Recall": "Potential risk to patient safety necessitating product removal.",
@@ -183,39 +228,18 @@ def determine_type(action: str, summary: Optional[str], reason: Optional[str]) -
     - Advisory notice/alert to users -> Safety Alert
     - Official notice to distributors/hospitals -> Field Safety Notice
     """
-    text = _norm(f"{summary or ''} {reason or ''}")
-
-    if _contains_any(text, ["remove", "return", "destroy", "stop use", "quarantine", "withdraw", "recall", "retrieve", "dispose"]):
-        return "Recall"
-    if _contains_any(text, ["distributor", "hospital", "field safety notice", "advisory notice", "field action", "customer letter", "communication"]):
-        return "FSN"
-    if _contains_any(text, ["alert", "warning", "label", "labelling", "labeling", "ifu", "dfu", "instructions", "malfunction", "software", "update", "correction", "product correction", "field correction"]):
-        return "Safety Alert"
+    label = TYPE_RULES.match(f"{summary or ''} {reason or ''}")
+    if label is not None:
+        return label
 
     # default to the inferred action if nothing else
     return action if action in {"Recall", "FSN", "Safety Alert"} else "Safety Alert"
 
 
 def classify_severity_class(reason: Optional[str], summary: Optional[str]) -> str:
-    text = _norm(f"{reason or ''} {summary or ''}")
+    text = f"{reason or ''} {summary or ''}"
     # Score buckets, pick the one with the most hits; tie-breaker by priority I > II > III
-    scores = {c: 0 for c in CLASS_KEYWORDS}
-    for cls, kws in CLASS_KEYWORDS.items():
-        for k in kws:
-            if k in text:
-                scores[cls] += 1
-
-    if all(v == 0 for v in scores.values()):
-        # heuristic fallback by action intensity
-        if any(w in text for w in ["recall", "remove", "stop use", "electric", "shock", "over infusion", "dose"]):
-            return "Class I"
-        if any(w in text for w in ["false", "inaccurate", "sterility", "malfunction", "label", "software"]):
-            return "Class II"
-        return "Class III"
-
-    # choose highest score; if tie, Class I > II > III
-    ordered = sorted(scores.items(), key=lambda kv: (-kv[1], {"Class I": 0, "Class II": 1, "Class III": 2}[kv[0]]))
-    return ordered[0][0]
+    return SEVERITY_CLASS_RULES.match(text) or SEVERITY_CLASS_FALLBACK_RULES.match(text)
 
 
 def random_date(start: datetime, end: datetime) -> datetime:
@@ -237,27 +261,13 @@ def choose_reason() -> str:
     if random.random() < 0.6:
         return random.choice(REASONS_POOL)
     # generate a simple parametric reason
-    issues = [
-        "vacuum leak", "hydrogen embrittlement in bolts", "unexpected power loss", "incorrect electronic marker placement",
-        "packaging seal failure", "false reactive rate increase", "dose miscalculation", "label text mismatch",
-        "shelf-life data gap", "battery defect", "software freeze", "unhooking carabiner", "over infusion risk",
-    ]
-    actions = [
-        "stop use", "remove from service", "update IFU", "install software update", "return affected stock",
-        "quarantine affected lots", "perform inspection", "replace component", "recalibrate system",
-    ]
-    return f"Issue detected: {random.choice(issues)}; users instructed to {random.choice(actions)}."
+    return f"Issue detected: {random.choice(REASON_ISSUES)}; users instructed to {random.choice(REASON_ACTIONS)}."
 
 
 def choose_summary() -> str:
     if random.random() < 0.6:
         return random.choice(SUMMARIES_POOL)
-    verbs = ["recall", "field correction", "safety alert", "advisory notice"]
-    subjects = [
-        "software anomaly", "labelling discrepancy", "packaging integrity issue", "dose calculation risk",
-        "false result rate", "power loss risk", "sterility concern",
-    ]
-    return f"{random.choice(verbs).title()} issued for {random.choice(subjects)}."
+    return f"{random.choice(SUMMARY_VERBS).title()} issued for {random.choice(SUMMARY_SUBJECTS)}."
 
 
 def generate_rows(n_rows: int = DEFAULT_N_ROWS,
@@ -326,15 +336,182 @@ def generate_rows(n_rows: int = DEFAULT_N_ROWS,
     return pd.DataFrame(rows)
 
 
+# ---------------------------------------------------------------------------
+# Vectorized engine: whole columns sampled with NumPy, the text rules run once
+# per distinct (reason, summary, action, template) combination, shards in a
+# process pool, output streamed to CSV / Parquet.
+# ---------------------------------------------------------------------------
+
+# Every text value the generator can draw; None (missing) is code -1
+REASON_VALUES = REASONS_POOL + [
+    f"Issue detected: {i}; users instructed to {a}." for i in REASON_ISSUES for a in REASON_ACTIONS
+]
+SUMMARY_VALUES = SUMMARIES_POOL + [f"{v.title()} issued for {s}." for v in SUMMARY_VERBS for s in SUMMARY_SUBJECTS]
+ACTION_VALUES = ["Recall", "FSN", "Safety Alert"]
+OUTPUT_COLUMNS = [
+    "id", "action", "action_classification", "action_summary", "reason", "device_id", "manufacturer_id", "type",
+    "date_initiated_by_firm", "date_posted", "date_terminated", "status", "date_updated",
+]
+
+_DAY_STRINGS = None
+
+
+def _day_strings() -> np.ndarray:
+    """dd-mm-YYYY for every day a generated date can fall on (offset from START_DATE)."""
+    global _DAY_STRINGS
+    if _DAY_STRINGS is None:
+        days = pd.date_range(START_DATE, periods=(END_DATE - START_DATE).days + 102, freq="D")
+        _DAY_STRINGS = np.asarray(days.strftime("%d-%m-%Y"), dtype=object)
+    return _DAY_STRINGS
+
+
+def _pick_text(rng, n: int, n_pool: int, n_total: int, missing_frac: float) -> np.ndarray:
+    # 60% from the fixed pool, otherwise a parametric combination; -1 where missing
+    codes = np.where(rng.random(n) < 0.6, rng.integers(0, n_pool, n), rng.integers(n_pool, n_total, n))
+    codes[rng.random(n) <= missing_frac] = -1
+    return codes
+
+
+def _finalize_event(reason: Optional[str], summary: Optional[str], action: Optional[str], template: int) -> tuple:
+    """The per-row rules of generate_rows for one combination: (action, class, summary, reason, type)."""
+    action_final = classify_action(reason, summary, action)
+    if not summary:
+        summary = generate_summary(action_final, reason)
+    if not reason:
+        reason = infer_reason(action_final, summary, template)
+    return action_final, classify_severity_class(reason, summary), summary, reason, determine_type(action_final, summary, reason)
+
+
+def generate_frame(n_rows: int, device_ids, seed: int = RNG_SEED, start_id: int = 1) -> pd.DataFrame:
+    """Vectorized generate_rows: same fields, fractions and rules, sampled column-wise."""
+    rng = np.random.default_rng(seed)
+    n = n_rows
+
+    # Text fields as codes into REASON_VALUES / SUMMARY_VALUES / ACTION_VALUES
+    action = np.where(rng.random(n) > MISSING_ACTION_FRAC, rng.integers(0, len(ACTION_VALUES), n), -1)
+    reason = _pick_text(rng, n, len(REASONS_POOL), len(REASON_VALUES), MISSING_REASON_FRAC)
+    summary = _pick_text(rng, n, len(SUMMARIES_POOL), len(SUMMARY_VALUES), MISSING_SUMMARY_FRAC)
+    template = np.where(reason < 0, rng.integers(0, N_REASON_TEMPLATES, n), 0)  # only used when reason is missing
+
+    # Rules once per distinct combination, then broadcast back with the inverse index
+    key = np.stack([reason, summary, action, template], axis=1)
+    combos, inverse = np.unique(key, axis=0, return_inverse=True)
+    val = lambda values, c: values[c] if c >= 0 else None
+    rules = [
+        _finalize_event(val(REASON_VALUES, r), val(SUMMARY_VALUES, s), val(ACTION_VALUES, a), t)
+        for r, s, a, t in combos.tolist()
+    ]
+    rules = np.array(rules, dtype=object).reshape(len(combos), 5)[inverse.reshape(-1)]
+
+    # Dates as day offsets from START_DATE, formatted through a lookup table
+    span = (END_DATE - START_DATE).days
+    initiated = rng.integers(0, span + 1, n)
+    posted = initiated + rng.integers(0, 31, n)
+    terminated = initiated + rng.integers(30, 101, n)
+    updated = posted + rng.integers(0, np.maximum(1, terminated - posted) + 1)
+    days = _day_strings()
+
+    device_ids = np.asarray(device_ids)
+    return pd.DataFrame({
+        "id": np.arange(start_id, start_id + n),
+        "action": rules[:, 0],
+        "action_classification": rules[:, 1],
+        "action_summary": rules[:, 2],
+        "reason": rules[:, 3],
+        "device_id": device_ids[rng.integers(0, len(device_ids), n)],
+        "manufacturer_id": rng.integers(MANUFACTURER_ID_MIN, MANUFACTURER_ID_MAX + 1, n),
+        "type": rules[:, 4],
+        "date_initiated_by_firm": days[initiated],
+        "date_posted": days[posted],
+        "date_terminated": days[terminated],
+        "status": np.where(rng.random(n) < 0.3, "Ongoing", "Terminated"),
+        "date_updated": days[updated],
+    }, columns=OUTPUT_COLUMNS)
+
+
+_WORKER_DEVICE_IDS = None
+
+
+def _init_worker(device_ids):
+    global _WORKER_DEVICE_IDS
+    _WORKER_DEVICE_IDS = np.asarray(device_ids)
+
+
+def _generate_shard(args) -> pd.DataFrame:
+    n_rows, seed, start_id = args
+    return generate_frame(n_rows, _WORKER_DEVICE_IDS, seed, start_id)
+
+
+class _ShardWriter:
+    """Appends shards to one CSV or Parquet file (Parquet needs pyarrow)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.parquet = path.lower().endswith((".parquet", ".pq"))
+        self._writer = None
+        self._first = True
+
+    def write(self, df: pd.DataFrame):
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            self._writer.write_table(table)
+        else:
+            df.to_csv(self.path, mode="w" if self._first else "a", header=self._first, index=False)
+        self._first = False
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def generate_to_file(n_rows: int, output: str, device_csv: str = DEVICE_CSV, shard_rows: int = 1_000_000,
+                     workers: Optional[int] = None, seed: int = RNG_SEED) -> int:
+    """Generate n_rows in shards across processes and stream them, in id order, to `output`.
+    At most 2 x workers shards are in memory at once, whatever n_rows is."""
+    device_ids = load_devices(device_csv)
+    workers = workers or os.cpu_count() or 1
+    starts = range(0, n_rows, shard_rows)
+    seeds = np.random.SeedSequence(seed).generate_state(len(starts))
+    tasks = iter([(min(shard_rows, n_rows - s), int(sd), s + 1) for s, sd in zip(starts, seeds)])
+
+    writer = _ShardWriter(output)
+    written = 0
+    try:
+        if workers == 1:
+            _init_worker(device_ids)
+            for task in tasks:
+                df = _generate_shard(task)
+                writer.write(df)
+                written += len(df)
+            return written
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(device_ids,)) as pool:
+            pending = deque(pool.submit(_generate_shard, t) for t in islice(tasks, 2 * workers))
+            while pending:
+                df = pending.popleft().result()
+                nxt = next(tasks, None)
+                if nxt is not None:
+                    pending.append(pool.submit(_generate_shard, nxt))
+                writer.write(df)
+                written += len(df)
+                print(f"  {written:,} / {n_rows:,} rows")
+    finally:
+        writer.close()
+    return written
+
+
 def main(n_rows: int = DEFAULT_N_ROWS,
          device_csv: str = DEVICE_CSV,
          manufacturer_csv: str = MANUFACTURER_CSV,
          output_csv: str = OUTPUT_CSV):
-    df = generate_rows(n_rows, device_csv, manufacturer_csv)
-    df.to_csv(output_csv, index=False)
+    written = generate_to_file(n_rows, output_csv, device_csv)
+    df = pd.read_parquet(output_csv).head(10) if output_csv.lower().endswith((".parquet", ".pq")) else pd.read_csv(output_csv, nrows=10)
 
     # Console output kept minimal and clear
-    print(f"✅ {output_csv} created with {len(df):,} rows")
+    print(f"✅ {output_csv} created with {written:,} rows")
     try:
         # Show a tidy preview
         with pd.option_context('display.max_colwidth', 80, 'display.width', 160):
@@ -344,5 +521,9 @@ def main(n_rows: int = DEFAULT_N_ROWS,
 
 
 if __name__ == "__main__":
-    # You can tweak DEFAULT_N_ROWS or pass args via a CLI/runner
-    main()
+    p = argparse.ArgumentParser()
+    p.add_argument("--rows", type=int, default=DEFAULT_N_ROWS)
+    p.add_argument("--out", default=OUTPUT_CSV, help=".csv or .parquet")
+    p.add_argument("--devices", default=DEVICE_CSV)
+    args = p.parse_args()
+    main(args.rows, args.devices, MANUFACTURER_CSV, args.out)
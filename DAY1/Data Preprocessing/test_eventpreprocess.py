@@ -0,0 +1,66 @@
+"""
+Tests for the vectorized event generator (generate_frame / generate_to_file) in Eventpreprocess
+Run: python -m pytest -q test_eventpreprocess.py
+"""
+
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import Eventpreprocess as ev
+
+DEVICE_IDS = np.arange(1, 10_001)
+CATEGORIES = ["action", "type", "action_classification", "status"]
+
+
+def test_generate_frame_deterministic_per_seed():
+    a = ev.generate_frame(5_000, DEVICE_IDS, seed=1)
+    pd.testing.assert_frame_equal(a, ev.generate_frame(5_000, DEVICE_IDS, seed=1))
+    assert not a.equals(ev.generate_frame(5_000, DEVICE_IDS, seed=2))
+    assert list(a.columns) == ev.OUTPUT_COLUMNS
+
+
+def test_generate_frame_no_nulls_and_valid_dates():
+    df = ev.generate_frame(20_000, DEVICE_IDS, seed=3, start_id=101)
+    assert not df.isna().any().any()
+    assert df["id"].tolist() == list(range(101, 20_101))
+    d = {c: pd.to_datetime(df[c], format="%d-%m-%Y") for c in ["date_initiated_by_firm", "date_posted",
+                                                                 "date_terminated", "date_updated"]}
+    assert d["date_initiated_by_firm"].between(ev.START_DATE, ev.END_DATE).all()
+    assert (d["date_posted"] - d["date_initiated_by_firm"]).dt.days.between(0, 30).all()
+    assert (d["date_terminated"] - d["date_initiated_by_firm"]).dt.days.between(30, 100).all()
+    assert (d["date_updated"] >= d["date_posted"]).all()
+    assert df["device_id"].isin(DEVICE_IDS).all()
+    assert df["manufacturer_id"].between(ev.MANUFACTURER_ID_MIN, ev.MANUFACTURER_ID_MAX).all()
+
+
+@pytest.mark.parametrize("out_name", ["events.csv", "events.parquet"])
+def test_generate_to_file_contiguous_ids_across_shards(tmp_path, out_name):
+    if out_name.endswith(".parquet"):
+        pytest.importorskip("pyarrow")
+    read = pd.read_parquet if out_name.endswith(".parquet") else pd.read_csv
+    outs = []
+    for workers in (1, 2):
+        path = str(tmp_path / f"w{workers}-{out_name}")
+        # missing device file: load_devices falls back to ids 1..10000
+        n = ev.generate_to_file(10_500, path, device_csv=str(tmp_path / "none.csv"), shard_rows=2_000,
+                                workers=workers, seed=7)
+        df = read(path)
+        assert n == len(df) == 10_500
+        assert df["id"].tolist() == list(range(1, 10_501))
+        outs.append(df)
+    pd.testing.assert_frame_equal(outs[0], outs[1])  # shard seeds do not depend on the worker count
+    assert not outs[0].iloc[:2_000, 1:].reset_index(drop=True).equals(outs[0].iloc[2_000:4_000, 1:].reset_index(drop=True))
+
+
+def test_category_distribution_matches_generate_rows(tmp_path):
+    random.seed(0)
+    rows = ev.generate_rows(3_000, device_csv=str(tmp_path / "none.csv"), manufacturer_csv=str(tmp_path / "none.csv"))
+    frame = ev.generate_frame(30_000, DEVICE_IDS, seed=0)
+    for col in CATEGORIES:
+        want = rows[col].value_counts(normalize=True)
+        got = frame[col].value_counts(normalize=True).reindex(want.index, fill_value=0)
+        assert set(frame[col].unique()) <= set(want.index) | {None}, col
+        assert (got - want).abs().max() < 0.04, (col, pd.concat([want, got], axis=1))
@@ -10,6 +10,7 @@ import os
 import json
 import requests
 from config import *
+from common.model_registry import ModelRegistry
 import pdfkit
 import boto3
 from werkzeug.utils import secure_filename
@@ -332,7 +333,8 @@ def health_check():
     return jsonify({
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
-        "snowflake_connected": _test_snowflake_connection()
+        "snowflake_connected": _test_snowflake_connection(),
+        "models": {"failure_rf": failure_registry.status()},
     })
 
 def _test_snowflake_connection():
@@ -447,15 +449,25 @@ def search_devices():
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 PIPELINE_FILE = os.path.join(BASE_DIR,"Rndom forest","device_failure_pipeline.joblib") 
 
-try:
-    artifact = joblib.load(PIPELINE_FILE)
-    model = artifact["model"]
-    feature_cols = artifact["feature_cols"]
-    encoders = artifact["encoders"]
-    print("✅ Pipeline loaded successfully.")
-except Exception as e:
-    print(f"❌ Error loading pipeline: {e}")
-    artifact = None
+# Compiled (flat-array) copy of the forest, built with: python tree_compile.py export <joblib> <npz>
+COMPILED_FILE = os.path.splitext(PIPELINE_FILE)[0] + ".npz"
+
+def _load_failure_bundle(paths):
+    artifact = joblib.load(paths["pipeline"])
+    scorer = artifact["model"]
+    if os.path.exists(paths["compiled"]):
+        try:
+            from tree_compile import CompiledForest
+            # None (warned) when the npz was not exported from this joblib
+            scorer = CompiledForest.load_for(paths["compiled"], paths["pipeline"]) or scorer
+        except Exception as e:
+            print(f"❌ Error loading compiled forest, using sklearn model: {e}")
+    return dict(artifact, scorer=scorer)
+
+# Loaded once, re-loaded in the background when the joblib/npz files change
+failure_registry = ModelRegistry(
+    "failure_rf", {"pipeline": PIPELINE_FILE, "compiled": COMPILED_FILE}, loader=_load_failure_bundle
+).start()
 
 # --------------------------
 # Load original dataset (needed for device_id lookup)
@@ -471,15 +483,18 @@ def predict_device_failure(device_id):
     if device_row.empty:
         return {"error": f"Device ID {device_id} not found"}
 
-    X_new = device_row[feature_cols].copy()
+    bundle = failure_registry.get().bundle  # one snapshot for the whole request
+    scorer = bundle["scorer"]
+    X_new = device_row[bundle["feature_cols"]].copy()
 
     # Apply encoders (must match training encoders)
-    for col, le in encoders.items():
+    for col, le in bundle["encoders"].items():
         if col in X_new:
             X_new[col] = le.transform(X_new[col].astype(str))
 
-    pred_class = model.predict(X_new)[0]
-    pred_prob = model.predict_proba(X_new)[0][1]
+    proba = scorer.predict_proba(X_new)[0]
+    pred_class = scorer.classes_[proba.argmax()]
+    pred_prob = proba[1]
 
     return {
         "device_id": int(device_id),
@@ -517,6 +532,32 @@ def bulk_predict():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# --------------------------
+# Severity class (TFLite) — alternative to the Random Forest endpoints
+# --------------------------
+from tflite_severity import severity_response
+try:
+    from tflite_severity import SeverityModel
+    severity_model = SeverityModel(
+        os.path.join(BASE_DIR, "device_severity_model.tflite"),
+        os.path.join(BASE_DIR, "feature_columns.joblib"),
+    )
+    print("✅ TFLite severity model loaded.")
+except Exception as e:
+    print(f"❌ Error loading TFLite severity model: {e}")
+    severity_model = None
+
+@app.route("/predict_severity/<int:device_id>", methods=["GET"])
+def predict_severity(device_id):
+    body, status = severity_response(severity_model, df, [device_id], single=True)
+    return jsonify(body), status
+
+@app.route("/bulk_predict_severity", methods=["POST"])
+def bulk_predict_severity():
+    data = request.get_json(silent=True) or {}
+    body, status = severity_response(severity_model, df, data.get("device_ids", []))
+    return jsonify(body), status
+
 @app.route("/api/dashboard/devices", methods=["GET"])
 def dashboard_devices():
     query = """
@@ -9,10 +9,17 @@ Train three models from your COMPANY / DEVICE / EVENTS tables to:
 Usage:
   predictor = DeviceRecallPredictor(horizon_days=180)
   predictor.fit(events_df, devices_df, companies_df=None)
-  result = predictor.predict_device(12710, events_df, devices_df)
+  result = predictor.predict_device(12710)          # lookup in the per-device state built by fit()
+  result = predictor.predict_device(12710, events_df, devices_df)  # from these tables, state untouched
+  predictor.update_state(new_events_df)            # fold in newly arrived events
+  fleet = predictor.score_all("fleet_scores.parquet")  # every device, one DataFrame
   predictor.save("recall_model.pkl")
   predictor = DeviceRecallPredictor.load("recall_model.pkl")
 
+Out-of-core (hashed features, incremental learners, date-ordered chunks):
+  chunks = pd.read_csv("events.csv", chunksize=200_000)
+  predictor = DeviceRecallPredictor().fit_streaming(chunks, devices_df)
+
 Author: ChatGPT
 """
 
@@ -26,16 +33,29 @@ from typing import Optional, Dict, Any, Tuple
 import numpy as np
 import pandas as pd
 
+from sklearn.base import BaseEstimator, TransformerMixin
 from sklearn.compose import ColumnTransformer
-from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.feature_extraction import FeatureHasher
+from sklearn.feature_extraction.text import TfidfVectorizer, HashingVectorizer
 from sklearn.impute import SimpleImputer
-from sklearn.linear_model import LogisticRegression
+from sklearn.linear_model import LogisticRegression, SGDClassifier
 from sklearn.metrics import roc_auc_score, f1_score
 from sklearn.model_selection import train_test_split
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import OneHotEncoder, StandardScaler
 import joblib
+import sklearn
+from sklearn.utils.fixes import parse_version
+from scipy import sparse
+
+# Shared unique-value date parser (common package at the repo root)
+from common.fastdates import parse_dates
+
 
+# OneHotEncoder's `sparse` was renamed `sparse_output` in scikit-learn 1.2 (and removed in 1.4)
+_ONEHOT_SPARSE = (
+    {"sparse_output": True} if parse_version(sklearn.__version__) >= parse_version("1.2") else {"sparse": True}
+)
 
 # ----------------------------
 # Helpers
@@ -43,38 +63,65 @@ import joblib
 
 def _std_cols(df: pd.DataFrame) -> pd.DataFrame:
     """Standardize column names (uppercase)."""
-    df = df.copy()
+    df = df.copy(deep=False)  # new column labels only, the data is shared
     df.columns = [str(c).strip().upper() for c in df.columns]
     return df
 
-def _parse_dates(df: pd.DataFrame, cols) -> pd.DataFrame:
-    """Convert specified columns to datetime."""
-    df = df.copy()
+def _parse_dates(df: pd.DataFrame, cols, formats: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+    """Convert specified columns to datetime, day first (explicit strftime format per column when given)."""
+    df = df.copy(deep=False)
+    formats = formats or {}
     for c in cols:
         if c in df.columns:
-            df[c] = pd.to_datetime(df[c], errors="coerce", dayfirst=True)
+            df[c] = parse_dates(df[c], formats.get(c), dayfirst=True)
+    return df
+
+def _add_text_all(df: pd.DataFrame) -> pd.DataFrame:
+    """Combined text field used by the TF-IDF branch."""
+    df["TEXT_ALL"] = (
+        df.get("ACTION_SUMMARY", "").astype(str) + " " +
+        df.get("REASON", "").astype(str) + " " +
+        df.get("DEVICE_DESCRIPTION", "").astype(str)
+    )
     return df
 
-def _coalesce_date_row(row: pd.Series) -> pd.Timestamp:
-    """Choose first valid date from updated, posted, initiated."""
-    for c in ("DATE_UPDATED", "DATE_POSTED", "DATE_INITIATED_BY_FIRM"):
-        if pd.notnull(row.get(c)):
-            return row[c]
-    return pd.NaT
+def _coalesce_dates(df: pd.DataFrame) -> pd.Series:
+    """First valid date of updated, posted, initiated (a row-wise bfill)."""
+    cols = [c for c in ("DATE_UPDATED", "DATE_POSTED", "DATE_INITIATED_BY_FIRM") if c in df.columns]
+    if not cols:
+        return pd.Series(pd.NaT, index=df.index, dtype="datetime64[ns]")
+    out = df[cols[0]]
+    for c in cols[1:]:
+        out = out.fillna(df[c])
+    return out
+
+def _on_uniques(s: pd.Series, fn) -> np.ndarray:
+    """fn(str Series) evaluated on the distinct values of s.astype(str) and broadcast back."""
+    codes, uniq = pd.factorize(s.astype(str))
+    return np.asarray(fn(pd.Series(uniq, dtype=object)))[codes]
+
+HIST_COLS = ["HIST_RECALL_COUNT", "HIST_SAFETY_ALERT_COUNT", "HIST_CLASS_I_COUNT", "HIST_CLASS_II_COUNT", "HIST_CLASS_III_COUNT"]
+
+def _own_counts(df: pd.DataFrame) -> np.ndarray:
+    """0/1 per row for each HIST_* column: does this event itself count?"""
+    typ = _on_uniques(df["TYPE"], lambda u: u.str.lower())
+    cls = _on_uniques(df["ACTION_CLASSIFICATION"], lambda u: u.str.upper())
+    return np.column_stack([typ == "recall", typ == "safety alert", cls == "I", cls == "II", cls == "III"]).astype(int)
 
 
 # ----------------------------
 # Feature Engineering
 # ----------------------------
 
-def make_event_frame(events: pd.DataFrame, devices: pd.DataFrame) -> pd.DataFrame:
-    """Merge EVENTS and DEVICES and engineer historical features."""
+def make_event_frame(events: pd.DataFrame, devices: pd.DataFrame, date_formats: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+    """Merge EVENTS and DEVICES and engineer historical features.
+    date_formats: optional {column: strftime format}; otherwise guessed per column as before."""
     e = _std_cols(events)
     d = _std_cols(devices)
 
     # Date handling
     date_cols = ["DATE_INITIATED_BY_FIRM", "DATE_POSTED", "DATE_TERMINATED", "DATE_UPDATED"]
-    e = _parse_dates(e, date_cols)
+    e = _parse_dates(e, date_cols, date_formats)
 
     if "DEVICE_ID" not in e.columns or "ID" not in d.columns:
         raise ValueError("EVENTS must include DEVICE_ID and DEVICE must include ID")
@@ -88,40 +135,29 @@ def make_event_frame(events: pd.DataFrame, devices: pd.DataFrame) -> pd.DataFram
     df = e.merge(d_small, on="DEVICE_ID", how="left")
 
     # Derived time features
-    df["EVENT_DATE"] = df.apply(_coalesce_date_row, axis=1)
+    df["EVENT_DATE"] = _coalesce_dates(df)
     df["DAYS_TO_POSTED"] = (df["DATE_POSTED"] - df["DATE_INITIATED_BY_FIRM"]).dt.days
     df["DAYS_TO_TERMINATED"] = (df["DATE_TERMINATED"] - df["DATE_POSTED"]).dt.days
     df["DAYS_SINCE_UPDATE"] = (df["DATE_UPDATED"].max() - df["DATE_UPDATED"]).dt.days
 
     # Implanted flag
-    df["IS_IMPLANTED"] = (
-        df.get("IMPLANTED").astype(str).str.upper().isin(["1", "YES", "TRUE", "Y"]).astype(int)
-    )
-
-    # Normalize class/type
-    df["TYPE"] = df.get("TYPE").astype(str).str.strip()
-    df["ACTION_CLASSIFICATION"] = (
-        df.get("ACTION_CLASSIFICATION")
-        .astype(str)
-        .str.replace("CLASS ", "", regex=False)
-        .str.strip()
-        .str.upper()
+    df["IS_IMPLANTED"] = _on_uniques(
+        df.get("IMPLANTED"), lambda u: u.str.upper().isin(["1", "YES", "TRUE", "Y"])
+    ).astype(int)
+
+    # Normalize class/type (string ops on the few distinct values, not per row)
+    df["TYPE"] = _on_uniques(df.get("TYPE"), lambda u: u.str.strip())
+    df["ACTION_CLASSIFICATION"] = _on_uniques(
+        df.get("ACTION_CLASSIFICATION"),
+        lambda u: u.str.replace("CLASS ", "", regex=False).str.strip().str.upper(),
     )
 
-    df = df.sort_values(["DEVICE_ID", "EVENT_DATE"]).reset_index(drop=True)
+    df = df.sort_values(["DEVICE_ID", "EVENT_DATE"], ignore_index=True)
 
-    # Historical counts
-    for t in ["Recall", "Safety Alert"]:
-        flag = (df["TYPE"].str.lower() == t.lower()).astype(int)
-        df[f"HIST_{t.replace(' ', '_').upper()}_COUNT"] = (
-            flag.groupby(df["DEVICE_ID"]).cumsum().shift(1).fillna(0)
-        )
-
-    for rc in ["I", "II", "III"]:
-        flag = (df["ACTION_CLASSIFICATION"].str.upper() == rc).astype(int)
-        df[f"HIST_CLASS_{rc}_COUNT"] = (
-            flag.groupby(df["DEVICE_ID"]).cumsum().shift(1).fillna(0)
-        )
+    # Historical counts: one grouped cumsum over the type/class one-hot matrix,
+    # minus the event itself so only earlier events of the device count
+    flags = pd.DataFrame(_own_counts(df), columns=HIST_COLS)
+    df[HIST_COLS] = (flags.groupby(df["DEVICE_ID"]).cumsum() - flags).astype(float)
 
     # Time since last event
     last_event_date = df.groupby("DEVICE_ID")["EVENT_DATE"].shift(1)
@@ -144,15 +180,19 @@ def add_future_labels(df: pd.DataFrame, horizon_days: int = 180) -> pd.DataFrame
     recalls = recalls.rename(columns={"EVENT_DATE": "NEXT_RECALL_DATE", "ACTION_CLASSIFICATION": "NEXT_RECALL_CLASS"})
     recalls = recalls.sort_values(["DEVICE_ID", "NEXT_RECALL_DATE"])
 
+    # merge_asof needs both sides sorted on the time key itself (not per device) and no NaT keys
+    has_date = df["EVENT_DATE"].notna()
     labeled = pd.merge_asof(
-        df.sort_values(["DEVICE_ID", "EVENT_DATE"]),
-        recalls,
+        df[has_date].sort_values("EVENT_DATE", kind="mergesort"),
+        recalls.dropna(subset=["NEXT_RECALL_DATE"]).sort_values("NEXT_RECALL_DATE", kind="mergesort"),
         by="DEVICE_ID",
         left_on="EVENT_DATE",
         right_on="NEXT_RECALL_DATE",
         direction="forward",
         tolerance=pd.Timedelta(days=horizon_days),
     )
+    labeled = pd.concat([labeled, df[~has_date]], ignore_index=True)
+    labeled = labeled.sort_values(["DEVICE_ID", "EVENT_DATE"]).reset_index(drop=True)
 
     # Label: recall within horizon
     labeled["Y_NEXT_RECALL"] = labeled["NEXT_RECALL_DATE"].notna().astype(int)
@@ -169,9 +209,60 @@ def add_future_labels(df: pd.DataFrame, horizon_days: int = 180) -> pd.DataFrame
 
 
 # ----------------------------
-# Main Model
+# Feature columns
 # ----------------------------
 
+NUMERIC_COLS = [
+    "DAYS_TO_POSTED","DAYS_TO_TERMINATED","DAYS_SINCE_UPDATE",
+    "DAYS_SINCE_LAST_EVENT","QUANTITY_IN_COMMERCE","RISK_CLASS",
+    "HIST_RECALL_COUNT","HIST_SAFETY_ALERT_COUNT",
+    "HIST_CLASS_I_COUNT","HIST_CLASS_II_COUNT","HIST_CLASS_III_COUNT"
+]
+CAT_COLS = ["TYPE","ACTION","ACTION_CLASSIFICATION","STATUS","CLASSIFICATION","COUNTRY","IS_IMPLANTED"]
+
+class HashedFeatures(BaseEstimator, TransformerMixin):
+    """Stateless stand-in for the ColumnTransformer used by fit_streaming: signed log1p numerics
+    (NaN -> 0), hashed "column=value" categoricals and hashed uni/bigram text. Nothing is learned
+    from the data, so every chunk is transformed on its own."""
+
+    def __init__(self, numeric_cols=NUMERIC_COLS, cat_cols=CAT_COLS, text_col="TEXT_ALL", n_features=2**18):
+        self.numeric_cols = numeric_cols
+        self.cat_cols = cat_cols
+        self.text_col = text_col
+        self.n_features = n_features
+
+    def fit(self, X, y=None):
+        return self
+
+    def transform(self, X: pd.DataFrame):
+        num = X.reindex(columns=self.numeric_cols).apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+        num = np.nan_to_num(np.sign(num) * np.log1p(np.abs(num)))
+        cats = X.reindex(columns=self.cat_cols).astype(str)
+        tokens = zip(*[(c + "=" + cats[c]).tolist() for c in self.cat_cols])
+        cat = FeatureHasher(self.n_features, input_type="string", alternate_sign=False).transform(tokens)
+        txt = HashingVectorizer(n_features=self.n_features, ngram_range=(1,2), alternate_sign=False).transform(
+            X[self.text_col].astype(str)
+        )
+        return sparse.hstack([sparse.csr_matrix(num), cat, txt], format="csr")
+
+
+# ----------------------------
+# Per-device latest state
+# ----------------------------
+
+DEVICE_COLS = ["ID", "RISK_CLASS", "CLASSIFICATION", "IMPLANTED", "COUNTRY", "QUANTITY_IN_COMMERCE", "DESCRIPTION"]
+
+def build_device_state(base: pd.DataFrame) -> pd.DataFrame:
+    """Last row per device of a make_event_frame() output, indexed by DEVICE_ID.
+    TOTAL_* columns hold the counts including that last event (the offsets for later events)."""
+    last = base.groupby("DEVICE_ID", sort=False).tail(1).set_index("DEVICE_ID", drop=False)
+    last.index.name = None
+    totals = last[HIST_COLS].to_numpy() + _own_counts(last)
+    for i, c in enumerate(HIST_COLS):
+        last[f"TOTAL_{c}"] = totals[:, i]
+    return last
+
+
 @dataclass
 class DeviceRecallPredictor:
     horizon_days: int = 180
@@ -182,24 +273,18 @@ class DeviceRecallPredictor:
     class_pipe: Optional[Pipeline] = None
     status_pipe: Optional[Pipeline] = None
     _feature_cols_: Optional[Dict[str, Any]] = None
+    # Latest event row per device + device attributes (see build_state / update_state)
+    _state_: Optional[pd.DataFrame] = None
+    _state_max_updated_: Any = None
+    _devices_: Optional[pd.DataFrame] = None
 
     def _build_column_transformer(self, df: pd.DataFrame) -> Tuple[ColumnTransformer, Dict[str, Any]]:
         """Build preprocessing transformer."""
-        numeric_cols = [c for c in [
-            "DAYS_TO_POSTED","DAYS_TO_TERMINATED","DAYS_SINCE_UPDATE",
-            "DAYS_SINCE_LAST_EVENT","QUANTITY_IN_COMMERCE","RISK_CLASS",
-            "HIST_RECALL_COUNT","HIST_SAFETY_ALERT_COUNT",
-            "HIST_CLASS_I_COUNT","HIST_CLASS_II_COUNT","HIST_CLASS_III_COUNT"
-        ] if c in df.columns]
-
-        cat_cols = [c for c in ["TYPE","ACTION","ACTION_CLASSIFICATION","STATUS","CLASSIFICATION","COUNTRY","IS_IMPLANTED"] if c in df.columns]
+        numeric_cols = [c for c in NUMERIC_COLS if c in df.columns]
+        cat_cols = [c for c in CAT_COLS if c in df.columns]
 
         # Combined text field
-        df["TEXT_ALL"] = (
-            df.get("ACTION_SUMMARY", "").astype(str) + " " +
-            df.get("REASON", "").astype(str) + " " +
-            df.get("DEVICE_DESCRIPTION", "").astype(str)
-        )
+        _add_text_all(df)
         text_col = "TEXT_ALL"
 
         numeric_transformer = Pipeline([
@@ -208,7 +293,7 @@ class DeviceRecallPredictor:
         ])
         cat_transformer = Pipeline([
             ("imputer", SimpleImputer(strategy="most_frequent")),
-            ("onehot", OneHotEncoder(handle_unknown="ignore", sparse=True))
+            ("onehot", OneHotEncoder(handle_unknown="ignore", **_ONEHOT_SPARSE))
         ])
         text_transformer = Pipeline([
             ("tfidf", TfidfVectorizer(max_features=self.text_max_features, ngram_range=(1,2)))
@@ -223,59 +308,226 @@ class DeviceRecallPredictor:
         return pre, {"numeric": numeric_cols, "categorical": cat_cols, "text": text_col}
 
     def fit(self, events: pd.DataFrame, devices: pd.DataFrame, companies: Optional[pd.DataFrame] = None) -> "DeviceRecallPredictor":
-        """Train all models."""
+        """Train all models. The feature transform is fitted once (on the next-recall training rows),
+        applied once to every row, and the three heads train on row subsets of that matrix."""
         base = make_event_frame(events, devices)
         data = add_future_labels(base, horizon_days=self.horizon_days)
         pre, cols = self._build_column_transformer(data)
         self._feature_cols_ = cols
+        rows = np.arange(len(data))
+
+        y1 = data["Y_NEXT_RECALL"].astype(int).to_numpy()
+        tr1, te1 = train_test_split(rows, test_size=0.2, random_state=self.random_state, stratify=y1)
+        pre.fit(data.iloc[tr1])
+        X = sparse.csr_matrix(pre.transform(data))
+
+        def head(clf):
+            # Shares the fitted `pre`, so the saved artifact holds a single transform
+            return Pipeline([("pre", pre), ("clf", clf)])
 
         # 1. Next Recall
-        y1 = data["Y_NEXT_RECALL"].astype(int)
-        X1_train, X1_test, y1_train, y1_test = train_test_split(data, y1, test_size=0.2, random_state=self.random_state, stratify=y1)
-        self.next_recall_pipe = Pipeline([("pre", pre), ("clf", LogisticRegression(max_iter=200, class_weight="balanced"))])
-        self.next_recall_pipe.fit(X1_train, y1_train)
-        print("[Next Recall] AUC:", roc_auc_score(y1_test, self.next_recall_pipe.predict_proba(X1_test)[:,1]))
+        self.next_recall_pipe = head(LogisticRegression(max_iter=200, class_weight="balanced").fit(X[tr1], y1[tr1]))
+        print("[Next Recall] AUC:", roc_auc_score(y1[te1], self.next_recall_pipe[-1].predict_proba(X[te1])[:,1]))
 
         # 2. Recall Class
-        mask_class = data["NEXT_RECALL_CLASS"].notna()
+        mask_class = data["NEXT_RECALL_CLASS"].notna().to_numpy()
         if mask_class.sum() >= 10:
-            X2, y2 = data.loc[mask_class], data.loc[mask_class, "NEXT_RECALL_CLASS"].astype(str)
-            X2_train, X2_test, y2_train, y2_test = train_test_split(X2, y2, test_size=0.2, random_state=self.random_state, stratify=y2)
-            self.class_pipe = Pipeline([("pre", pre), ("clf", LogisticRegression(max_iter=300, multi_class="auto", class_weight="balanced"))])
-            self.class_pipe.fit(X2_train, y2_train)
-            print("[Recall Class] F1:", f1_score(y2_test, self.class_pipe.predict(X2_test), average="weighted"))
+            y2 = data["NEXT_RECALL_CLASS"].astype(str).to_numpy()
+            tr2, te2 = train_test_split(rows[mask_class], test_size=0.2, random_state=self.random_state, stratify=y2[mask_class])
+            self.class_pipe = head(LogisticRegression(max_iter=300, class_weight="balanced").fit(X[tr2], y2[tr2]))
+            print("[Recall Class] F1:", f1_score(y2[te2], self.class_pipe[-1].predict(X[te2]), average="weighted"))
         else:
             print("[Recall Class] Skipped (not enough samples)")
 
         # 3. Status
-        mask_status = data["Y_STATUS_TERMINATED"].notna()
+        mask_status = data["Y_STATUS_TERMINATED"].notna().to_numpy()
         if mask_status.sum() >= 10:
-            X3, y3 = data.loc[mask_status], data.loc[mask_status, "Y_STATUS_TERMINATED"].astype(int)
-            X3_train, X3_test, y3_train, y3_test = train_test_split(X3, y3, test_size=0.2, random_state=self.random_state, stratify=y3)
-            self.status_pipe = Pipeline([("pre", pre), ("clf", LogisticRegression(max_iter=200, class_weight="balanced"))])
-            self.status_pipe.fit(X3_train, y3_train)
-            print("[Status] AUC:", roc_auc_score(y3_test, self.status_pipe.predict_proba(X3_test)[:,1]))
+            y3 = data["Y_STATUS_TERMINATED"].fillna(0).astype(int).to_numpy()
+            tr3, te3 = train_test_split(rows[mask_status], test_size=0.2, random_state=self.random_state, stratify=y3[mask_status])
+            self.status_pipe = head(LogisticRegression(max_iter=200, class_weight="balanced").fit(X[tr3], y3[tr3]))
+            print("[Status] AUC:", roc_auc_score(y3[te3], self.status_pipe[-1].predict_proba(X[te3])[:,1]))
         else:
             print("[Status] Skipped (not enough samples)")
 
+        self._set_state(base, devices)
         return self
 
-    def _last_event_row(self, device_id: Any, events: pd.DataFrame, devices: pd.DataFrame) -> pd.DataFrame:
-        """Return the most recent event row for a device."""
-        base = make_event_frame(events, devices)
-        one = base[base["DEVICE_ID"] == device_id].sort_values("EVENT_DATE").tail(1)
-        if one.empty:
-            raise ValueError(f"No events found for device_id={device_id}")
-        return one
+    def _set_state(self, base: pd.DataFrame, devices: pd.DataFrame) -> None:
+        d = _std_cols(devices)
+        self._devices_ = d[[c for c in DEVICE_COLS if c in d.columns]].drop_duplicates("ID", keep="last")
+        self._state_ = build_device_state(base)
+        self._state_max_updated_ = base["DATE_UPDATED"].max()
+
+    def build_state(self, events: pd.DataFrame, devices: pd.DataFrame) -> "DeviceRecallPredictor":
+        """(Re)build the per-device latest-state table from full EVENTS / DEVICE tables."""
+        self._set_state(make_event_frame(events, devices), devices)
+        return self
+
+    def update_state(self, new_events: pd.DataFrame, devices: Optional[pd.DataFrame] = None) -> "DeviceRecallPredictor":
+        """Fold newly arrived events into the state table without touching the history.
+        Events are assumed to arrive in date order per device."""
+        self._advance_state(new_events, devices)
+        return self
 
-    def predict_device(self, device_id: Any, events: pd.DataFrame, devices: pd.DataFrame) -> Dict[str, Any]:
-        """Predict recall risks for a given device."""
+    def _advance_state(self, new_events: pd.DataFrame, devices: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+        """update_state(), returning the engineered rows of new_events (history-aware HIST_* / gaps)."""
+        if devices is not None:
+            d = _std_cols(devices)
+            d = d[[c for c in DEVICE_COLS if c in d.columns]].drop_duplicates("ID", keep="last")
+            old = self._devices_ if self._devices_ is not None else d.iloc[:0]
+            self._devices_ = pd.concat([old[~old["ID"].isin(d["ID"])], d], ignore_index=True)
+        if self._devices_ is None:
+            raise ValueError("No device table: pass devices or call build_state first")
+
+        new = make_event_frame(new_events, self._devices_)
+        if self._state_ is not None and len(new):
+            # Continue each device's counts / last-event gap from its stored state
+            prev = self._state_.reindex(new["DEVICE_ID"].to_numpy())
+            totals = prev[[f"TOTAL_{c}" for c in HIST_COLS]].fillna(0).to_numpy()
+            new[HIST_COLS] = new[HIST_COLS].to_numpy() + totals
+            first = ~new["DEVICE_ID"].duplicated().to_numpy()
+            gap = (new["EVENT_DATE"] - prev["EVENT_DATE"].to_numpy()).dt.days
+            new.loc[first, "DAYS_SINCE_LAST_EVENT"] = gap[first]
+
+        state = build_device_state(new)
+        if self._state_ is not None:
+            state = pd.concat([self._state_.drop(index=state.index, errors="ignore"), state])
+        self._state_ = state
+        self._state_max_updated_ = pd.Series([self._state_max_updated_, new["DATE_UPDATED"].max()]).max()
+        return new
+
+    def fit_streaming(self, event_chunks, devices: pd.DataFrame, n_features: int = 2**18) -> "DeviceRecallPredictor":
+        """Out-of-core training from an iterable of EVENTS chunks (e.g. pd.read_csv(..., chunksize=...)).
+
+        Chunks must come in date order. Features use HashedFeatures (no vocabularies) and each head is an
+        SGDClassifier(log_loss) trained with partial_fit. Memory holds the per-device state plus the events
+        whose label horizon is still open, not the event table. DAYS_SINCE_UPDATE is relative to the newest
+        update seen so far rather than the table-wide maximum."""
+        pre = HashedFeatures(n_features=n_features)
+        self._feature_cols_ = {"numeric": pre.numeric_cols, "categorical": pre.cat_cols, "text": pre.text_col}
+        heads = {
+            "next_recall": (SGDClassifier(loss="log_loss", random_state=self.random_state), np.array([0, 1])),
+            "class": (SGDClassifier(loss="log_loss", random_state=self.random_state), np.array(["I", "II", "III"], dtype=object)),
+            "status": (SGDClassifier(loss="log_loss", random_state=self.random_state), np.array([0, 1])),
+        }
+        trained = set()
+        self._state_ = self._devices_ = self._state_max_updated_ = None
+        horizon = pd.Timedelta(days=self.horizon_days)
+        pending, watermark, n_rows = None, pd.NaT, 0
+
+        def train(rows: pd.DataFrame) -> None:
+            if not len(rows):
+                return
+            X = pre.transform(_add_text_all(rows))
+            targets = {
+                "next_recall": rows["Y_NEXT_RECALL"],
+                "class": rows["NEXT_RECALL_CLASS"],
+                "status": rows["Y_STATUS_TERMINATED"],
+            }
+            for name, (clf, classes) in heads.items():
+                y = targets[name]
+                mask = y.notna().to_numpy()
+                if mask.any():
+                    y = y[mask].astype(str if name == "class" else int).to_numpy()
+                    clf.partial_fit(X[mask], y, classes=classes)
+                    trained.add(name)
+
+        for i, chunk in enumerate(event_chunks):
+            new = self._advance_state(chunk, devices if i == 0 else None)
+            watermark = pd.Series([watermark, new["EVENT_DATE"].max()]).max()
+            new["DAYS_SINCE_UPDATE"] = (self._state_max_updated_ - new["DATE_UPDATED"]).dt.days
+            window = new if pending is None else pd.concat([pending, new], ignore_index=True)
+            labeled = add_future_labels(window, horizon_days=self.horizon_days)
+            # Final once a recall was found, or once no later event can fall inside the horizon
+            done = (
+                labeled["Y_NEXT_RECALL"].eq(1)
+                | labeled["EVENT_DATE"].isna()
+                | (labeled["EVENT_DATE"] + horizon < watermark)
+            ).to_numpy()
+            train(labeled.loc[done].copy())  # train() adds TEXT_ALL; not into a slice of `labeled`
+            pending = labeled.loc[~done, window.columns]
+            n_rows += int(done.sum())
+        if pending is not None:
+            train(add_future_labels(pending, horizon_days=self.horizon_days))  # end of data closes every window
+            n_rows += len(pending)
+        if "next_recall" not in trained:
+            raise ValueError("No events to train on")
+
+        pipes = {name: Pipeline([("pre", pre), ("clf", clf)]) if name in trained else None for name, (clf, _) in heads.items()}
+        self.next_recall_pipe, self.class_pipe, self.status_pipe = pipes["next_recall"], pipes["class"], pipes["status"]
+        print(f"[Streaming] trained on {n_rows} events: {sorted(trained)}")
+        return self
+
+    def evaluate(self, events: pd.DataFrame, devices: pd.DataFrame) -> Dict[str, float]:
+        """Metrics of the trained heads on a (held-out) events table: next-recall AUC, class weighted F1, status AUC."""
+        data = _add_text_all(add_future_labels(make_event_frame(events, devices), horizon_days=self.horizon_days))
+        heads = self._head_inputs(data)
+        out = {}
+        if "next_recall" in heads:
+            clf, X = heads["next_recall"]
+            out["next_recall_auc"] = roc_auc_score(data["Y_NEXT_RECALL"], clf.predict_proba(X)[:, 1])
+        if "class" in heads:
+            clf, X = heads["class"]
+            mask = data["NEXT_RECALL_CLASS"].notna().to_numpy()
+            out["recall_class_f1"] = f1_score(data.loc[mask, "NEXT_RECALL_CLASS"].astype(str), clf.predict(X[mask]), average="weighted")
+        if "status" in heads:
+            clf, X = heads["status"]
+            mask = data["Y_STATUS_TERMINATED"].notna().to_numpy()
+            out["status_auc"] = roc_auc_score(data.loc[mask, "Y_STATUS_TERMINATED"].astype(int), clf.predict_proba(X[mask])[:, 1])
+        return out
+
+    def _state_source(self, events: Optional[pd.DataFrame] = None, devices: Optional[pd.DataFrame] = None) -> Tuple[pd.DataFrame, Any]:
+        """(state table, newest DATE_UPDATED) to predict from. Tables passed by the caller win:
+        a state is built from them for this call only (the stored state is left as it is)."""
+        if events is not None or devices is not None:
+            if events is None or devices is None:
+                raise ValueError("Pass both events and devices, or neither to use the stored state")
+            base = make_event_frame(events, devices)
+            return build_device_state(base), base["DATE_UPDATED"].max()
+        if self._state_ is None:
+            raise ValueError("No device state: call build_state(events, devices) first")
+        return self._state_, self._state_max_updated_
+
+    def _state_rows(self, device_ids=None, source: Optional[Tuple[pd.DataFrame, Any]] = None) -> pd.DataFrame:
+        """Latest event rows for device_ids (all devices when None) from a state table, ready to transform."""
+        state, max_updated = source if source is not None else self._state_source()
+        rows = state if device_ids is None else state.loc[list(device_ids)]
+        rows = rows.reset_index(drop=True)
+        # Relative to the newest update seen across all devices, as in make_event_frame
+        rows["DAYS_SINCE_UPDATE"] = (max_updated - rows["DATE_UPDATED"]).dt.days
+        return _add_text_all(rows)
+
+    def _last_event_row(self, device_id: Any, events: Optional[pd.DataFrame] = None, devices: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+        """Return the most recent event row for a device (a lookup in the state table)."""
+        source = self._state_source(events, devices)
+        if device_id not in source[0].index:
+            raise ValueError(f"No events found for device_id={device_id}")
+        return self._state_rows([device_id], source)
+
+    def _head_inputs(self, rows: pd.DataFrame) -> Dict[str, Tuple[Any, Any]]:
+        """(classifier, transformed rows) per trained head. Heads sharing one fitted transform
+        (everything fit() produces) reuse one matrix; older artifacts with a transform per head still work."""
+        out, cache = {}, {}
+        for name, pipe in (("next_recall", self.next_recall_pipe), ("class", self.class_pipe), ("status", self.status_pipe)):
+            if pipe is None:
+                continue
+            pre = pipe[0]
+            if id(pre) not in cache:
+                cache[id(pre)] = pre.transform(rows)
+            out[name] = (pipe[-1], cache[id(pre)])
+        return out
+
+    def predict_device(self, device_id: Any, events: Optional[pd.DataFrame] = None, devices: Optional[pd.DataFrame] = None) -> Dict[str, Any]:
+        """Predict recall risks for a given device: from events/devices when given (as before the state
+        table existed), otherwise from the stored state."""
         row = self._last_event_row(device_id, events, devices)
+        heads = self._head_inputs(row)
         res: Dict[str, Any] = {"device_id": device_id}
 
         # 1. Next recall
         if self.next_recall_pipe:
-            proba = float(self.next_recall_pipe.predict_proba(row)[0, 1])
+            clf, X = heads["next_recall"]
+            proba = float(clf.predict_proba(X)[0, 1])
             res.update({
                 "p_next_recall_within_horizon": proba,
                 "next_recall_pred": int(proba >= 0.5),
@@ -285,8 +537,9 @@ class DeviceRecallPredictor:
         # 2. Recall class
         if self.class_pipe:
             try:
-                class_proba = self.class_pipe.predict_proba(row)[0]
-                classes = list(self.class_pipe.classes_)
+                clf, X = heads["class"]
+                class_proba = clf.predict_proba(X)[0]
+                classes = list(clf.classes_)
                 res["recall_class_probs"] = dict(zip(classes, map(float, class_proba)))
                 res["recall_class_pred"] = classes[int(np.argmax(class_proba))]
             except Exception:
@@ -294,7 +547,8 @@ class DeviceRecallPredictor:
 
         # 3. Recall status
         if self.status_pipe and row["TYPE"].astype(str).str.lower().iloc[0] == "recall":
-            st_proba = float(self.status_pipe.predict_proba(row)[0, 1])
+            clf, X = heads["status"]
+            st_proba = float(clf.predict_proba(X)[0, 1])
             res.update({
                 "p_terminated_if_recall": st_proba,
                 "status_pred": "Terminated" if st_proba >= 0.5 else "Ongoing"
@@ -302,6 +556,50 @@ class DeviceRecallPredictor:
 
         return res
 
+    def predict_many(self, device_ids=None, events: Optional[pd.DataFrame] = None, devices: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+        """Score many devices in one pass: one transform and one predict_proba per head.
+        device_ids=None scores every device in the state table; unknown ids are dropped.
+        Same numbers as predict_device, one row per device (class probabilities as p_class_<c> columns).
+        events/devices: score from these tables instead of the stored state, as in predict_device."""
+        source = self._state_source(events, devices)
+        if device_ids is not None:
+            device_ids = [d for d in device_ids if d in source[0].index]
+        rows = self._state_rows(device_ids, source)
+        heads = self._head_inputs(rows)
+        out = pd.DataFrame({"device_id": rows["DEVICE_ID"].to_numpy()})
+
+        if "next_recall" in heads:
+            clf, X = heads["next_recall"]
+            proba = clf.predict_proba(X)[:, 1]
+            out["p_next_recall_within_horizon"] = proba
+            out["next_recall_pred"] = (proba >= 0.5).astype(int)
+            out["horizon_days"] = self.horizon_days
+
+        if "class" in heads:
+            clf, X = heads["class"]
+            class_proba = clf.predict_proba(X)
+            classes = np.asarray(clf.classes_, dtype=object)
+            for j, c in enumerate(classes):
+                out[f"p_class_{c}"] = class_proba[:, j]
+            out["recall_class_pred"] = classes[class_proba.argmax(axis=1)]
+
+        if "status" in heads:
+            # Only meaningful when the latest event is itself a recall
+            clf, X = heads["status"]
+            is_recall = (rows["TYPE"].astype(str).str.lower() == "recall").to_numpy()
+            st_proba = np.where(is_recall, clf.predict_proba(X)[:, 1], np.nan)
+            out["p_terminated_if_recall"] = st_proba
+            out["status_pred"] = np.where(is_recall, np.where(st_proba >= 0.5, "Terminated", "Ongoing"), None)
+
+        return out
+
+    def score_all(self, path: Optional[str] = None) -> pd.DataFrame:
+        """predict_many over the whole fleet; also written to `path` as Parquet when given."""
+        out = self.predict_many()
+        if path:
+            out.to_parquet(path, index=False)
+        return out
+
     def save(self, path: str) -> None:
         """Save trained model to disk."""
         joblib.dump({
@@ -312,6 +610,9 @@ class DeviceRecallPredictor:
             "class_pipe": self.class_pipe,
             "status_pipe": self.status_pipe,
             "feature_cols": self._feature_cols_,
+            "state": self._state_,
+            "state_max_updated": self._state_max_updated_,
+            "devices": self._devices_,
         }, path)
 
     @staticmethod
@@ -327,4 +628,7 @@ class DeviceRecallPredictor:
         obj.class_pipe = blob.get("class_pipe")
         obj.status_pipe = blob.get("status_pipe")
         obj._feature_cols_ = blob.get("feature_cols")
+        obj._state_ = blob.get("state")
+        obj._state_max_updated_ = blob.get("state_max_updated")
+        obj._devices_ = blob.get("devices")
         return obj
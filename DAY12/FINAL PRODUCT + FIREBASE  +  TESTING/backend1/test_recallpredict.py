@@ -0,0 +1,211 @@
+"""
+Tests for recallpredict.py
+Run: python -m pytest -q test_recallpredict.py
+Benchmark: python test_recallpredict.py --events 1000000
+"""
+
+import copy
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import sparse
+
+import recallpredict as rp
+
+
+def make_tables(n_events=20_000, n_devices=2_000, seed=0, date_fmt="%d-%m-%Y"):
+    """Synthetic EVENTS / DEVICE tables shaped like the Snowflake exports (some unknown device ids)."""
+    rng = np.random.default_rng(seed)
+    devices = pd.DataFrame({
+        "id": np.arange(1, n_devices + 1),
+        "risk_class": rng.choice(["1", "2", "3", None], n_devices),
+        "classification": rng.choice(["Cardio", "Ortho", "Neuro"], n_devices),
+        "implanted": rng.choice(["YES", "NO", "1", None], n_devices),
+        "country": rng.choice(["USA", "DEU", "IND"], n_devices),
+        "quantity_in_commerce": rng.integers(0, 10_000, n_devices).astype(str),
+        "description": rng.choice(["infusion pump", "cardiac stent", "hip implant", "oxygen sensor"], n_devices),
+    })
+
+    def dates(p_null):
+        d = pd.Timestamp("2010-01-01") + pd.to_timedelta(rng.integers(0, 5000, n_events), unit="D")
+        s = pd.Series(d.strftime(date_fmt), dtype=object)
+        s[rng.random(n_events) < p_null] = None
+        return s
+
+    events = pd.DataFrame({
+        "id": np.arange(n_events),
+        "device_id": rng.integers(1, n_devices + 60, n_events),
+        "action": rng.choice(["Recall", "Notice", None], n_events),
+        "action_classification": rng.choice(["Class I", "I", "II", "III", None, "N/A"], n_events),
+        "action_summary": rng.choice(["labeling error", "software bug in pump", "sterility issue", None], n_events),
+        "reason": rng.choice(["battery failure", "contamination", "mislabel"], n_events),
+        "type": rng.choice(["Recall", "Safety Alert", "recall ", "Field Safety Notice"], n_events),
+        "status": rng.choice(["Terminated", "Ongoing", "terminated "], n_events),
+        "date_initiated_by_firm": dates(0.2),
+        "date_posted": dates(0.05),
+        "date_terminated": dates(0.5),
+        "date_updated": dates(0.3),
+    })
+    return events, devices
+
+
+def reference_event_frame(events, devices, date_fmt=None):
+    """The row-wise implementation make_event_frame replaced (apply coalesce, per-flag cumsums).
+    date_fmt: the format the dates were written in; to_datetime(dayfirst=True) alone turns
+    ISO dates into %Y-%d-%m (and NaT past the 12th), which make_event_frame no longer does."""
+    e = events.copy()
+    e.columns = [str(c).strip().upper() for c in e.columns]
+    d = devices.copy()
+    d.columns = [str(c).strip().upper() for c in d.columns]
+    for c in ["DATE_INITIATED_BY_FIRM", "DATE_POSTED", "DATE_TERMINATED", "DATE_UPDATED"]:
+        e[c] = pd.to_datetime(e[c], errors="coerce", dayfirst=True, format=date_fmt)
+    d_small = d[["ID", "RISK_CLASS", "CLASSIFICATION", "IMPLANTED", "COUNTRY", "QUANTITY_IN_COMMERCE", "DESCRIPTION"]]
+    df = e.merge(d_small.rename(columns={"ID": "DEVICE_ID", "DESCRIPTION": "DEVICE_DESCRIPTION"}), on="DEVICE_ID", how="left")
+
+    def coalesce(row):
+        for c in ("DATE_UPDATED", "DATE_POSTED", "DATE_INITIATED_BY_FIRM"):
+            if pd.notnull(row.get(c)):
+                return row[c]
+        return pd.NaT
+
+    df["EVENT_DATE"] = df.apply(coalesce, axis=1)
+    df["DAYS_TO_POSTED"] = (df["DATE_POSTED"] - df["DATE_INITIATED_BY_FIRM"]).dt.days
+    df["DAYS_TO_TERMINATED"] = (df["DATE_TERMINATED"] - df["DATE_POSTED"]).dt.days
+    df["DAYS_SINCE_UPDATE"] = (df["DATE_UPDATED"].max() - df["DATE_UPDATED"]).dt.days
+    df["IS_IMPLANTED"] = df["IMPLANTED"].astype(str).str.upper().isin(["1", "YES", "TRUE", "Y"]).astype(int)
+    df["TYPE"] = df["TYPE"].astype(str).str.strip()
+    df["ACTION_CLASSIFICATION"] = (
+        df["ACTION_CLASSIFICATION"].astype(str).str.replace("CLASS ", "", regex=False).str.strip().str.upper()
+    )
+    df = df.sort_values(["DEVICE_ID", "EVENT_DATE"]).reset_index(drop=True)
+    for t in ["Recall", "Safety Alert"]:
+        flag = (df["TYPE"].str.lower() == t.lower()).astype(int)
+        df[f"HIST_{t.replace(' ', '_').upper()}_COUNT"] = (flag.groupby(df["DEVICE_ID"]).cumsum() - flag).astype(float)
+    for rc in ["I", "II", "III"]:
+        flag = (df["ACTION_CLASSIFICATION"].str.upper() == rc).astype(int)
+        df[f"HIST_CLASS_{rc}_COUNT"] = (flag.groupby(df["DEVICE_ID"]).cumsum() - flag).astype(float)
+    df["DAYS_SINCE_LAST_EVENT"] = (df["EVENT_DATE"] - df.groupby("DEVICE_ID")["EVENT_DATE"].shift(1)).dt.days
+    for c in ["QUANTITY_IN_COMMERCE", "RISK_CLASS"]:
+        df[c] = pd.to_numeric(df[c], errors="coerce")
+    return df
+
+
+@pytest.mark.parametrize("date_fmt", ["%d-%m-%Y", "%Y-%m-%d", "%d/%m/%Y %H:%M"])
+def test_make_event_frame_matches_reference(date_fmt):
+    events, devices = make_tables(5_000, 500, seed=3, date_fmt=date_fmt)
+    pd.testing.assert_frame_equal(rp.make_event_frame(events, devices), reference_event_frame(events, devices, date_fmt))
+
+
+def test_make_event_frame_explicit_formats_and_bad_values():
+    events, devices = make_tables(3_000, 300, seed=4)
+    events.loc[::97, "date_posted"] = "not a date"
+    formats = {c: "%d-%m-%Y" for c in ["DATE_INITIATED_BY_FIRM", "DATE_POSTED", "DATE_TERMINATED", "DATE_UPDATED"]}
+    expected = reference_event_frame(events, devices)
+    pd.testing.assert_frame_equal(rp.make_event_frame(events, devices), expected)
+    pd.testing.assert_frame_equal(rp.make_event_frame(events, devices, date_formats=formats), expected)
+
+
+def test_make_event_frame_leaves_inputs_untouched():
+    events, devices = make_tables(1_000, 100, seed=5)
+    before = events.copy()
+    rp.make_event_frame(events, devices)
+    pd.testing.assert_frame_equal(events, before)
+
+
+@pytest.fixture(scope="module")
+def fitted():
+    events, devices = make_tables(20_000, 2_000, seed=6)
+    return rp.DeviceRecallPredictor().fit(events, devices), events, devices
+
+
+def test_predict_many_matches_predict_device(fitted):
+    predictor, _, _ = fitted
+    ids = list(predictor._state_.index[:50])
+    fleet = predictor.predict_many(ids + [-1]).set_index("device_id")
+    assert list(fleet.index) == ids
+    for d in ids:
+        one, row = predictor.predict_device(d), fleet.loc[d]
+        assert row["p_next_recall_within_horizon"] == pytest.approx(one["p_next_recall_within_horizon"])
+        assert row["recall_class_pred"] == one["recall_class_pred"]
+        for c, p in one["recall_class_probs"].items():
+            assert row[f"p_class_{c}"] == pytest.approx(p)
+        if "status_pred" in one:
+            assert row["p_terminated_if_recall"] == pytest.approx(one["p_terminated_if_recall"])
+            assert row["status_pred"] == one["status_pred"]
+        else:
+            assert np.isnan(row["p_terminated_if_recall"])
+
+
+def test_state_matches_full_rebuild(fitted):
+    predictor, events, devices = fitted
+    fresh = rp.DeviceRecallPredictor().build_state(events, devices)
+    pd.testing.assert_frame_equal(predictor._state_, fresh._state_)
+
+
+def test_shared_transform_matches_each_head(fitted):
+    predictor, events, devices = fitted
+    pre = predictor.next_recall_pipe[0]
+    assert predictor.class_pipe[0] is pre and predictor.status_pipe[0] is pre
+    data = rp._add_text_all(rp.add_future_labels(rp.make_event_frame(events, devices), predictor.horizon_days))
+    heads = predictor._head_inputs(data)
+    for name, pipe, target in [("next_recall", predictor.next_recall_pipe, "Y_NEXT_RECALL"),
+                               ("class", predictor.class_pipe, "NEXT_RECALL_CLASS"),
+                               ("status", predictor.status_pipe, "Y_STATUS_TERMINATED")]:
+        mask = data[target].notna().to_numpy()
+        _, X = heads[name]
+        own = sparse.csr_matrix(pipe[0].transform(data[mask]))
+        assert (sparse.csr_matrix(X)[mask] != own).nnz == 0
+        np.testing.assert_allclose(pipe[-1].predict_proba(own), pipe.predict_proba(data[mask]))
+
+
+def test_passed_tables_override_stored_state(fitted):
+    predictor, events, devices = fitted
+    stored = predictor._state_
+    older = events[events["id"] % 3 != 0]
+    expected = copy.copy(predictor).build_state(older, devices)
+    ids = list(expected._state_.index[:30])
+    from_tables = predictor.predict_many(ids, older, devices).set_index("device_id")
+    pd.testing.assert_frame_equal(from_tables, expected.predict_many(ids).set_index("device_id"))
+    for d in ids[:5]:
+        assert predictor.predict_device(d, older, devices) == expected.predict_device(d)
+    assert predictor._state_ is stored
+    assert not from_tables.equals(predictor.predict_many(ids).set_index("device_id"))
+    with pytest.raises(ValueError):
+        predictor.predict_device(ids[0], events=older)
+
+
+def _date_ordered_chunks(events, size):
+    e = rp._parse_dates(rp._std_cols(events), ["DATE_UPDATED", "DATE_POSTED", "DATE_INITIATED_BY_FIRM"])
+    events = events.iloc[np.argsort(rp._coalesce_dates(e).to_numpy(), kind="stable")]
+    return (events.iloc[i:i + size] for i in range(0, len(events), size))
+
+
+@pytest.mark.filterwarnings("error::pandas.errors.SettingWithCopyWarning")
+def test_streaming_fit_close_to_batch(fitted):
+    _, _, devices = fitted
+    events, _ = make_tables(30_000, 2_000, seed=7)
+    held_out = events["device_id"] % 5 == 0
+    batch = rp.DeviceRecallPredictor().fit(events[~held_out], devices)
+    stream = rp.DeviceRecallPredictor().fit_streaming(_date_ordered_chunks(events[~held_out], 4_000), devices)
+    b, s = batch.evaluate(events[held_out], devices), stream.evaluate(events[held_out], devices)
+    assert s["next_recall_auc"] > b["next_recall_auc"] - 0.03
+    assert s["recall_class_f1"] > b["recall_class_f1"] - 0.03
+    assert len(stream.predict_many()) == len(stream._state_)
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser()
+    p.add_argument("--events", type=int, default=1_000_000)
+    p.add_argument("--devices", type=int, default=100_000)
+    args = p.parse_args()
+
+    events, devices = make_tables(args.events, args.devices, seed=0)
+    for name, fn in [("make_event_frame", rp.make_event_frame), ("reference (row-wise)", reference_event_frame)]:
+        t = time.perf_counter()
+        out = fn(events, devices)
+        print(f"{name:22s} {args.events:>9,} events: {time.perf_counter() - t:7.2f} s")
+    pd.testing.assert_frame_equal(rp.make_event_frame(events, devices), out)
+    print("identical output")
@@ -0,0 +1,119 @@
+"""
+Tests for tflite_severity.py (stub interpreter: no TFLite runtime needed)
+Run: python -m pytest -q test_tflite_severity.py
+"""
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+import tflite_severity as ts
+
+FEATURES = ["id", "action", "action_classification", "reason", "type", "status"]  # target is dropped: 5 inputs
+
+
+class StubInterpreter:
+    """Dense + softmax with the tflite Interpreter calls SeverityModel uses."""
+    weights = np.random.default_rng(0).normal(size=(5, 3)).astype(np.float32)
+
+    def __init__(self, model_path):
+        self.shape = [1, self.weights.shape[0]]
+        self.calls = 0
+
+    def allocate_tensors(self):
+        pass
+
+    def get_input_details(self):
+        return [{"index": 0, "shape": np.array(self.shape)}]
+
+    def get_output_details(self):
+        return [{"index": 1, "shape": np.array([self.shape[0], self.weights.shape[1]])}]
+
+    def resize_tensor_input(self, index, shape):
+        self.shape = list(shape)
+
+    def set_tensor(self, index, X):
+        assert list(X.shape) == self.shape and X.dtype == np.float32
+        self.X = X
+
+    def invoke(self):
+        self.calls += 1
+        z = self.X @ self.weights
+        e = np.exp(z - z.max(axis=1, keepdims=True))
+        self.out = e / e.sum(axis=1, keepdims=True)
+
+    def get_tensor(self, index):
+        return self.out
+
+
+@pytest.fixture
+def files(tmp_path, monkeypatch):
+    monkeypatch.setattr(ts, "TFLITE_AVAILABLE", True)
+    monkeypatch.setattr(ts, "Interpreter", StubInterpreter, raising=False)
+    model, columns = tmp_path / "device_severity_model.tflite", tmp_path / "feature_columns.joblib"
+    model.write_bytes(b"stub")
+    joblib.dump(FEATURES, columns)
+    return str(model), str(columns)
+
+
+def events(n=200, seed=1):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({c: rng.integers(0, 5, n) for c in FEATURES})
+    df["device_id"] = rng.integers(1, 40, n)
+    return df
+
+
+def expected_proba(rows):
+    X = rows[[c for c in FEATURES if c != ts.TARGET_COL]].to_numpy(np.float32)
+    z = X @ StubInterpreter.weights
+    e = np.exp(z - z.max(axis=1, keepdims=True))
+    return e / e.sum(axis=1, keepdims=True)
+
+
+def test_labels_from_artifact_and_width_check(files, tmp_path):
+    model, columns = files
+    assert ts.SeverityModel(model, columns).labels == ts.SEVERITY_LABELS  # no artifact: assumed order
+    joblib.dump(np.array(["Class III", "Class II", "Class I"], dtype=object), tmp_path / ts.LABELS_FILE)
+    assert ts.SeverityModel(model, columns).labels == ["Class III", "Class II", "Class I"]
+    joblib.dump(["Class I", "Class II"], tmp_path / ts.LABELS_FILE)
+    with pytest.raises(ValueError, match="3 outputs but 2 labels"):
+        ts.SeverityModel(model, columns)
+    with pytest.raises(ValueError, match="features"):
+        ts.SeverityModel(model, columns_path=_dump(tmp_path, FEATURES[:3]))
+
+
+def _dump(tmp_path, cols):
+    path = tmp_path / "cols.joblib"
+    joblib.dump(cols, path)
+    return str(path)
+
+
+def test_predict_devices_batched(files):
+    model, columns = files
+    sev = ts.SeverityModel(model, columns, labels=["A", "B", "C"], max_batch=16)
+    df = events()
+    ids = [3, 999, 7, 3]
+    out = sev.predict_devices(df, ids)
+    assert out[1] == {"error": "Device ID 999 not found"}
+    first = df.drop_duplicates("device_id").set_index("device_id")
+    for d, res in zip(ids, out):
+        if d == 999:
+            continue
+        p = expected_proba(first.loc[[d]])[0]
+        assert res["severity_class"] == "ABC"[p.argmax()]
+        assert res["probabilities"] == {lab: round(float(v), 4) for lab, v in zip("ABC", p)}
+    np.testing.assert_allclose(sev.predict_proba(df), expected_proba(df), rtol=1e-6)
+    assert sev._local.interpreter.calls == 1 + -(-len(df) // 16)  # one batch for the lookup, then 16-row batches
+
+
+def test_severity_endpoints(files):
+    model, columns = files
+    sev, df = ts.SeverityModel(model, columns), events()
+    body, status = ts.severity_response(sev, df, [3], single=True)  # /predict_severity/3
+    assert status == 200 and body["device_id"] == 3 and set(body["probabilities"]) == set(ts.SEVERITY_LABELS)
+    body, status = ts.severity_response(sev, df, [3, 5, 999])        # /bulk_predict_severity
+    assert status == 200 and [b.get("device_id") for b in body] == [3, 5, None]
+    assert ts.severity_response(sev, df, []) == ({"error": "No device IDs provided"}, 400)
+    assert ts.severity_response(None, df, [3])[1] == 503
+    assert ts.severity_response(sev, df.drop(columns=["reason"]), [3])[1] == 500
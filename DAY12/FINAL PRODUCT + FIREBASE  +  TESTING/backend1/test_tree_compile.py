@@ -0,0 +1,87 @@
+"""
+Parity tests for tree_compile.py
+Run: python -m pytest -q test_tree_compile.py
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from tree_compile import CompiledForest, compile_model, check_parity
+
+
+def _data(n=3000, seed=1):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, 6))
+    y = (X[:, 0] + X[:, 1] ** 2 + rng.normal(size=n) > 1).astype(int)
+    X[rng.random(X.shape) < 0.05] = np.nan
+    return X, y, rng
+
+
+def _roundtrip(model, tmp_path):
+    path = str(tmp_path / "model.npz")
+    compile_model(model).save(path)
+    return CompiledForest.load(path)
+
+
+def test_random_forest_parity(tmp_path):
+    X, y, _ = _data()
+    rf = RandomForestClassifier(n_estimators=50, random_state=0).fit(X, y)
+    compiled = _roundtrip(rf, tmp_path)
+    assert check_parity(rf, compiled, X) == 0.0
+    assert (rf.predict(X) == compiled.predict(X)).all()
+
+
+def test_lightgbm_parity_with_categoricals_and_nan(tmp_path):
+    lgb = pytest.importorskip("lightgbm")
+    X, y, rng = _data()
+    df = pd.DataFrame(X, columns=[f"f{i}" for i in range(X.shape[1])])
+    df["cat"] = pd.Categorical(rng.choice(list("abcdefghij"), len(df)))
+    df["z"] = np.where(rng.random(len(df)) < 0.3, 0.0, X[:, 2])
+    y = (y ^ df["cat"].isin(list("abc"))).astype(int)
+    model = lgb.LGBMClassifier(n_estimators=100, verbose=-1).fit(df, y)
+    compiled = _roundtrip(model, tmp_path)
+
+    test = df.copy()
+    test.loc[:50, "cat"] = np.nan
+    assert check_parity(model, compiled, test, atol=1e-12) < 1e-12
+
+
+def test_lightgbm_zero_as_missing(tmp_path):
+    lgb = pytest.importorskip("lightgbm")
+    X, y, _ = _data()
+    X[::5, 1] = 0.0
+    booster = lgb.train(dict(objective="binary", zero_as_missing=True, verbose=-1), lgb.Dataset(X, y), 50)
+    compiled = _roundtrip(booster, tmp_path)
+    assert np.abs(booster.predict(X) - compiled.predict_proba(X)[:, 1]).max() < 1e-12
+
+
+def test_lightgbm_rejects_multiclass():
+    lgb = pytest.importorskip("lightgbm")
+    X, _, rng = _data(n=500)
+    model = lgb.LGBMClassifier(n_estimators=5, verbose=-1).fit(np.nan_to_num(X), rng.integers(0, 3, len(X)))
+    with pytest.raises(ValueError):
+        compile_model(model)
+
+
+def test_load_for_rejects_stale_export(tmp_path, capsys):
+    import joblib
+    from tree_compile import source_sha256
+
+    X, y, _ = _data(500)
+    src, npz = str(tmp_path / "pipeline.joblib"), str(tmp_path / "pipeline.npz")
+    rf = RandomForestClassifier(n_estimators=5, random_state=0).fit(X, y)
+    joblib.dump({"model": rf}, src)
+    compiled = compile_model(rf)
+    compiled.save(npz)
+    assert CompiledForest.load_for(npz, src) is None  # exported without a hash
+    assert "no source hash" in capsys.readouterr().out
+
+    compiled.meta["source_sha256"] = source_sha256(src)
+    compiled.save(npz)
+    assert check_parity(rf, CompiledForest.load_for(npz, src), X) == 0.0
+
+    joblib.dump({"model": RandomForestClassifier(n_estimators=5, random_state=1).fit(X, y)}, src)  # retrained
+    assert CompiledForest.load_for(npz, src) is None
+    assert "not compiled from" in capsys.readouterr().out
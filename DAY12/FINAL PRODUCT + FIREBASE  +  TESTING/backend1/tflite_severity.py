@@ -0,0 +1,213 @@
+"""
+TFLite Severity Model
+---------------------
+CPU inference for device_severity_model.tflite (Dense(3) + softmax over the
+8 event features in feature_columns.joblib, minus the action_classification target).
+
+- One interpreter per thread (tflite interpreters are not thread-safe), created lazily
+- Batched invoke: the input tensor is resized to the batch and reused while the size repeats
+- Rows come from the label-encoded events table (events_cleaned_label_encoded.csv)
+- Class names, in the order of the softmax outputs, come from severity_labels.joblib
+  next to the model (the LabelEncoder classes_ of action_classification, saved when
+  the model is exported); the model's output width must match them
+
+Usage:
+  sev = SeverityModel("device_severity_model.tflite", "feature_columns.joblib")
+  sev.predict_devices(df, [123, 456])
+  joblib.dump(list(label_encoder.classes_), "severity_labels.joblib")   # at export time
+
+  python tflite_severity.py --csv "Rndom forest/events_cleaned_label_encoded.csv"   # latency / memory benchmark
+"""
+
+import os
+import sys
+import time
+import argparse
+import threading
+import multiprocessing as mp
+
+import numpy as np
+import pandas as pd
+import joblib
+
+# Prefer the slim runtime, fall back to the full TensorFlow package
+try:
+    from tflite_runtime.interpreter import Interpreter
+    TFLITE_AVAILABLE = True
+except Exception:
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+        TFLITE_AVAILABLE = True
+    except Exception:
+        try:
+            from tensorflow.lite import Interpreter
+            TFLITE_AVAILABLE = True
+        except Exception:
+            TFLITE_AVAILABLE = False
+
+# Assumed output order (LabelEncoder order of action_classification) for models exported
+# without severity_labels.joblib
+SEVERITY_LABELS = ["Class I", "Class II", "Class III"]
+LABELS_FILE = "severity_labels.joblib"
+TARGET_COL = "action_classification"
+
+
+def load_labels(model_path: str, labels=None) -> list:
+    """Explicit labels, else severity_labels.joblib next to the model, else SEVERITY_LABELS (with a warning)."""
+    if labels is not None:
+        return list(labels)
+    path = os.path.join(os.path.dirname(os.path.abspath(model_path)), LABELS_FILE)
+    if os.path.exists(path):
+        return [str(c) for c in joblib.load(path)]
+    print(f"⚠️ {LABELS_FILE} not found next to {os.path.basename(model_path)}: assuming outputs are {SEVERITY_LABELS}")
+    return list(SEVERITY_LABELS)
+
+
+class SeverityModel:
+    def __init__(self, model_path: str, columns_path: str, labels=None, max_batch: int = 1024):
+        if not TFLITE_AVAILABLE:
+            raise ImportError("No TFLite interpreter found (pip install tflite-runtime or ai-edge-litert)")
+        self.model_path = model_path
+        self.feature_cols = [c for c in joblib.load(columns_path) if c != TARGET_COL]
+        self.labels = load_labels(model_path, labels)
+        self.max_batch = max_batch
+        self._local = threading.local()
+        it = self._interpreter()
+        n_in = it.get_input_details()[0]["shape"][-1]
+        if n_in != len(self.feature_cols):
+            raise ValueError(f"Model expects {n_in} features, feature_columns.joblib gives {len(self.feature_cols)}")
+        n_out = it.get_output_details()[0]["shape"][-1]
+        if n_out != len(self.labels):
+            raise ValueError(f"Model has {n_out} outputs but {len(self.labels)} labels: {self.labels}")
+
+    def _interpreter(self):
+        it = getattr(self._local, "interpreter", None)
+        if it is None:
+            it = Interpreter(model_path=self.model_path)
+            it.allocate_tensors()
+            self._local.interpreter = it
+            self._local.batch = 1
+            self._local.inp = it.get_input_details()[0]["index"]
+            self._local.out = it.get_output_details()[0]["index"]
+        return it
+
+    def _invoke(self, X: np.ndarray) -> np.ndarray:
+        it = self._interpreter()
+        if self._local.batch != len(X):
+            it.resize_tensor_input(self._local.inp, [len(X), X.shape[1]])
+            it.allocate_tensors()
+            self._local.batch = len(X)
+        it.set_tensor(self._local.inp, X)
+        it.invoke()
+        return it.get_tensor(self._local.out).copy()
+
+    def features(self, rows: pd.DataFrame) -> np.ndarray:
+        X = rows[self.feature_cols].apply(pd.to_numeric, errors="coerce").fillna(0)
+        return np.ascontiguousarray(X.to_numpy(dtype=np.float32))
+
+    def predict_proba(self, X) -> np.ndarray:
+        if isinstance(X, pd.DataFrame):
+            X = self.features(X)
+        if not len(X):
+            return np.zeros((0, len(self.labels)), dtype=np.float32)
+        return np.concatenate([self._invoke(X[s:s + self.max_batch]) for s in range(0, len(X), self.max_batch)])
+
+    def predict_devices(self, df: pd.DataFrame, device_ids) -> list:
+        """First event row per device (same row the RF endpoint uses), scored in one batch."""
+        rows = df[df["device_id"].isin(device_ids)].drop_duplicates("device_id").set_index("device_id")
+        found = [d for d in device_ids if d in rows.index]
+        probs = dict(zip(found, self.predict_proba(rows.loc[found]))) if found else {}
+        out = []
+        for d in device_ids:
+            if d not in probs:
+                out.append({"error": f"Device ID {d} not found"})
+                continue
+            p = probs[d]
+            out.append({
+                "device_id": int(d),
+                "severity_class": self.labels[int(p.argmax())],
+                "probabilities": {lab: round(float(v), 4) for lab, v in zip(self.labels, p)},
+                "model": "tflite",
+            })
+        return out
+
+
+def severity_response(model, df: pd.DataFrame, device_ids, single: bool = False):
+    """(JSON body, HTTP status) for /predict_severity (single=True) and /bulk_predict_severity."""
+    if model is None:
+        return {"error": "Severity model not available"}, 503
+    if not device_ids:
+        return {"error": "No device IDs provided"}, 400
+    try:
+        # One batched interpreter call for all devices
+        out = model.predict_devices(df, device_ids)
+    except Exception as e:
+        return {"error": str(e)}, 500
+    return (out[0] if single else out), 200
+
+
+# ----------------------------
+# Benchmark (TFLite vs joblib models)
+# ----------------------------
+
+def _peak_rss_mb() -> float:
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (2**20 if sys.platform == "darwin" else 1024)
+
+
+def _bench_child(kind, path, columns_path, X, sizes, q):
+    base = _peak_rss_mb()
+    t0 = time.perf_counter()
+    if kind == "tflite":
+        m = SeverityModel(path, columns_path)
+        predict = m.predict_proba
+        X = X[m.feature_cols] if isinstance(X, pd.DataFrame) else X
+    else:
+        obj = joblib.load(path)
+        m = obj["model"] if isinstance(obj, dict) else obj
+        cols = obj.get("feature_cols") if isinstance(obj, dict) else None
+        X = X[cols].copy() if cols is not None and isinstance(X, pd.DataFrame) else X
+        for col, le in (obj.get("encoders", {}) if isinstance(obj, dict) else {}).items():
+            X[col] = le.transform(X[col].astype(str))
+        predict = m.predict_proba
+    res = {"model": os.path.basename(path), "load_ms": round((time.perf_counter() - t0) * 1000, 1)}
+    for n in sizes:
+        Xn = X.iloc[np.arange(n) % len(X)]
+        predict(Xn.iloc[:1])  # warm-up
+        t0 = time.perf_counter()
+        predict(Xn)
+        res[f"batch_{n}_ms"] = round((time.perf_counter() - t0) * 1000, 3)
+    res["rss_delta_mb"] = round(_peak_rss_mb() - base, 1)
+    q.put(res)
+
+
+def benchmark(models: dict, columns_path: str, X: pd.DataFrame, sizes=(1, 100, 10_000)) -> list:
+    """Load + score each model in a fresh process so RSS numbers do not overlap."""
+    ctx = mp.get_context("spawn")
+    out = []
+    for kind, path in models.items():
+        q = ctx.Queue()
+        p = ctx.Process(target=_bench_child, args=(kind, path, columns_path, X, sizes, q))
+        p.start()
+        p.join()
+        if p.exitcode != 0:
+            print(f"❌ Benchmark failed for {path}")
+            continue
+        out.append(q.get())
+    return out
+
+
+if __name__ == "__main__":
+    base = os.path.dirname(os.path.abspath(__file__))
+    p = argparse.ArgumentParser()
+    p.add_argument("--csv", default=os.path.join(base, "Rndom forest", "events_cleaned_label_encoded.csv"))
+    p.add_argument("--rows", type=int, default=10_000)
+    args = p.parse_args()
+
+    X = pd.read_csv(args.csv, encoding="ISO-8859-1", low_memory=False, nrows=args.rows)
+    models = {"tflite": os.path.join(base, "device_severity_model.tflite")}
+    rf = os.path.join(base, "Rndom forest", "device_failure_pipeline.joblib")
+    if os.path.exists(rf):
+        models["joblib"] = rf
+    for row in benchmark(models, os.path.join(base, "feature_columns.joblib"), X):
+        print(row)
@@ -0,0 +1,364 @@
+"""
+Compiled Tree Ensembles
+-----------------------
+Flatten a fitted tree ensemble into plain NumPy arrays (feature / threshold /
+child indices / leaf values for every node of every tree) and evaluate it with
+vectorized traversal: all rows x all trees advance one level per step.
+
+Supported models:
+  - sklearn RandomForestClassifier / DecisionTreeClassifier (device_failure_pipeline.joblib)
+  - LightGBM binary models (Alert Backend model.txt, an lgb.Booster or LGBMClassifier)
+
+Usage:
+  python tree_compile.py export "Rndom forest/device_failure_pipeline.joblib" "Rndom forest/device_failure_pipeline.npz"
+  python tree_compile.py check  "Rndom forest/device_failure_pipeline.joblib" "Rndom forest/device_failure_pipeline.npz"
+
+  compiled = CompiledForest.load("device_failure_pipeline.npz")
+  compiled = CompiledForest.load_for("device_failure_pipeline.npz", "device_failure_pipeline.joblib")  # None if stale
+  proba = compiled.predict_proba(X)
+"""
+
+import sys
+import json
+import hashlib
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+import joblib
+
+
+# LightGBM missing-value handling per split
+MISSING_NONE, MISSING_ZERO, MISSING_NAN = 0, 1, 2
+_MISSING_TYPES = {"None": MISSING_NONE, "Zero": MISSING_ZERO, "NaN": MISSING_NAN}
+_ZERO_THRESHOLD = 1e-35
+
+
+# ----------------------------
+# Export
+# ----------------------------
+
+class _Builder:
+    """Accumulates nodes of many trees into one set of flat arrays."""
+
+    def __init__(self, n_outputs: int):
+        self.cols = {k: [] for k in ("feature", "threshold", "left", "right", "default_left", "missing_type", "cat_idx")}
+        self.value = []
+        self.cat_sets = []
+        self.roots = []
+        self.n_outputs = n_outputs
+
+    def add(self, feature=-1, threshold=0.0, default_left=False, missing_type=MISSING_NAN, cats=None, value=None) -> int:
+        i = len(self.value)
+        self.cols["feature"].append(feature)
+        self.cols["threshold"].append(threshold)
+        self.cols["left"].append(i)
+        self.cols["right"].append(i)
+        self.cols["default_left"].append(default_left)
+        self.cols["missing_type"].append(missing_type)
+        self.cols["cat_idx"].append(-1)
+        if cats is not None:
+            self.cols["cat_idx"][i] = len(self.cat_sets)
+            self.cat_sets.append(cats)
+        self.value.append(np.zeros(self.n_outputs) if value is None else value)
+        return i
+
+    def arrays(self) -> dict:
+        c = self.cols
+        n_words = max([max(s) // 32 + 1 for s in self.cat_sets if s] + [1])
+        bits = np.zeros((max(1, len(self.cat_sets)), n_words), dtype=np.uint32)
+        for k, s in enumerate(self.cat_sets):
+            for v in s:
+                bits[k, v // 32] |= np.uint32(1 << (v % 32))
+        return dict(
+            feature=np.asarray(c["feature"], dtype=np.int32),
+            threshold=np.asarray(c["threshold"], dtype=np.float64),
+            left=np.asarray(c["left"], dtype=np.int32),
+            right=np.asarray(c["right"], dtype=np.int32),
+            default_left=np.asarray(c["default_left"], dtype=bool),
+            missing_type=np.asarray(c["missing_type"], dtype=np.int8),
+            cat_idx=np.asarray(c["cat_idx"], dtype=np.int32),
+            cat_bits=bits,
+            value=np.asarray(self.value, dtype=np.float64).reshape(-1, self.n_outputs),
+            roots=np.asarray(self.roots, dtype=np.int32),
+        )
+
+
+def compile_sklearn_forest(model) -> "CompiledForest":
+    """Flatten a RandomForestClassifier (or a single DecisionTreeClassifier)."""
+    trees = getattr(model, "estimators_", [model])
+    b = _Builder(len(model.classes_))
+    for est in trees:
+        t = est.tree_
+        base = len(b.value)
+        value = t.value[:, 0, :]
+        value = value / np.maximum(value.sum(axis=1, keepdims=True), 1e-300)  # class fractions per node
+        mgl = getattr(t, "missing_go_to_left", np.zeros(t.node_count, dtype=bool))
+        for n in range(t.node_count):
+            leaf = t.children_left[n] == -1
+            b.add(feature=-1 if leaf else int(t.feature[n]), threshold=float(t.threshold[n]),
+                  default_left=bool(mgl[n]), missing_type=MISSING_NAN, value=value[n])
+            if not leaf:
+                b.cols["left"][base + n] = base + int(t.children_left[n])
+                b.cols["right"][base + n] = base + int(t.children_right[n])
+        b.roots.append(base)
+    names = getattr(model, "feature_names_in_", None)
+    meta = dict(kind="sklearn_forest", classes=[c.item() if hasattr(c, "item") else c for c in model.classes_],
+                feature_names=None if names is None else list(names), n_features=int(model.n_features_in_))
+    return CompiledForest(b.arrays(), meta)
+
+
+def compile_lightgbm(model) -> "CompiledForest":
+    """Flatten a binary LightGBM model (Booster, LGBMClassifier or anything with .booster_)."""
+    booster = getattr(model, "booster_", model)
+    dump = booster.dump_model()
+    obj = dump.get("objective", "binary")
+    if not obj.startswith("binary") or dump.get("num_tree_per_iteration", 1) != 1:
+        raise ValueError(f"Only binary LightGBM models are supported (objective={obj})")
+    sigmoid = 1.0
+    for tok in obj.split():
+        if tok.startswith("sigmoid:"):
+            sigmoid = float(tok.split(":")[1])
+
+    b = _Builder(1)
+
+    def walk(node) -> int:
+        if "leaf_value" in node:
+            return b.add(value=np.array([node["leaf_value"]]))
+        is_cat = node["decision_type"] == "=="
+        i = b.add(
+            feature=int(node["split_feature"]),
+            threshold=0.0 if is_cat else float(node["threshold"]),
+            default_left=bool(node["default_left"]),
+            missing_type=_MISSING_TYPES[node["missing_type"]],
+            cats=[int(v) for v in str(node["threshold"]).split("||")] if is_cat else None,
+        )
+        b.cols["left"][i] = walk(node["left_child"])
+        b.cols["right"][i] = walk(node["right_child"])
+        return i
+
+    sys.setrecursionlimit(max(10_000, sys.getrecursionlimit()))
+    for t in dump["tree_info"]:
+        b.roots.append(walk(t["tree_structure"]))
+    meta = dict(kind="lightgbm", classes=[0, 1], sigmoid=sigmoid, average_output=bool(dump.get("average_output", False)),
+                feature_names=dump.get("feature_names"), n_features=int(dump["max_feature_idx"]) + 1,
+                pandas_categorical=getattr(booster, "pandas_categorical", None))
+    return CompiledForest(b.arrays(), meta)
+
+
+def compile_model(model) -> "CompiledForest":
+    if hasattr(model, "booster_") or type(model).__name__ == "Booster":
+        return compile_lightgbm(model)
+    return compile_sklearn_forest(model)
+
+
+def load_model(path: str):
+    """Load a model to compile: LightGBM text file, or a joblib artifact (dict with 'model' or a bare model)."""
+    if path.endswith(".txt"):
+        import lightgbm as lgb
+        return lgb.Booster(model_file=path)
+    obj = joblib.load(path)
+    return obj["model"] if isinstance(obj, dict) else obj
+
+
+def source_sha256(path: str) -> str:
+    """sha256 of the source model file; stored in the .npz meta so a stale export can be detected."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+# ----------------------------
+# Inference
+# ----------------------------
+
+class CompiledForest:
+    """Array-based tree ensemble with a predict_proba compatible with the source model."""
+
+    def __init__(self, arrays: dict, meta: dict):
+        self.a = arrays
+        self.meta = meta
+        self.classes_ = np.asarray(meta["classes"])
+        splits = arrays["feature"] >= 0
+        self._plain = not (arrays["cat_idx"] >= 0).any() and bool((arrays["missing_type"][splits] == MISSING_NAN).all())
+
+    def save(self, path: str) -> None:
+        np.savez_compressed(path, meta=np.array(json.dumps(self.meta, default=str)), **self.a)
+
+    @staticmethod
+    def load(path: str) -> "CompiledForest":
+        with np.load(path, allow_pickle=False) as z:
+            meta = json.loads(str(z["meta"]))
+            arrays = {k: z[k] for k in z.files if k != "meta"}
+        return CompiledForest(arrays, meta)
+
+    @staticmethod
+    def load_for(path: str, source_path: str):
+        """Load the compiled model only if it was exported from source_path as it is now; None otherwise."""
+        compiled = CompiledForest.load(path)
+        expected = compiled.meta.get("source_sha256")
+        if expected is None:
+            print(f"⚠️ {path} has no source hash (re-export it), using the source model.")
+            return None
+        if expected != source_sha256(source_path):
+            print(f"⚠️ {path} was not compiled from the current {source_path}, using the source model.")
+            return None
+        return compiled
+
+    def _as_matrix(self, X) -> np.ndarray:
+        if isinstance(X, pd.DataFrame):
+            names = self.meta.get("feature_names")
+            if names and set(names) <= set(X.columns):
+                X = X[names]
+            cats = self.meta.get("pandas_categorical")
+            cat_cols = [c for c in X.columns if isinstance(X[c].dtype, pd.CategoricalDtype)]
+            if cat_cols:
+                # Same mapping LightGBM applies: training categories -> codes, unknown -> NaN
+                X = X.copy()
+                for c, levels in zip(cat_cols, cats or [None] * len(cat_cols)):
+                    s = X[c].cat.set_categories(levels) if levels is not None else X[c]
+                    X[c] = s.cat.codes.replace(-1, np.nan)
+            X = X.to_numpy(dtype=np.float64, na_value=np.nan)
+        X = np.asarray(X, dtype=np.float64)
+        if self.meta["kind"] == "sklearn_forest":
+            X = X.astype(np.float32).astype(np.float64)  # sklearn compares float32 inputs
+        return X
+
+    def _leaves(self, X: np.ndarray) -> np.ndarray:
+        """Leaf index per (row, tree); only (row, tree) pairs still on an internal node are advanced."""
+        a = self.a
+        n, F = X.shape
+        T = len(a["roots"])
+        node = np.tile(a["roots"], n)
+        row_off = np.repeat(np.arange(n, dtype=np.int64) * F, T)
+        Xf = X.ravel()
+        idx = np.arange(n * T)
+        while len(idx):
+            nd = node[idx]
+            f = a["feature"][nd]
+            keep = f >= 0
+            idx, nd, f = idx[keep], nd[keep], f[keep]
+            if not len(idx):
+                break
+            x = Xf[row_off[idx] + f]
+            if self._plain:
+                # Numeric splits, NaN -> default direction (all sklearn forests, most LightGBM models)
+                go_left = x <= a["threshold"][nd]
+                nan = np.isnan(x)
+                if nan.any():
+                    go_left[nan] = a["default_left"][nd[nan]]
+            else:
+                go_left = self._decide(nd, x)
+            node[idx] = np.where(go_left, a["left"][nd], a["right"][nd])
+        return node.reshape(n, T)
+
+    def _decide(self, nd: np.ndarray, x: np.ndarray) -> np.ndarray:
+        """LightGBM decision rules: missing_type None/Zero/NaN and categorical bitset splits."""
+        a = self.a
+        mt = a["missing_type"][nd]
+        nan = np.isnan(x)
+        x = np.where(nan & (mt != MISSING_NAN), 0.0, x)
+        missing = ((mt == MISSING_ZERO) & (np.abs(x) <= _ZERO_THRESHOLD)) | ((mt == MISSING_NAN) & nan)
+        with np.errstate(invalid="ignore"):
+            go_left = np.where(missing, a["default_left"][nd], x <= a["threshold"][nd])
+        ci = a["cat_idx"][nd]
+        is_cat = ci >= 0
+        if is_cat.any():
+            # Left iff the (non-negative, truncated) category is in the split's bitset; NaN/negative go right
+            valid = is_cat & ~nan & (x >= 0)
+            v = np.where(valid, np.trunc(np.where(valid, x, 0)), 0).astype(np.int64)
+            words = a["cat_bits"].shape[1]
+            w = v // 32
+            hit = (a["cat_bits"][np.maximum(ci, 0), np.minimum(w, words - 1)] >> (v % 32).astype(np.uint32)) & 1
+            go_left = np.where(is_cat, valid & (w < words) & (hit == 1), go_left)
+        return go_left
+
+    def predict_proba(self, X, batch_size: int = 20_000) -> np.ndarray:
+        X = self._as_matrix(X)
+        out = []
+        for s in range(0, max(1, X.shape[0]), batch_size):
+            vals = self.a["value"][self._leaves(X[s:s + batch_size])]  # (rows, trees, outputs)
+            if self.meta["kind"] == "sklearn_forest":
+                out.append(vals.mean(axis=1))
+            else:
+                raw = vals[..., 0].sum(axis=1)
+                if self.meta.get("average_output"):
+                    raw = raw / vals.shape[1]
+                p = 1.0 / (1.0 + np.exp(-self.meta["sigmoid"] * raw))
+                out.append(np.column_stack([1 - p, p]))
+        return np.concatenate(out)[:X.shape[0]]
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+# ----------------------------
+# Parity + latency check
+# ----------------------------
+
+def check_parity(model, compiled: CompiledForest, X, atol: float = 1e-9) -> float:
+    """Max absolute difference between the source model and the compiled one (raises if > atol)."""
+    diff = float(np.max(np.abs(model.predict_proba(X)[:, -1] - compiled.predict_proba(X)[:, -1]))) if len(X) else 0.0
+    if diff > atol:
+        raise AssertionError(f"Compiled model differs from source: max |dp| = {diff:.3g}")
+    return diff
+
+
+def benchmark(model, compiled: CompiledForest, X, sizes=(1, 100, 100_000), repeats: int = 5) -> list:
+    """Median predict_proba latency (ms) of source vs compiled model for each batch size."""
+    rows = []
+    for n in sizes:
+        Xn = X.iloc[np.arange(n) % len(X)] if isinstance(X, pd.DataFrame) else X[np.arange(n) % len(X)]
+        res = {"batch_size": n}
+        for name, m in (("source_ms", model), ("compiled_ms", compiled)):
+            times = []
+            for _ in range(repeats if n < 100_000 else 2):
+                t0 = time.perf_counter()
+                m.predict_proba(Xn)
+                times.append((time.perf_counter() - t0) * 1000)
+            res[name] = round(float(np.median(times)), 3)
+        rows.append(res)
+    return rows
+
+
+def _sample_inputs(model, compiled: CompiledForest, csv: str = None, artifact_path: str = None, n: int = 5000):
+    """Real rows from `csv` (encoded like app.py) when given, otherwise random normal rows."""
+    if csv:
+        df = pd.read_csv(csv, encoding="ISO-8859-1", low_memory=False)
+        art = joblib.load(artifact_path) if artifact_path and not artifact_path.endswith(".txt") else {}
+        cols = art.get("feature_cols") if isinstance(art, dict) else None
+        X = df[cols].copy() if cols else df[compiled.meta["feature_names"]].copy()
+        for col, le in (art.get("encoders", {}) if isinstance(art, dict) else {}).items():
+            if col in X:
+                X[col] = le.transform(X[col].astype(str))
+        return X.head(n)
+    rng = np.random.default_rng(0)
+    X = rng.normal(scale=3.0, size=(n, compiled.meta["n_features"]))
+    X[rng.random(X.shape) < 0.02] = np.nan
+    names = compiled.meta.get("feature_names")
+    return pd.DataFrame(X, columns=names) if names and getattr(model, "feature_names_in_", None) is not None else X
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser()
+    p.add_argument("cmd", choices=["export", "check"])
+    p.add_argument("model", help="joblib artifact / model, or LightGBM model.txt")
+    p.add_argument("out", help="compiled .npz path")
+    p.add_argument("--csv", default=None, help="rows to check/benchmark on (default: random)")
+    args = p.parse_args()
+
+    model = load_model(args.model)
+    if args.cmd == "export":
+        compiled = compile_model(model)
+        compiled.meta["source_sha256"] = source_sha256(args.model)
+        compiled.save(args.out)
+        print(f"✅ Compiled {len(compiled.a['roots'])} trees / {len(compiled.a['feature'])} nodes -> {args.out}")
+    else:
+        compiled = CompiledForest.load(args.out)
+        X = _sample_inputs(model, compiled, args.csv, args.model)
+        print(f"Parity: max |dp| = {check_parity(model, compiled, X):.3g}")
+        for row in benchmark(model, compiled, X):
+            print(row)
@@ -0,0 +1,219 @@
+"""
+Chunked, multi-process preprocessing of FullDataset.csv
+-------------------------------------------------------
+Runs dataprepipynb1.preprocess_recalls_df over byte ranges of the CSV in a
+process pool instead of loading the whole file as one dtype=str frame.
+
+- The file is cut at record boundaries (newlines outside quoted fields, so
+  multi-line summaries stay in one piece); each worker reads only its range.
+  Quoting must follow RFC 4180 (what pandas / csv writers produce): a '"'
+  only appears inside a quoted field, doubled. A bare '"' in an unquoted field
+  (an inch mark: 12" tube) would shift every later cut; a file with an odd
+  number of '"' is rejected (ValueError) before anything is cut
+- Date formats are detected once over the whole file, the way the single-frame
+  run picks them (fastdates.detect_format on the column's distinct values),
+  and passed to every chunk, so a chunk never parses with a different format
+- drop_duplicates(subset=["id"], keep="first") across chunks: results are
+  consumed in file order and checked against a set of ids already written
+- Output is one Parquet file per chunk (part-00000.parquet, ...) in out_dir;
+  pd.read_parquet(out_dir) reads them back as one frame
+- Peak RSS is reported per worker process
+
+Usage:
+  python chunked_preprocess.py FullDataset.csv FullDataset_preprocessed/ --chunk-mb 64 --workers 4
+"""
+
+import io
+import os
+import time
+import argparse
+import resource
+from collections import deque
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from dataprepipynb1 import preprocess_recalls_df, DATE_COLUMNS
+from common.fastdates import detect_format
+
+READ_KWARGS = dict(dtype=str, keep_default_na=False, na_values=["", "NaN", "nan", "None", "null"])
+_BLOCK = 1 << 20
+
+
+# =========================
+# SPLITTING
+# =========================
+
+def _quote_parity(f, start: int, stop: int) -> bool:
+    """True when [start, stop) holds an odd number of '"' (i.e. stop is inside a quoted field)."""
+    f.seek(start)
+    odd, pos = False, start
+    while pos < stop:
+        block = f.read(min(_BLOCK, stop - pos))
+        if not block:
+            break
+        odd ^= bool(block.count(b'"') & 1)
+        pos += len(block)
+    return odd
+
+
+def _next_record_start(f, pos: int, odd: bool):
+    """Offset just past the first newline at/after pos that is not inside a quoted field (None at EOF)."""
+    f.seek(pos)
+    while True:
+        block = f.read(_BLOCK)
+        if not block:
+            return None
+        i = 0
+        while True:
+            j = block.find(b"\n", i)
+            if j < 0:
+                break
+            odd ^= bool(block.count(b'"', i, j) & 1)
+            if not odd:
+                return pos + j + 1
+            i = j + 1
+        odd ^= bool(block.count(b'"', i) & 1)
+        pos += len(block)
+
+
+def split_byte_ranges(path: str, chunk_bytes: int = 64 << 20):
+    """(header bytes, [(start, stop), ...]) covering every data record of the CSV exactly once."""
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        if _quote_parity(f, 0, size):
+            raise ValueError(f"{path} has an odd number of '\"': a quote outside RFC 4180 quoting (e.g. an unquoted "
+                             "inch mark) would misplace the chunk cuts; fix the quoting or preprocess it as one frame")
+        f.seek(0)
+        header = f.readline()
+        start = f.tell()
+        ranges = []
+        while start < size:
+            target = start + chunk_bytes
+            cut = None
+            if target < size:
+                cut = _next_record_start(f, target, _quote_parity(f, start, target))
+            if cut is None or cut >= size:
+                ranges.append((start, size))
+                break
+            ranges.append((start, cut))
+            start = cut
+    return header, ranges
+
+
+def detect_date_formats(path: str, chunk_rows: int = 1_000_000) -> dict:
+    """The format the single-frame run detects for each date column: detect_format over the column's
+    distinct values of the whole file, in order of first appearance (only the date columns are read)."""
+    header = pd.read_csv(path, nrows=0).columns
+    cols = [c for c in DATE_COLUMNS if c in header]
+    distinct = {c: {} for c in cols}
+    for chunk in pd.read_csv(path, usecols=cols, chunksize=chunk_rows, **READ_KWARGS):
+        for c in cols:
+            distinct[c].update(dict.fromkeys(chunk[c].dropna().unique()))
+    formats = {c: detect_format(list(values)) for c, values in distinct.items()}
+    # None = no guess; values are then parsed one by one, which is chunk-independent anyway
+    return {c: fmt for c, fmt in formats.items() if fmt}
+
+
+# =========================
+# WORKER
+# =========================
+
+def _preprocess_range(path: str, header: bytes, start: int, stop: int, date_formats: dict):
+    with open(path, "rb") as f:
+        f.seek(start)
+        buf = io.BytesIO(header + f.read(stop - start))
+    df = pd.read_csv(buf, **READ_KWARGS)
+    del buf
+    out = preprocess_recalls_df(df, date_formats=date_formats, copy=False)
+    del df
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # KiB on Linux
+    return out, os.getpid(), peak_kb
+
+
+def _to_arrow(df: pd.DataFrame):
+    """Arrow table with a schema that does not depend on what a chunk happens to contain."""
+    import pyarrow as pa
+    fields = []
+    for c in df.columns:
+        dt = df[c].dtype
+        if isinstance(dt, pd.CategoricalDtype):
+            typ = pa.dictionary(pa.int32(), pa.string())
+        elif dt == "int8":
+            typ = pa.int8()
+        elif pd.api.types.is_numeric_dtype(dt):
+            typ = pa.float64()  # days_* are int64 in a chunk without NaT, float64 otherwise
+        elif pd.api.types.is_datetime64_any_dtype(dt):
+            typ = pa.timestamp("ns")
+        else:
+            typ = pa.string()
+        fields.append(pa.field(str(c), typ))
+    return pa.Table.from_pandas(df, schema=pa.schema(fields), preserve_index=False)
+
+
+# =========================
+# RUNNER
+# =========================
+
+def preprocess_file(in_path: str, out_dir: str, chunk_bytes: int = 64 << 20, workers: int = None) -> dict:
+    """Preprocess in_path chunk by chunk into out_dir/part-*.parquet; returns row counts and peak RSS (MB) per worker.
+    At most 2 x workers processed chunks are in memory at once."""
+    import pyarrow.parquet as pq
+
+    workers = workers or os.cpu_count() or 1
+    header, ranges = split_byte_ranges(in_path, chunk_bytes)
+    date_formats = detect_date_formats(in_path)
+    os.makedirs(out_dir, exist_ok=True)
+    tasks = iter([(in_path, header, a, b, date_formats) for a, b in ranges])
+
+    seen = set()
+    stats = {"chunks": len(ranges), "rows_in": 0, "rows_out": 0, "duplicates_dropped": 0, "peak_rss_mb": {}}
+
+    def write(part, out, pid, peak_kb):
+        ids = out["id"].to_numpy()
+        # ids are already unique within a chunk; drop the ones an earlier chunk kept
+        new = np.fromiter((i not in seen for i in ids), dtype=bool, count=len(ids))
+        seen.update(ids[new])
+        if not new.all():
+            out = out[new]
+        pq.write_table(_to_arrow(out), os.path.join(out_dir, f"part-{part:05d}.parquet"))
+        stats["rows_in"] += len(ids)
+        stats["rows_out"] += len(out)
+        stats["duplicates_dropped"] += int((~new).sum())
+        stats["peak_rss_mb"][pid] = max(stats["peak_rss_mb"].get(pid, 0), peak_kb / 1024)
+        print(f"  part-{part:05d}: {len(out):,} rows (worker {pid}, peak RSS {peak_kb / 1024:,.0f} MB)")
+
+    if workers == 1:
+        for part, task in enumerate(tasks):
+            write(part, *_preprocess_range(*task))
+        return stats
+    with ProcessPoolExecutor(workers) as pool:
+        pending = deque(pool.submit(_preprocess_range, *t) for t in islice(tasks, 2 * workers))
+        part = 0
+        while pending:
+            result = pending.popleft().result()
+            nxt = next(tasks, None)
+            if nxt is not None:
+                pending.append(pool.submit(_preprocess_range, *nxt))
+            write(part, *result)
+            part += 1
+    return stats
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    p.add_argument("in_path")
+    p.add_argument("out_dir")
+    p.add_argument("--chunk-mb", type=int, default=64)
+    p.add_argument("--workers", type=int, default=None)
+    args = p.parse_args()
+
+    t = time.perf_counter()
+    stats = preprocess_file(args.in_path, args.out_dir, args.chunk_mb << 20, args.workers)
+    print(f"✅ {stats['rows_out']:,} rows ({stats['duplicates_dropped']:,} cross-chunk duplicate ids dropped) "
+          f"in {stats['chunks']} parts at {args.out_dir} [{time.perf_counter() - t:.1f} s]")
+    for pid, mb in stats["peak_rss_mb"].items():
+        print(f"   worker {pid}: peak RSS {mb:,.0f} MB")
+    print(f"   parent: peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:,.0f} MB")
@@ -7,9 +7,6 @@ Original file is located at
     https://colab.research.google.com/drive/1BQxIDbJiCrUDO5ZJLPr9HGCz4f-CWOFW
 """
 
-import pandas as pd
-df=pd.read_csv("/content/FullDataset.csv")
-
 # ===========================================
 # 📌 Recall Events Preprocessing with NLP + Dates + Finalized Class
 # ===========================================
@@ -18,6 +15,10 @@ import numpy as np
 import re
 from datetime import datetime
 
+# Shared compiled keyword rules and date parser (common package at the repo root)
+from common.textrules import KeywordRules
+from common.fastdates import parse_dates
+
 # =========================
 # CONFIG / KEYWORDS
 # =========================
@@ -65,9 +66,11 @@ SEVERITY_KEYWORDS = {
 def _safe_lower(x):
     return x.lower() if isinstance(x, str) else ""
 
-def parse_date(series: pd.Series) -> pd.Series:
-    parsed = pd.to_datetime(series, errors="coerce", infer_datetime_format=True, utc=False)
-    return parsed.dt.strftime("%Y-%m-%d")
+def parse_date(series: pd.Series, fmt: str = None) -> pd.Series:
+    # fmt pins the format otherwise detected for the column; parsed and formatted once per distinct value
+    def fn(u):
+        return parse_dates(u, fmt).dt.strftime("%Y-%m-%d")
+    return pd.Series(_on_unique(series, fn), index=series.index, name=series.name)
 
 def normalize_classification(text: str):
     if not isinstance(text, str) or not text.strip():
@@ -108,6 +111,68 @@ def extract_severity(text: str) -> str:
             return sev
     return "Unknown"
 
+# =========================
+# VECTORIZED RULES
+# Same rules as the row-wise helpers above, compiled once per rule family
+# (common/textrules.py) and evaluated once per distinct text.
+# =========================
+
+ACTION_RULES = KeywordRules([(label, [pat]) for pat, label in ACTION_PATTERNS.items()], regex=True)
+MEANINGFUL_RULES = KeywordRules([("Meaningful data", MEANINGFUL_KEYWORDS)], default="Meaningless data")
+CLASSIFICATION_RULES = KeywordRules([(label, [pat]) for pat, label in CLASS_PATTERNS], default=np.nan, regex=True)
+CAUSE_RULES = KeywordRules([(label, [pat]) for pat, label in CAUSE_PATTERNS.items()], default="Other / Unspecified", regex=True)
+SEVERITY_RULES = KeywordRules(list(SEVERITY_KEYWORDS.items()), default="Unknown")
+
+# assign_finalized_class: 1. direct classification ("class i" also matches "class ii"/"class iii")
+FINALIZED_AC_RULES = KeywordRules([("Class I", ["class i"]), ("Class II", ["class ii"]), ("Class III", ["class iii"])])
+# 2. severity keywords in summary + reason + action; 3./4. status fallback and the default are both Class II
+FINALIZED_TEXT_RULES = KeywordRules([
+    ("Class I", ["death","life-threatening","serious injur","contamination","fire","explosion"]),
+    ("Class II", ["malfunction","temporary injur","incorrect","failure","overdose","underdose","mislabel"]),
+    ("Class III", ["label","packaging","clerical","printing error","administrative"]),
+], default="Class II")
+
+def _on_unique(s: pd.Series, fn) -> np.ndarray:
+    """fn(Series of distinct values, NaN included once) -> array, broadcast back to every row."""
+    codes, uniq = pd.factorize(s, use_na_sentinel=False)
+    return np.asarray(fn(pd.Series(uniq, dtype=object)), dtype=object)[codes]
+
+def _lower_or_empty(s: pd.Series) -> pd.Series:
+    """_safe_lower per value (non-strings -> "")."""
+    return pd.Series(_on_unique(s, lambda u: [x.lower() if isinstance(x, str) else "" for x in u]), index=s.index, dtype=object)
+
+def _is_text(s: pd.Series) -> np.ndarray:
+    """Non-blank string per value."""
+    return _on_unique(s, lambda u: [isinstance(x, str) and bool(x.strip()) for x in u]).astype(bool)
+
+def infer_action_vec(action: pd.Series, summary: pd.Series, notes: pd.Series) -> pd.Series:
+    """Vectorized infer_action_from_text."""
+    summary_l = _lower_or_empty(summary)
+    text = (_lower_or_empty(action) + " " + summary_l + " " + _lower_or_empty(notes)).str.strip()
+    label = ACTION_RULES.classify(text)
+    fallback = np.where(summary_l.str.len().ge(20).to_numpy(), "Meaningful data", MEANINGFUL_RULES.classify(text))
+    return pd.Series(np.where(label != None, label, fallback), index=action.index, dtype=object)  # noqa: E711
+
+def normalize_classification_vec(s: pd.Series) -> pd.Series:
+    """Vectorized normalize_classification."""
+    return pd.Series(np.where(_is_text(s), CLASSIFICATION_RULES.classify(_lower_or_empty(s)), np.nan), index=s.index)
+
+def normalize_cause_vec(s: pd.Series) -> pd.Series:
+    """Vectorized normalize_cause."""
+    return pd.Series(np.where(_is_text(s), CAUSE_RULES.classify(_lower_or_empty(s)), np.nan), index=s.index)
+
+def extract_severity_vec(s: pd.Series) -> pd.Series:
+    """Vectorized extract_severity."""
+    is_str = _on_unique(s, lambda u: [isinstance(x, str) for x in u]).astype(bool)
+    return pd.Series(np.where(is_str, SEVERITY_RULES.classify(_lower_or_empty(s)), "Unknown"), index=s.index, dtype=object)
+
+def assign_finalized_class_vec(df: pd.DataFrame) -> pd.Series:
+    """Vectorized assign_finalized_class."""
+    ac = df["action_classification"].astype(str).str.lower()
+    text = (df["action_summary"].astype(str) + " " + df["reason"].astype(str) + " " + df["action"].astype(str)).str.lower()
+    direct = FINALIZED_AC_RULES.classify(ac)
+    return pd.Series(np.where(direct != None, direct, FINALIZED_TEXT_RULES.classify(text)), index=df.index, dtype=object)  # noqa: E711
+
 def assign_finalized_class(row):
     """Final classification using multiple fields"""
     # 1. Direct classification if available
@@ -141,8 +206,14 @@ def assign_finalized_class(row):
 # MAIN PREPROCESSOR
 # =========================
 
-def preprocess_recalls_df(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
+DATE_COLUMNS = ["create_date","date_initiated_by_firm","date_posted","date_terminated","date_updated"]
+
+def preprocess_recalls_df(df: pd.DataFrame, date_formats: dict = None, copy: bool = True) -> pd.DataFrame:
+    # date_formats: {column: strftime format}, for callers that only see part of the file
+    # copy=False lets a caller that owns df (e.g. a freshly read chunk) skip the defensive copy
+    if copy:
+        df = df.copy()
+    date_formats = date_formats or {}
 
     # ---- [your existing steps] ----
     expected = [
@@ -163,18 +234,17 @@ def preprocess_recalls_df(df: pd.DataFrame) -> pd.DataFrame:
     for col in cols_to_flag:
         df[f"was_missing_{col}"] = df[col].isna().astype("int8")
 
-    df["action"] = df.apply(
-        lambda r: r["action"] if pd.notna(r["action"]) else infer_action_from_text(r["action"], r["action_summary"], r["data_notes"]),
-        axis=1
-    )
-    df["action_classification"] = df["action_classification"].apply(normalize_classification).fillna("Unclassified")
+    missing = df["action"].isna()
+    df["action"] = df["action"].astype(object)
+    df.loc[missing, "action"] = infer_action_vec(df.loc[missing, "action"], df.loc[missing, "action_summary"], df.loc[missing, "data_notes"])
+    df["action_classification"] = normalize_classification_vec(df["action_classification"]).fillna("Unclassified")
 
     df["action_summary"] = df["action_summary"].fillna(df["action"]).fillna("No Summary")
-    df["action_summary"] = df["action_summary"].astype(str).str.replace(r"\s+", " ", regex=True).str.strip()
-    df["recall_severity"] = df["action_summary"].apply(extract_severity)
+    df["action_summary"] = _on_unique(df["action_summary"].astype(str), lambda u: u.str.replace(r"\s+", " ", regex=True).str.strip())
+    df["recall_severity"] = extract_severity_vec(df["action_summary"])
 
-    for dc in ["create_date","date_initiated_by_firm","date_posted","date_terminated","date_updated"]:
-        df[dc] = parse_date(df[dc])
+    for dc in DATE_COLUMNS:
+        df[dc] = parse_date(df[dc], date_formats.get(dc))
 
     m = df["date_initiated_by_firm"].isna() & df["date_posted"].notna()
     df.loc[m, "date_initiated_by_firm"] = df.loc[m, "date_posted"]
@@ -191,7 +261,7 @@ def preprocess_recalls_df(df: pd.DataFrame) -> pd.DataFrame:
                                  (df["date_terminated"] - df["date_initiated_by_firm"]).dt.days,
                                  (today - df["date_initiated_by_firm"]).dt.days)
 
-    df["determined_cause"] = df["determined_cause"].apply(normalize_cause).fillna("Cause Not Reported")
+    df["determined_cause"] = normalize_cause_vec(df["determined_cause"]).fillna("Cause Not Reported")
 
     for col in ["documents","authorities_link"]:
         df[col] = df[col].fillna("No Document Available")
@@ -204,7 +274,7 @@ def preprocess_recalls_df(df: pd.DataFrame) -> pd.DataFrame:
 
     for tcol in ["data_notes","reason","icij_notes"]:
         df[tcol] = df[tcol].fillna("not reported")
-        df[tcol] = df[tcol].astype(str).str.lower().str.replace(r"\s+", " ", regex=True).str.strip()
+        df[tcol] = _on_unique(df[tcol].astype(str), lambda u: u.str.lower().str.replace(r"\s+", " ", regex=True).str.strip())
 
     df["id"] = df["id"].astype(str).str.strip()
     df = df.drop_duplicates(subset=["id"], keep="first")
@@ -213,7 +283,7 @@ def preprocess_recalls_df(df: pd.DataFrame) -> pd.DataFrame:
         df[c] = df[c].astype("category")
 
     # ---- NEW FINALIZED CLASS ----
-    df["finalized_class"] = df.apply(assign_finalized_class, axis=1)
+    df["finalized_class"] = assign_finalized_class_vec(df)
 
     return df
 
@@ -221,14 +291,15 @@ def preprocess_recalls_df(df: pd.DataFrame) -> pd.DataFrame:
 # =========================
 # RUN ON YOUR FILE
 # =========================
-in_path  = "/content/FullDataset.csv"   # change to your uploaded path
-out_path = "/content/FullDataset_preprocessed.csv"
+if __name__ == "__main__":
+    in_path  = "/content/FullDataset.csv"   # change to your uploaded path
+    out_path = "/content/FullDataset_preprocessed.csv"
 
-df = pd.read_csv(in_path, dtype=str, keep_default_na=False, na_values=["", "NaN", "nan", "None", "null"])
-processed = preprocess_recalls_df(df)
+    df = pd.read_csv(in_path, dtype=str, keep_default_na=False, na_values=["", "NaN", "nan", "None", "null"])
+    processed = preprocess_recalls_df(df)
 
-processed.to_csv(out_path, index=False)
-print("✅ Preprocessed file saved at:", out_path)
+    processed.to_csv(out_path, index=False)
+    print("✅ Preprocessed file saved at:", out_path)
 
-# Preview
-print(processed[["id","action","action_classification","finalized_class","recall_severity","days_to_posted","days_active"]].head(10))
+    # Preview
+    print(processed[["id","action","action_classification","finalized_class","recall_severity","days_to_posted","days_active"]].head(10))
@@ -0,0 +1,212 @@
+"""
+Regression tests for dataprepipynb1.preprocess_recalls_df and chunked_preprocess
+Run: python -m pytest -q test_dataprep.py
+Benchmark: python test_dataprep.py --rows 200000
+"""
+
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import dataprepipynb1 as dp
+import chunked_preprocess as cp
+
+
+def original_parse_date(series: pd.Series) -> pd.Series:
+    """parse_date before fastdates: one format inferred from the first value, other layouts -> NaN."""
+    return pd.to_datetime(series, errors="coerce").dt.strftime("%Y-%m-%d")
+
+
+def per_value_parse_date(series: pd.Series) -> pd.Series:
+    """Every value parsed on its own: what parse_date now returns for a column mixing layouts."""
+    return pd.to_datetime(series.map(lambda v: pd.to_datetime(v, errors="coerce"))).dt.strftime("%Y-%m-%d")
+
+
+def reference_preprocess(df: pd.DataFrame, parse_date=original_parse_date) -> pd.DataFrame:
+    """preprocess_recalls_df as it was with the row-wise rule helpers (apply / axis=1)."""
+    df = df.copy()
+    expected = [
+        "id","action","action_classification","action_level","action_summary","authorities_link","country",
+        "create_date","data_notes","date","date_initiated_by_firm","date_posted","date_terminated","date_updated",
+        "determined_cause","documents","icij_notes","number","reason","source","status","target_audience",
+        "type","uid","uid_hash","url","slug","device_id","created_at","updated_at"
+    ]
+    for col in expected:
+        if col not in df.columns: df[col] = np.nan
+    df = df.replace({"": np.nan, "NaN": np.nan, "nan": np.nan, "None": np.nan, "null": np.nan})
+    cols_to_flag = ["action","action_classification","action_summary",
+                    "create_date","date_initiated_by_firm","date_posted",
+                    "date_terminated","date_updated","determined_cause",
+                    "documents","authorities_link","number","reason"]
+    for col in cols_to_flag:
+        df[f"was_missing_{col}"] = df[col].isna().astype("int8")
+    df["action"] = df.apply(
+        lambda r: r["action"] if pd.notna(r["action"]) else dp.infer_action_from_text(r["action"], r["action_summary"], r["data_notes"]),
+        axis=1
+    )
+    df["action_classification"] = df["action_classification"].apply(dp.normalize_classification).fillna("Unclassified")
+    df["action_summary"] = df["action_summary"].fillna(df["action"]).fillna("No Summary")
+    df["action_summary"] = df["action_summary"].astype(str).str.replace(r"\s+", " ", regex=True).str.strip()
+    df["recall_severity"] = df["action_summary"].apply(dp.extract_severity)
+    for dc in ["create_date","date_initiated_by_firm","date_posted","date_terminated","date_updated"]:
+        df[dc] = parse_date(df[dc])
+    m = df["date_initiated_by_firm"].isna() & df["date_posted"].notna()
+    df.loc[m, "date_initiated_by_firm"] = df.loc[m, "date_posted"]
+    df.loc[df["date_terminated"].isna(), "status"] = df["status"].fillna("Ongoing")
+    today = pd.to_datetime("today").normalize()
+    df["date_initiated_by_firm"] = pd.to_datetime(df["date_initiated_by_firm"], errors="coerce")
+    df["date_posted"] = pd.to_datetime(df["date_posted"], errors="coerce")
+    df["date_terminated"] = pd.to_datetime(df["date_terminated"], errors="coerce")
+    df["days_to_posted"] = (df["date_posted"] - df["date_initiated_by_firm"]).dt.days
+    df["days_active"] = np.where(df["date_terminated"].notna(),
+                                 (df["date_terminated"] - df["date_initiated_by_firm"]).dt.days,
+                                 (today - df["date_initiated_by_firm"]).dt.days)
+    df["determined_cause"] = df["determined_cause"].apply(dp.normalize_cause).fillna("Cause Not Reported")
+    for col in ["documents","authorities_link"]:
+        df[col] = df[col].fillna("No Document Available")
+    df["number"] = dp.normalize_number(df["number"])
+    pseudo = (df["country"].fillna("").astype(str).str.upper().str.replace(r"\s+", "", regex=True) +
+              df["create_date"].fillna("").astype(str).str.replace(r"\D", "", regex=True) +
+              df["id"].fillna("").astype(str))
+    df["number"] = df["number"].fillna(pseudo)
+    for tcol in ["data_notes","reason","icij_notes"]:
+        df[tcol] = df[tcol].fillna("not reported")
+        df[tcol] = df[tcol].astype(str).str.lower().str.replace(r"\s+", " ", regex=True).str.strip()
+    df["id"] = df["id"].astype(str).str.strip()
+    df = df.drop_duplicates(subset=["id"], keep="first")
+    for c in ["action","action_classification","recall_severity","status","determined_cause","country"]:
+        df[c] = df[c].astype("category")
+    df["finalized_class"] = df.apply(dp.assign_finalized_class, axis=1)
+    return df
+
+
+def make_raw(n=5_000, seed=0) -> pd.DataFrame:
+    """FullDataset.csv-like rows (all strings, as read with dtype=str) covering every rule branch."""
+    rng = np.random.default_rng(seed)
+    pick = lambda values: rng.choice(np.array(values, dtype=object), n)
+    return pd.DataFrame({
+        "id": pick([str(i) for i in range(n // 2)] + [" 7 ", "12"]),
+        "action": pick([None, None, "Recall", "Safety Alert", "", "null", "Field Safety Notice"]),
+        "action_classification": pick([None, "Class I", "class 2", "CLASS III:", "ci", "Class IIa", "none", "  ", "Class ii recall"]),
+        "action_summary": pick([None, "Recalls issued", "FSN sent to users", "Device may overheat and cause fire",
+                                "short", "Labeling typo in IFU", "An adverse event   was reported",
+                                "advise customers", "Packaging seal failure", "İnjury risk"]),
+        "data_notes": pick([None, "safety alert posted", "warning letter", "notes", "death reported"]),
+        "determined_cause": pick([None, "Device Design", "production process", "Software update", "  ",
+                                  "user error", "unknown", "Supplier component", "quality system"]),
+        "reason": pick([None, "Temporary injury possible", "mislabel", "clerical", "Explosion risk", "none given"]),
+        "status": pick([None, "Ongoing", "Terminated", "active"]),
+        "country": pick([None, "United States", "usa", "Germany "]),
+        "number": pick([None, "z-123-2020", "A 1/2", ""]),
+        "create_date": pick([None, "2020-01-05", "2019-12-31 10:00:00"]),
+        "date_initiated_by_firm": pick([None, "2019-11-01", "2018-01-01"]),
+        "date_posted": pick([None, "2020-02-01", "2019-05-07"]),
+        "date_terminated": pick([None, "2021-03-01"]),
+        "date_updated": pick([None, "2021-03-02"]),
+    })
+
+
+def test_preprocess_byte_identical():
+    raw = make_raw()
+    raw["create_date"] = raw["create_date"].str[:10]  # one layout per column, as the original parse assumed
+    expected = reference_preprocess(raw).to_csv(index=False)
+    assert dp.preprocess_recalls_df(raw).to_csv(index=False) == expected
+
+
+def test_mixed_date_layouts_are_kept():
+    # Intended change: the original parse inferred one format from the first value and turned every
+    # create_date in the other layout into NaN (and left those digits out of the pseudo `number` keys)
+    raw = make_raw()
+    got = dp.preprocess_recalls_df(raw)
+    assert got.to_csv(index=False) == reference_preprocess(raw, per_value_parse_date).to_csv(index=False)
+    old = reference_preprocess(raw)
+    changed = [c for c in got.columns if not got[c].astype(object).equals(old[c].astype(object))]
+    assert changed == ["number", "create_date"]
+    dropped = old["create_date"].isna() & got["create_date"].notna()
+    assert dropped.sum() > 0 and not (old["create_date"].notna() & (old["create_date"] != got["create_date"])).any()
+    layout = lambda rows: set(raw.loc[rows.index[rows], "create_date"].str.len())  # 10: date, 19: date + time
+    assert layout(dropped).isdisjoint(layout(old["create_date"].notna()))
+
+
+def test_preprocess_no_missing_actions_and_missing_columns():
+    raw = make_raw(500, seed=1)
+    raw["action"] = "Recall"
+    raw = raw.drop(columns=["data_notes", "determined_cause"])
+    expected = reference_preprocess(raw, per_value_parse_date).to_csv(index=False)
+    assert dp.preprocess_recalls_df(raw).to_csv(index=False) == expected
+
+
+def test_vectorized_rules_match_scalar_helpers():
+    raw = make_raw(2_000, seed=2)
+    s = raw["action_summary"]
+    assert list(dp.extract_severity_vec(s)) == [dp.extract_severity(x) for x in s]
+    for vec, fn, col in [(dp.normalize_cause_vec, dp.normalize_cause, "determined_cause"),
+                         (dp.normalize_classification_vec, dp.normalize_classification, "action_classification")]:
+        got, want = vec(raw[col]), pd.Series([fn(x) for x in raw[col]], index=raw.index)
+        pd.testing.assert_series_equal(got, want, check_dtype=False, check_names=False)
+    want = [dp.infer_action_from_text(a, b, c) for a, b, c in zip(raw["action"], s, raw["data_notes"])]
+    assert list(dp.infer_action_vec(raw["action"], s, raw["data_notes"])) == want
+
+
+def _comparable(df: pd.DataFrame) -> pd.DataFrame:
+    # per-chunk category lists and int/float days differ by construction; the values must not
+    df = df.reset_index(drop=True)
+    for c in df.columns:
+        if isinstance(df[c].dtype, pd.CategoricalDtype):
+            df[c] = df[c].astype(object)
+        elif c.startswith("days_"):
+            df[c] = df[c].astype(float)
+        if df[c].dtype == object:
+            df[c] = df[c].where(df[c].notna(), None)
+    return df
+
+
+def test_chunked_runner_matches_single_frame(tmp_path):
+    pytest.importorskip("pyarrow")
+    raw = make_raw(3_000, seed=3)
+    raw.loc[::7, "action_summary"] = 'Multi-line "quoted"\nsummary, with comma'
+    # mm/dd dates, but the first row only reads as dd/mm: a format guessed from row 0 would
+    # read 03/05 as 3 May in the chunks and as 5 March in the single-frame run
+    raw["date_posted"] = np.random.default_rng(4).choice(
+        np.array(["03/05/2020", "12/25/2019", "01/02/2021", "12/31/2020", "11/30/2019", None], dtype=object), len(raw))
+    raw.loc[0, "date_posted"] = "25/12/2019"
+    src = tmp_path / "FullDataset.csv"
+    raw.to_csv(src, index=False)
+
+    header, ranges = cp.split_byte_ranges(str(src), chunk_bytes=16_384)
+    assert len(ranges) > 4 and ranges[0][0] == len(header) and ranges[-1][1] == src.stat().st_size
+    assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+
+    expected = dp.preprocess_recalls_df(pd.read_csv(src, **cp.READ_KWARGS))
+    assert cp.detect_date_formats(str(src))["date_posted"] == "%m/%d/%Y"
+    assert (expected["date_posted"] == "2020-03-05").any()
+    for workers in (1, 2):
+        out = tmp_path / f"out{workers}"
+        stats = cp.preprocess_file(str(src), str(out), chunk_bytes=16_384, workers=workers)
+        got = pd.read_parquet(out)
+        assert stats["rows_out"] == len(got) == len(expected) and stats["duplicates_dropped"] > 0
+        pd.testing.assert_frame_equal(_comparable(got), _comparable(expected), check_dtype=False)
+        assert all(mb > 0 for mb in stats["peak_rss_mb"].values())
+
+
+def test_split_rejects_unbalanced_quotes(tmp_path):
+    src = tmp_path / "FullDataset.csv"
+    src.write_bytes(b'id,action_summary\n1,"ok, quoted"\n2,12" tube cracked\n3,fine\n')
+    with pytest.raises(ValueError, match="odd number"):
+        cp.split_byte_ranges(str(src), chunk_bytes=8)
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser()
+    p.add_argument("--rows", type=int, default=200_000)
+    args = p.parse_args()
+    raw = make_raw(args.rows)
+    for name, fn in [("preprocess_recalls_df", dp.preprocess_recalls_df),
+                     ("reference (row-wise)", lambda df: reference_preprocess(df, per_value_parse_date))]:
+        t = time.perf_counter()
+        out = fn(raw).to_csv(index=False)
+        print(f"{name:22s} {args.rows:>9,} rows: {time.perf_counter() - t:7.2f} s")
+    print("byte-identical:", dp.preprocess_recalls_df(raw).to_csv(index=False) == out)
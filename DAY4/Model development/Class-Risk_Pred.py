@@ -16,6 +16,7 @@ Original file is located at
 import warnings
 warnings.filterwarnings("ignore")
 
+
 import numpy as np
 import pandas as pd
 
@@ -27,6 +28,9 @@ from sklearn.preprocessing import OrdinalEncoder
 from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import classification_report, confusion_matrix
 
+# Star-schema join layer (common package at the repo root)
+from common.star_join import StarJoin
+
 # -----------------------------
 # 1) Load CSVs (robust encoding)
 # -----------------------------
@@ -35,21 +39,21 @@ manufacturers = pd.read_csv("manufacturer_cleaned.csv", encoding="ISO-8859-1", l
 events = pd.read_csv("events_cleaned.csv", encoding="ISO-8859-1", low_memory=False)
 
 # -----------------------------
-# 2) Merge: events → devices → manufacturers
+# 2) Join: events → devices → manufacturers
+#    (devices/manufacturers stay separate tables; only the
+#     columns used below are gathered, by row position)
 # -----------------------------
-df = (
-    events.merge(devices, left_on="device_id", right_on="id", how="left", suffixes=("", "_device"))
-          .merge(manufacturers, left_on="manufacturer_id", right_on="id", how="left", suffixes=("", "_manufacturer"))
-)
+star = StarJoin(events, devices, manufacturers)
+print("🧠 Memory vs wide merge:", star.memory_report())
 
 # -----------------------------
 # 3) Target = action_classification (drop rows with missing target)
 # -----------------------------
-if "action_classification" not in df.columns:
+if "action_classification" not in star.columns:
     raise ValueError("Column 'action_classification' not found. Check the CSV headers.")
 
-df = df[df["action_classification"].notna()].copy()
-y = df["action_classification"].astype(str)
+star = star.where(star.column("action_classification").notna())
+y = star.column("action_classification").astype(str)
 
 # ---------------------------------------------------------
 # 4) Keep a SMALL, useful feature set (RAM-friendly choice)
@@ -63,12 +67,12 @@ candidate_feature_cols = [
     # (Avoid large free-text/date fields to keep memory low)
 ]
 
-feature_cols = [c for c in candidate_feature_cols if c in df.columns]
+feature_cols = [c for c in candidate_feature_cols if c in star.columns]
 if not feature_cols:
     raise ValueError("None of the expected feature columns were found. "
                      "Check your CSVs or add more columns to 'candidate_feature_cols'.")
 
-X = df[feature_cols].copy()
+X = star.frame(feature_cols)
 
 # ---------------------------------
 # 5) Split train/test (with stratify)
@@ -136,11 +140,11 @@ print(confusion_matrix(y_test, y_pred))
 #    (with Risk % output)
 # -------------------------------------------------------
 def predict_device_severity(device_id):
-    subset = df[df["device_id"] == device_id]
-    if subset.empty:
+    rows = star.device_rows(device_id)
+    if len(rows) == 0:
         return f"❌ Device ID {device_id} not found in merged data."
 
-    X_new = subset[feature_cols].copy()
+    X_new = star.frame(feature_cols, rows)
     preds = clf.predict(X_new)
     probs = clf.predict_proba(X_new) if hasattr(clf, "predict_proba") else None
 
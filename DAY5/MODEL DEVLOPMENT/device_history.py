@@ -0,0 +1,94 @@
+"""
+Device history features
+-----------------------
+Per-device features for the device failure Random Forest (DecisionTreeClassifier.py),
+computed with grouped aggregations over the whole events frame instead of one
+groupby group at a time. Training and serving both call device_history_features,
+so a device's features are always computed the same way.
+
+Columns (one row per device_id, sorted by device_id):
+  total_recalls, avg_duration, avg_gap, class1_pct, class2_pct, class3_pct,
+  days_since_last, target_failure_180d
+
+Usage:
+  from device_history import device_history_features
+  features_df = device_history_features(events_df)                      # training set
+  row = device_history_features(events_df, device_ids=[12710])          # serving
+  labelled = device_history_features(events_df, asof="2023-01-01")      # history up to a cutoff, target after it
+"""
+
+import pandas as pd
+
+# Shared unique-value date parser (common package at the repo root)
+from common.fastdates import parse_dates
+
+DATE_COLS = ["date_initiated_by_firm", "date_updated", "date_terminated"]
+CLASS_SHARES = {"Class I": "class1_pct", "Class II": "class2_pct", "Class III": "class3_pct"}
+FEATURE_COLS = ["total_recalls", "avg_duration", "avg_gap", "class1_pct", "class2_pct", "class3_pct", "days_since_last"]
+
+
+def device_history_features(events: pd.DataFrame, device_ids=None, now=None, asof=None,
+                            horizon_days: int = 180) -> pd.DataFrame:
+    """Features per device from its events (date columns may still be strings).
+
+    asof: only events initiated on or before it count as history, and the target is whether
+          the device's next event after it falls within horizon_days of its last history event.
+          Without asof the next event after the last one is always missing, so the target is 0
+          for every device, exactly as in the original per-device loop.
+    now:  reference date for days_since_last (default: asof, else the current time).
+    """
+    e = events if device_ids is None else events[events["device_id"].isin(device_ids)]
+    e = e.copy(deep=False)
+    for c in DATE_COLS:
+        if c in e.columns and not pd.api.types.is_datetime64_any_dtype(e[c]):
+            e[c] = parse_dates(e[c])
+    init = "date_initiated_by_firm"
+    now = pd.Timestamp(now if now is not None else asof if asof is not None else pd.Timestamp.now())
+
+    future = None
+    if asof is not None:
+        after = e[init] > pd.Timestamp(asof)
+        future = e.loc[after].groupby("device_id")[init].min()
+        e = e.loc[~after]
+
+    e = e.sort_values(["device_id", init], kind="mergesort", ignore_index=True)  # NaT last within a device
+    dev = e["device_id"]
+    g = e.groupby(dev, sort=True)
+    out = pd.DataFrame(index=pd.Index(g.size().index, name="device_id"))
+
+    # Failure counts
+    out["total_recalls"] = (e["action"] == "Recall").groupby(dev).sum() if "action" in e.columns else 0
+
+    # Average recall duration (days), 0 when no event has both dates
+    if "date_terminated" in e.columns:
+        durations = (e["date_terminated"] - e[init]).dt.days
+        out["avg_duration"] = durations.groupby(dev).mean().fillna(0)
+    else:
+        out["avg_duration"] = 0
+
+    # Time between consecutive recalls (days)
+    out["avg_gap"] = g[init].diff().dt.days.groupby(dev).mean().fillna(0)
+
+    # Severity distribution: shares of the non-null classifications
+    if "action_classification" in e.columns:
+        counts = e.groupby([dev, "action_classification"], observed=True).size().unstack(fill_value=0)
+        shares = counts.div(counts.sum(axis=1), axis=0)
+        for cls, col in CLASS_SHARES.items():
+            out[col] = shares[cls].reindex(out.index, fill_value=0) if cls in shares.columns else 0.0
+            out[col] = out[col].fillna(0)
+    else:
+        for col in CLASS_SHARES.values():
+            out[col] = 0
+
+    # Recency (days since last recall)
+    last = g[init].max()
+    out["days_since_last"] = (now - last).dt.days
+
+    # Target: next event within horizon_days of the last one
+    if future is not None:
+        gap = (future.reindex(out.index) - last).dt.days
+        out["target_failure_180d"] = (gap <= horizon_days).astype(int)
+    else:
+        out["target_failure_180d"] = 0
+
+    return out.reset_index()
@@ -0,0 +1,118 @@
+"""
+Tests for device_history.device_history_features
+Run: python -m pytest -q test_device_history.py
+Benchmark: python test_device_history.py --events 1000000 --devices 200000
+"""
+
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from device_history import device_history_features
+
+NOW = pd.Timestamp("2025-01-01")
+
+
+def reference_features(df: pd.DataFrame, now=NOW) -> pd.DataFrame:
+    """The per-device loop DecisionTreeClassifier.py used (datetime.now() pinned to `now`)."""
+    df = df.copy()
+    for col in ["date_initiated_by_firm", "date_updated", "date_terminated"]:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], errors="coerce")
+    df = df.sort_values(by=["device_id", "date_initiated_by_firm"])
+    features = []
+    for device, group in df.groupby("device_id"):
+        group = group.sort_values("date_initiated_by_firm")
+        total_recalls = (group["action"] == "Recall").sum() if "action" in df.columns else 0
+        if "date_terminated" in df.columns and "date_initiated_by_firm" in df.columns:
+            durations = (group["date_terminated"] - group["date_initiated_by_firm"]).dt.days.dropna()
+            avg_duration = durations.mean() if not durations.empty else 0
+        else:
+            avg_duration = 0
+        gaps = group["date_initiated_by_firm"].diff().dt.days.dropna()
+        avg_gap = gaps.mean() if not gaps.empty else 0
+        if "action_classification" in df.columns:
+            class_counts = group["action_classification"].value_counts(normalize=True).to_dict()
+            class1_pct = class_counts.get("Class I", 0)
+            class2_pct = class_counts.get("Class II", 0)
+            class3_pct = class_counts.get("Class III", 0)
+        else:
+            class1_pct = class2_pct = class3_pct = 0
+        last_event = group["date_initiated_by_firm"].max()
+        days_since_last = (now - last_event).days if pd.notna(last_event) else np.nan
+        next_event = group["date_initiated_by_firm"].shift(-1)
+        if pd.notna(next_event.iloc[-1]) and pd.notna(last_event):
+            target = 1 if (next_event.iloc[-1] - last_event).days <= 180 else 0
+        else:
+            target = 0
+        features.append({
+            "device_id": device, "total_recalls": total_recalls, "avg_duration": avg_duration, "avg_gap": avg_gap,
+            "class1_pct": class1_pct, "class2_pct": class2_pct, "class3_pct": class3_pct,
+            "days_since_last": days_since_last, "target_failure_180d": target,
+        })
+    return pd.DataFrame(features)
+
+
+def make_events(n_events=20_000, n_devices=3_000, seed=0) -> pd.DataFrame:
+    """events_cleaned_label_encoded.csv-like rows: string dates, some missing, one-event devices."""
+    rng = np.random.default_rng(seed)
+
+    def dates(p_null, start=0):
+        d = pd.Timestamp("2010-01-01") + pd.to_timedelta(start + rng.integers(0, 5_000, n_events), unit="D")
+        s = pd.Series(d.strftime("%Y-%m-%d"), dtype=object)
+        s[rng.random(n_events) < p_null] = None
+        return s
+
+    return pd.DataFrame({
+        "id": np.arange(n_events),
+        "device_id": rng.integers(1, n_devices + 1, n_events),
+        "action": rng.choice(["Recall", "Safety Alert", "FSN"], n_events),
+        "action_classification": rng.choice(["Class I", "Class II", "Class III", None], n_events),
+        "date_initiated_by_firm": dates(0.05),
+        "date_updated": dates(0.3),
+        "date_terminated": dates(0.4, start=60),
+    })
+
+
+def test_matches_per_device_loop():
+    events = make_events()
+    pd.testing.assert_frame_equal(device_history_features(events, now=NOW), reference_features(events),
+                                  check_dtype=False)
+
+
+def test_missing_optional_columns_and_serving_subset():
+    events = make_events(3_000, 400, seed=1).drop(columns=["action", "action_classification", "date_terminated"])
+    pd.testing.assert_frame_equal(device_history_features(events, now=NOW), reference_features(events),
+                                  check_dtype=False)
+    events = make_events(3_000, 400, seed=2)
+    full = device_history_features(events, now=NOW).set_index("device_id")
+    one = device_history_features(events, device_ids=[7, 11], now=NOW).set_index("device_id")
+    pd.testing.assert_frame_equal(one, full.loc[[7, 11]])
+
+
+def test_asof_target():
+    events = pd.DataFrame({
+        "device_id": [1, 1, 1, 2, 2, 3],
+        "date_initiated_by_firm": ["2020-01-01", "2020-06-01", "2020-09-01", "2020-05-01", "2021-06-01", "2020-07-01"],
+    })
+    out = device_history_features(events, asof="2020-07-15").set_index("device_id")
+    # 1: last 2020-06-01, next 2020-09-01 (92 days); 2: next is 396 days later; 3: no later event
+    assert out["target_failure_180d"].to_dict() == {1: 1, 2: 0, 3: 0}
+    assert out.loc[1, "days_since_last"] == 44
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser()
+    p.add_argument("--events", type=int, default=1_000_000)
+    p.add_argument("--devices", type=int, default=200_000)
+    args = p.parse_args()
+    events = make_events(args.events, args.devices)
+    for name, fn in [("device_history_features", lambda: device_history_features(events, now=NOW)),
+                     ("reference (per-device loop)", lambda: reference_features(events))]:
+        t = time.perf_counter()
+        out = fn()
+        print(f"{name:28s} {args.events:>9,} events / {out.shape[0]:,} devices: {time.perf_counter() - t:7.2f} s")
+    pd.testing.assert_frame_equal(device_history_features(events, now=NOW), out, check_dtype=False)
+    print("identical output")
@@ -0,0 +1,89 @@
+
+import sys, json, argparse, logging
+import multiprocessing as mp
+from time import perf_counter
+
+def _peak_rss_mb():
+    """(self, largest child) peak RSS in MB for the current process."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        import psutil
+        return psutil.Process().memory_info().peak_wset / 2**20, float("nan")
+    scale = 1 / 2**20 if sys.platform == "darwin" else 1 / 1024  # bytes on macOS, KB on Linux
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+    child = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale
+    return own, child
+
+def _child(fn, args, kwargs, q):
+    t0 = perf_counter()
+    fn(*args, **kwargs)
+    wall = perf_counter() - t0
+    own, child = _peak_rss_mb()
+    q.put(dict(wall_s=round(wall, 3), peak_rss_mb=round(own, 1), peak_worker_rss_mb=round(child, 1)))
+
+def run_isolated(fn, *args, **kwargs):
+    # Fresh interpreter per measurement so ru_maxrss is not polluted by earlier runs
+    ctx = mp.get_context("spawn")
+    q = ctx.Queue()
+    p = ctx.Process(target=_child, args=(fn, args, kwargs, q))
+    p.start()
+    p.join()
+    if p.exitcode != 0:
+        raise RuntimeError(f"{getattr(fn, '__name__', fn)} failed in benchmark subprocess (exit {p.exitcode})")
+    return q.get()
+
+def bench_ingest(data_dir, date_cols, parquet_dir=None, max_workers=None):
+    from .ingest import ingest_all, ingest_all_typed
+    return {
+        "legacy": run_isolated(ingest_all, data_dir, date_cols),
+        "typed": run_isolated(ingest_all_typed, data_dir, date_cols, out_dir=parquet_dir, max_workers=max_workers),
+    }
+
+def synthetic_cv_frame(n_rows=200_000, n_features=50, years=range(2015, 2024), seed=0):
+    import numpy as np
+    import pandas as pd
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(rng.normal(size=(n_rows, n_features)).astype("float32"), columns=[f"f{i:03d}" for i in range(n_features)])
+    df["year"] = rng.choice(list(years), n_rows)
+    df["y"] = (df["f000"] + 0.5 * df["f001"] + rng.normal(size=n_rows) > 2.0).astype(int)
+    return df
+
+def _cv_run(df, out_dir, n_workers, params):
+    from .modeling import train_temporal_cv
+    features = [c for c in df.columns if c != "y"]
+    train_temporal_cv(df, features, "y", "year", out_dir, params=params, n_workers=n_workers)
+
+def bench_cv(out_dir, workers=(1, 2, 4), n_rows=200_000, n_features=50, params=None):
+    df = synthetic_cv_frame(n_rows, n_features)
+    params = params or dict(n_estimators=500)
+    return {f"workers={w}": run_isolated(_cv_run, df, out_dir, w, params) for w in workers}
+
+if __name__ == "__main__":
+    import yaml
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s")
+    p = argparse.ArgumentParser()
+    p.add_argument("what", choices=["ingest", "cv", "check_ingest"])
+    p.add_argument("--data_dir", type=str, default=None)
+    p.add_argument("--out_dir", type=str, default="./outputs/bench")
+    p.add_argument("--rows", type=int, default=200_000)
+    p.add_argument("--config", type=str, default="config.yaml")
+    p.add_argument("--parquet_dir", type=str, default=None)
+    p.add_argument("--workers", type=int, nargs="+", default=None)
+    args = p.parse_args()
+    if args.what == "ingest":
+        with open(args.config, "r") as f:
+            cfg = yaml.safe_load(f)
+        res = bench_ingest(args.data_dir, cfg["date_cols"], args.parquet_dir, args.workers[0] if args.workers else None)
+    elif args.what == "check_ingest":
+        from .ingest import compare_null_masks
+        with open(args.config, "r") as f:
+            cfg = yaml.safe_load(f)
+        res = compare_null_masks(args.data_dir, cfg["date_cols"])
+        if res:
+            print(json.dumps(res, indent=2))
+            sys.exit("Null masks differ between legacy and typed ingest")
+        res = {"null_masks": "identical"}
+    elif args.what == "cv":
+        res = bench_cv(args.out_dir, tuple(args.workers or (1, 2, 4)), n_rows=args.rows)
+    print(json.dumps(res, indent=2))
@@ -1,10 +1,12 @@
 
+import os
 from typing import List, Dict
 import numpy as np
 import pandas as pd
+import joblib
 from collections import defaultdict
 from dateutil import tz
-from .utils import monthly_index, month_floor, safe_merge
+from .utils import monthly_index, month_floor, safe_merge, cache_key
 
 UTC = tz.UTC
 
@@ -56,40 +58,74 @@ def build_device_month_frame(event, device, manufacturer):
 
     return frame
 
-def derive_serious_flags(event: pd.DataFrame, mdr: pd.DataFrame, serious_classes: List[str]):
-    # Normalize seriousness from event types
-    evt = event.copy()
-    for c in ["action_classification","type","status","reason","action_summary"]:
-        if c in evt.columns:
-            evt[c] = evt[c].astype(str).str.lower()
+SERIOUS_TOKENS = ["1","true","yes","y","t"]
+
+def _on_unique(s: pd.Series, pred) -> np.ndarray:
+    # Evaluate a vectorized string predicate on the distinct values only, then broadcast by code.
+    # NaN gets code -1 and is matched as the string "nan", like astype(str) would.
+    codes, uniq = pd.factorize(s, sort=False)
+    u = pd.Series(np.append(np.asarray(uniq, dtype=object).astype(str), "nan"))
+    return pred(u).to_numpy(dtype=bool)[codes]
 
+def _serious_value(u: pd.Series) -> pd.Series:
+    return u.isin(SERIOUS_TOKENS) | (u.str.contains("death", regex=False) & ~u.str.contains("no", regex=False))
+
+def _event_serious(event: pd.DataFrame, serious_classes: List[str]):
+    evt = event[["device_id","date_posted"]].copy()
     evt["is_serious"] = False
-    if "action_classification" in evt.columns:
-        evt["is_serious"] = evt["action_classification"].str.contains("|".join([s.lower() for s in serious_classes]), na=False) | evt["type"].str.contains("fsca|fsqa", na=False)
+    if "action_classification" in event.columns:
+        patt = "|".join([s.lower() for s in serious_classes])
+        ser = _on_unique(event["action_classification"], lambda u: u.str.lower().str.contains(patt, na=False))
+        ser |= _on_unique(event["type"], lambda u: u.str.lower().str.contains("fsca|fsqa", na=False))
+        evt["is_serious"] = ser
+    evt["source"] = "event"
+    return evt
+
+def _mdr_serious(mdr: pd.DataFrame):
+    # Heuristic: look for columns indicating serious/death
+    flag_cols = [c for c in mdr.columns if any(k in c for k in ["death","serious","life_threat","hospital"])]
+    is_serious = np.zeros(len(mdr), dtype=bool)
+    for c in flag_cols:
+        # only death/serious/injury columns are lowercased before matching
+        low = any(k in c for k in ["death","serious","injury"])
+        is_serious |= _on_unique(mdr[c], lambda u, low=low: _serious_value(u.str.lower() if low else u))
+    # Standardize link to device_id if present
+    guess_dev_col = next((c for c in ["device_id","di","udi","model_number","catalog_number"] if c in mdr.columns), None)
+    if not guess_dev_col:
+        return None
+    mdr_ser = mdr[[guess_dev_col,"date"]].rename(columns={guess_dev_col:"device_id","date":"date_posted"})
+    mdr_ser["is_serious"] = is_serious
+    mdr_ser["source"] = "mdr"
+    return mdr_ser
+
+def _cached(df: pd.DataFrame, name: str, params, cache_dir, fn):
+    # Cache keyed by the source files behind df (set by ingest), the ingest path, the frame's
+    # shape and dtypes (legacy vs typed ingest give different rows/dtypes), plus the rule parameters
+    sources = df.attrs.get("sources") if cache_dir else None
+    if not sources:
+        return fn()
+    shape = [df.attrs.get("ingest"), list(df.shape), {c: str(dt) for c, dt in df.dtypes.items()}]
+    path = os.path.join(cache_dir, f"serious_{name}_{cache_key(sources, shape, params)}.pkl")
+    if os.path.exists(path):
+        return joblib.load(path)
+    res = fn()
+    os.makedirs(cache_dir, exist_ok=True)
+    joblib.dump(res, path)
+    return res
+
+def derive_serious_flags(event: pd.DataFrame, mdr: pd.DataFrame, serious_classes: List[str], cache_dir=None):
+    # Normalize seriousness from event types
+    evt = _cached(event, "event", sorted(serious_classes), cache_dir, lambda: _event_serious(event, serious_classes))
 
     # MAUDE serious/death
     mdr_ser = None
     if mdr is not None and len(mdr):
-        mdr = mdr.copy()
-        for c in mdr.columns:
-            if "death" in c or "serious" in c or "injury" in c:
-                mdr[c] = mdr[c].astype(str).str.lower()
-        # Heuristic: look for columns indicating serious/death
-        flag_cols = [c for c in mdr.columns if any(k in c for k in ["death","serious","life_threat","hospital"])]
-        mdr["is_serious"] = False
-        if flag_cols:
-            mdr["is_serious"] = mdr[flag_cols].apply(lambda r: any(str(v) in ["1","true","yes","y","t"] or ("death" in str(v) and "no" not in str(v)) for v in r), axis=1)
-        # Standardize link to device_id if present
-        guess_dev_col = next((c for c in ["device_id","di","udi","model_number","catalog_number"] if c in mdr.columns), None)
-        if guess_dev_col:
-            mdr_ser = mdr[[guess_dev_col,"is_serious","date"]].rename(columns={guess_dev_col:"device_id","date":"date_posted"})
-            mdr_ser["source"] = "mdr"
+        mdr_ser = _cached(mdr, "mdr", None, cache_dir, lambda: _mdr_serious(mdr))
     # Combine
-    evt["source"] = "event"
     if mdr_ser is not None:
         aligned = pd.concat([evt[["device_id","date_posted","is_serious","source"]], mdr_ser], ignore_index=True)
     else:
-        aligned = evt[["device_id","date_posted","is_serious","source"]]
+        aligned = evt[["device_id","date_posted","is_serious","source"]].copy()
     aligned["date_posted"] = pd.to_datetime(aligned["date_posted"], errors="coerce", utc=True)
     aligned = aligned.dropna(subset=["device_id","date_posted"])
     return aligned
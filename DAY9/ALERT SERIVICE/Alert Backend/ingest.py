@@ -1,9 +1,11 @@
 
 import os
 import glob
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import numpy as np
-from .utils import standardize_columns, parse_dates_safe
+from .utils import standardize_columns, parse_dates_safe, to_snake, file_fingerprint
+from .schemas import get_schema, apply_schema
 
 READ_KW = dict(dtype=str, low_memory=False)
 
@@ -16,7 +18,10 @@ def read_first_match(pattern: str):
     files = sorted(glob.glob(pattern))
     if not files:
         return None
-    return _read_any(files[0])
+    df = _read_any(files[0])
+    df.attrs["sources"] = file_fingerprint(files[:1])
+    df.attrs["ingest"] = "legacy"
+    return df
 
 def ingest_all(data_dir: str, date_cols):
     out = {}
@@ -47,7 +52,107 @@ def ingest_all(data_dir: str, date_cols):
                 ch = parse_dates_safe(ch, date_cols)
                 chunks.append(ch)
         out["mdr"] = pd.concat(chunks, ignore_index=True) if chunks else None
+        if out["mdr"] is not None:
+            out["mdr"].attrs["sources"] = file_fingerprint(mdr_files)
+            out["mdr"].attrs["ingest"] = "legacy"
     else:
         out["mdr"] = None
 
     return out
+
+# ---- Typed ingest: schema registry + process pool + pyarrow CSV engine ----
+
+def _read_csv_arrow(path):
+    # Every column as a nullable arrow string with pandas' default NA tokens, so blanks stay
+    # NaN and numbers keep their original text (pandas' dtype=str on the pyarrow engine casts
+    # after inference: "" -> "None", "1" -> "1.0")
+    import pyarrow as pa
+    from pyarrow import csv as pacsv
+    from pandas._libs.parsers import STR_NA_VALUES
+    cols = pd.read_csv(path, nrows=0).columns
+    tbl = pacsv.read_csv(path, convert_options=pacsv.ConvertOptions(
+        column_types={c: pa.string() for c in cols},
+        null_values=sorted(STR_NA_VALUES),
+        strings_can_be_null=True,
+    ))
+    df = tbl.to_pandas()
+    return df.where(df.notna(), np.nan)
+
+def _read_typed(path, table, date_cols):
+    # Runs in a worker process; everything is read as string by pyarrow, then cast once
+    if path.endswith(".parquet"):
+        df = pd.read_parquet(path)
+    else:
+        df = _read_csv_arrow(path)
+    df.columns = [to_snake(c) for c in df.columns]
+    if table is not None:
+        df = apply_schema(df, table, extra_date_cols=date_cols)
+    return df
+
+def _dedup(df, table):
+    key = get_schema(table)["key"] if table is not None else None
+    if key and all(k in df.columns for k in key):
+        return df.drop_duplicates(subset=key, ignore_index=True)
+    return df.drop_duplicates(ignore_index=True)
+
+def ingest_all_typed(data_dir: str, date_cols, out_dir=None, max_workers=None):
+    """Same output as ingest_all, but typed per SCHEMAS, read in parallel, deduplicated
+    and (optionally) written to out_dir as <table>.parquet."""
+    jobs = {}
+    for name, pattern in (("event", "event.*"), ("device", "device.*"), ("manufacturer", "manufacturer.*"),
+                          ("res", "res.csv"), ("gudid", "gudid.csv")):
+        files = sorted(glob.glob(os.path.join(data_dir, pattern)))
+        if files:
+            jobs[name] = [files[0]]
+    mdr_files = sorted(glob.glob(os.path.join(data_dir, "mdr*.csv")))
+    if mdr_files:
+        jobs["mdr"] = mdr_files
+
+    typed = {"event", "device", "manufacturer", "mdr"}
+    out = {name: None for name in ("event", "device", "manufacturer", "res", "gudid", "mdr")}
+    with ProcessPoolExecutor(max_workers=max_workers) as ex:
+        futs = {name: [ex.submit(_read_typed, f, name if name in typed else None, date_cols) for f in files]
+                for name, files in jobs.items()}
+        for name, fs in futs.items():
+            parts = [f.result() for f in fs]
+            df = parts[0] if len(parts) == 1 else pd.concat(parts, ignore_index=True)
+            if name in typed:
+                if len(parts) > 1:
+                    # categories differ per file, so concat degrades them to object
+                    for c, dt in get_schema(name)["dtypes"].items():
+                        if dt == "category" and c in df.columns:
+                            df[c] = df[c].astype("category")
+                df = _dedup(df, name)
+            df.attrs["sources"] = file_fingerprint(jobs[name])
+            df.attrs["ingest"] = "typed"
+            out[name] = df
+
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+        for name, df in out.items():
+            if df is not None:
+                df.to_parquet(os.path.join(out_dir, f"{name}.parquet"), index=False)
+    return out
+
+def compare_null_masks(data_dir: str, date_cols, max_workers=None) -> dict:
+    """Per table, columns whose null mask differs between ingest_all and ingest_all_typed
+    (rows aligned on the dedup key; compared on the typed rows only)."""
+    legacy, typed = ingest_all(data_dir, date_cols), ingest_all_typed(data_dir, date_cols, max_workers=max_workers)
+    out = {}
+    for name, t in typed.items():
+        l = legacy.get(name)
+        if t is None or l is None:
+            continue
+        key = get_schema(name)["key"] if name in ("event", "device", "manufacturer", "mdr") else None
+        if key and all(k in l.columns for k in key):
+            l = l.drop_duplicates(subset=key, ignore_index=True)
+        else:
+            l = l.drop_duplicates(ignore_index=True)
+        cols = [c for c in t.columns if c in l.columns]
+        if len(l) != len(t):
+            out[name] = [f"row count {len(l)} != {len(t)}"]
+            continue
+        bad = [c for c in cols if not (l[c].isna().to_numpy() == t[c].isna().to_numpy()).all()]
+        if bad:
+            out[name] = bad
+    return out
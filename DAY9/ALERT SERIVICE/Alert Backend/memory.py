@@ -0,0 +1,86 @@
+
+import re
+import logging
+import numpy as np
+import pandas as pd
+
+# Column-name families produced by features.py / text_feats.py
+GROUPS = [
+    ("embeddings", re.compile(r"^emb_\d+$")),
+    ("keywords", re.compile(r"^kw_")),
+    ("counts", re.compile(r"(_cnt|_cnt_roll_\d+m)$")),
+    ("ratios", re.compile(r"^severe_ratio_")),
+]
+
+def column_group(col: str, dtype) -> str:
+    for name, patt in GROUPS:
+        if patt.search(col):
+            return name
+    if isinstance(dtype, pd.CategoricalDtype) or pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype):
+        return "categorical"
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return "datetime"
+    return "numeric"
+
+def _smallest_int(s: pd.Series) -> str:
+    # Integer-valued and NaN-free -> narrowest of int16/int32, otherwise float32
+    if s.isna().any() or not (s % 1 == 0).all():
+        return "float32"
+    lo, hi = (s.min(), s.max()) if len(s) else (0, 0)
+    for dt in ("int16", "int32"):
+        info = np.iinfo(dt)
+        if info.min <= lo and hi <= info.max:
+            return dt
+    return "int64"
+
+def plan_dtypes(df: pd.DataFrame, features, emb_dtype="float32") -> dict:
+    """Target dtype per feature column: counts -> int16/int32, embeddings -> float32/float16,
+    keyword flags -> uint8, strings -> category, other floats -> float32."""
+    plan = {}
+    for c in features:
+        dt = df[c].dtype
+        g = column_group(c, dt)
+        if g == "embeddings":
+            plan[c] = emb_dtype
+        elif g == "keywords":
+            plan[c] = "uint8"
+        elif g == "counts":
+            plan[c] = _smallest_int(df[c])
+        elif g == "categorical":
+            plan[c] = "category"
+        elif g in ("ratios", "numeric") and pd.api.types.is_numeric_dtype(dt) and not pd.api.types.is_bool_dtype(dt):
+            plan[c] = "float32" if pd.api.types.is_float_dtype(dt) else _smallest_int(df[c])
+    return plan
+
+def _safe_dtype(s: pd.Series, dt: str) -> str:
+    # The plan comes from training ranges; new data may hold NaN or larger counts
+    if not dt.startswith(("int", "uint")) or not pd.api.types.is_numeric_dtype(s.dtype) or pd.api.types.is_bool_dtype(s.dtype):
+        return dt
+    if s.isna().any() or not (s % 1 == 0).all():
+        return "float32"
+    info = np.iinfo(dt)
+    if len(s) and (s.min() < info.min or s.max() > info.max):
+        return _smallest_int(s)
+    return dt
+
+def apply_plan(df: pd.DataFrame, plan: dict) -> pd.DataFrame:
+    # Column-by-column so peak memory stays near one column, not one extra frame
+    for c, dt in plan.items():
+        if c in df.columns:
+            dt = _safe_dtype(df[c], dt)
+            if str(df[c].dtype) != dt:
+                df[c] = df[c].astype(dt)
+    return df
+
+def memory_by_group(df: pd.DataFrame) -> dict:
+    usage = df.memory_usage(deep=True, index=False)
+    out = {}
+    for c, b in usage.items():
+        g = column_group(c, df[c].dtype)
+        out[g] = out.get(g, 0) + int(b)
+    return {g: round(b / 2**20, 1) for g, b in sorted(out.items())}
+
+def log_memory(df: pd.DataFrame, label: str):
+    groups = memory_by_group(df)
+    logging.info("%s memory (MB): total=%.1f %s", label, sum(groups.values()), groups)
+    return groups
@@ -1,5 +1,6 @@
 
-import json, os
+import json, os, logging, hashlib
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import pandas as pd
 from sklearn.model_selection import GroupKFold
@@ -15,26 +16,53 @@ import lightgbm as lgb
 import shap
 import joblib
 import matplotlib.pyplot as plt
+from .utils import cache_key, frame_hash
+
+LGBM_DEFAULTS = dict(
+    objective="binary",
+    boosting_type="gbdt",
+    n_estimators=3000,
+    learning_rate=0.02,
+    num_leaves=63,
+    subsample=0.8,
+    colsample_bytree=0.8,
+    random_state=42,
+    n_jobs=-1,
+    class_weight="balanced"
+)
 
 def make_lgbm(params=None, use_focal=False):
-    base = dict(
-        objective="binary",
-        boosting_type="gbdt",
-        n_estimators=3000,
-        learning_rate=0.02,
-        num_leaves=63,
-        subsample=0.8,
-        colsample_bytree=0.8,
-        random_state=42,
-        n_jobs=-1,
-        class_weight="balanced"
-    )
+    base = dict(LGBM_DEFAULTS)
     if params:
         base.update(params)
     if use_focal:
         base["objective"] = "binary_focal"  # LightGBM >= 4.0 supports focal
     return lgb.LGBMClassifier(**base)
 
+def lgb_train_params(params=None, use_focal=False, num_threads=-1):
+    """make_lgbm settings for lgb.train (sklearn names are accepted as core aliases,
+    class_weight='balanced' becomes is_unbalance)."""
+    base = dict(LGBM_DEFAULTS)
+    if params:
+        base.update(params)
+    if use_focal:
+        base["objective"] = "binary_focal"
+    if base.pop("class_weight", None) == "balanced":
+        base["is_unbalance"] = True
+    base["n_jobs"] = num_threads
+    base.update(metric="average_precision", verbose=-1)
+    return base
+
+class BoosterModel:
+    """predict_proba-compatible wrapper around a trained lgb.Booster."""
+
+    def __init__(self, booster):
+        self.booster_ = booster
+
+    def predict_proba(self, X):
+        p = self.booster_.predict(X)
+        return np.column_stack([1 - p, p])
+
 def temporal_folds(df: pd.DataFrame, year_col="year", min_year=None, max_year=None):
     years = sorted(df[year_col].dropna().unique())
     for y in years[:-1]:
@@ -51,7 +79,57 @@ def eval_topk(y_true, y_score, k_frac=0.01):
     recall_at_k = y_true[idx].sum() / max(1, y_true.sum())
     return recall_at_k, k
 
-def train_temporal_cv(df, features, label_col, year_col, out_dir, topk_frac=0.01, use_focal=False):
+def _pandas_categorical(df, features):
+    # Category lists LightGBM records for pandas category columns; binary files don't keep them
+    return [list(df[c].cat.categories) for c in features if isinstance(df[c].dtype, pd.CategoricalDtype)]
+
+def build_cv_dataset(df, features, label_col, path, keep_raw=False):
+    """Bin the full matrix once and save it as LightGBM binary; folds are subsets of it.
+    keep_raw is needed for warm starts (init scores are predicted from raw features)."""
+    ds = lgb.Dataset(df[features], label=df[label_col].values, free_raw_data=not keep_raw)
+    ds.construct()
+    ds.save_binary(path)
+    return ds
+
+def cached_cv_dataset(df, features, label_col, cache_dir, keep_raw=False):
+    """Binned Dataset for df[features], reused across runs with the same features.
+    The key covers column names, dtypes, categories and row hashes of the feature
+    matrix only, so changing the label (horizon), objective or hyperparameters
+    still hits the cache; the label is set after loading."""
+    key = cache_key(features, [str(df[c].dtype) for c in features], _pandas_categorical(df, features),
+                    frame_hash(df[features]))
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f"lgb_{key}.bin")
+    if os.path.exists(path) and not keep_raw:
+        logging.info("Reusing binned dataset %s", path)
+        ds = lgb.Dataset(path).construct()
+        ds.set_label(df[label_col].values)
+        return ds, path
+    return build_cv_dataset(df, features, label_col, path, keep_raw=keep_raw), path
+
+def _fit_fold(full, params, tr_pos, va_pos, init_model=None, label=None):
+    # `full` is the binned Dataset, or its binary path when running in a worker process
+    if isinstance(full, str):
+        full = lgb.Dataset(full).construct()
+        full.set_label(label)
+    dtr, dva = full.subset(tr_pos), full.subset(va_pos)
+    return lgb.train(params, dtr, valid_sets=[dva], init_model=init_model,
+                     callbacks=[lgb.early_stopping(200, verbose=False)])
+
+def _train_fold(full, params, tr_pos, va_pos, init_model=None, label=None):
+    return _fit_fold(full, params, tr_pos, va_pos, init_model, label).model_to_string()
+
+def _score_fold(full, params, tr_pos, va_pos, label=None):
+    # Validation PR-AUC at the best iteration, straight from LightGBM's eval (no raw features needed)
+    booster = _fit_fold(full, params, tr_pos, va_pos, label=label)
+    return float(booster.best_score["valid_0"]["average_precision"]), int(booster.best_iteration)
+
+def train_temporal_cv(df, features, label_col, year_col, out_dir, topk_frac=0.01, use_focal=False,
+                      params=None, n_workers=1, warm_start=False, cache_dir=None):
+    """Temporal CV over `temporal_folds`. Folds run in `n_workers` processes with
+    cpu_count // n_workers threads each, sharing one binned Dataset through its binary
+    file (kept in `cache_dir`, default out_dir, see cached_cv_dataset); `warm_start`
+    instead trains folds in order, each continuing from the previous fold's booster."""
     os.makedirs(out_dir, exist_ok=True)
     metrics_all = []
     models = []
@@ -60,12 +138,33 @@ def train_temporal_cv(df, features, label_col, year_col, out_dir, topk_frac=0.01
     best_valid_year = None
     oof = pd.Series(index=df.index, dtype=float)
 
-    for y, tr_idx, va_idx in temporal_folds(df, year_col):
-        X_tr, y_tr = df.loc[tr_idx, features], df.loc[tr_idx, label_col]
-        X_va, y_va = df.loc[va_idx, features], df.loc[va_idx, label_col]
+    folds = [(y, df.index.get_indexer(tr_idx), df.index.get_indexer(va_idx)) for y, tr_idx, va_idx in temporal_folds(df, year_col)]
+    full, bin_path = cached_cv_dataset(df, features, label_col, cache_dir or out_dir, keep_raw=warm_start)
+    label = df[label_col].values
+    pandas_cat = _pandas_categorical(df, features)
+
+    n_workers = 1 if warm_start else max(1, min(n_workers, len(folds)))
+    threads = max(1, (os.cpu_count() or 1) // n_workers)
+    train_params = lgb_train_params(params, use_focal, num_threads=threads)
+
+    if warm_start:
+        model_strs, prev = [], None
+        for y, tr_pos, va_pos in folds:
+            model_strs.append(_train_fold(full, train_params, tr_pos, va_pos, init_model=prev))
+            prev = lgb.Booster(model_str=model_strs[-1])
+    elif n_workers == 1:
+        model_strs = [_train_fold(full, train_params, tr_pos, va_pos) for y, tr_pos, va_pos in folds]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as ex:
+            futs = [ex.submit(_train_fold, bin_path, train_params, tr_pos, va_pos, label=label) for y, tr_pos, va_pos in folds]
+            model_strs = [f.result() for f in futs]
 
-        model = make_lgbm(use_focal=use_focal)
-        model.fit(X_tr, y_tr, eval_set=[(X_va, y_va)], eval_metric="average_precision", callbacks=[lgb.early_stopping(200, verbose=False)])
+    for (y, tr_pos, va_pos), model_str in zip(folds, model_strs):
+        booster = lgb.Booster(model_str=model_str)
+        booster.pandas_categorical = pandas_cat
+        model = BoosterModel(booster)
+        X_va, y_va = df.iloc[va_pos][features], df.iloc[va_pos][label_col]
+        va_idx = df.index[va_pos]
 
         p_va = model.predict_proba(X_va)[:,1]
         oof.loc[va_idx] = p_va
@@ -99,11 +198,83 @@ def train_temporal_cv(df, features, label_col, year_col, out_dir, topk_frac=0.01
     # Save best model + calibrator
     if best_model is not None:
         joblib.dump(best_model, os.path.join(out_dir, "model.bin"))
+        # Plain LightGBM text model (for tree_compile.py / other runtimes)
+        best_model.booster_.save_model(os.path.join(out_dir, "model.txt"))
     if calib is not None:
         joblib.dump(calib, os.path.join(out_dir, "calibrator.pkl"))
 
     return best_model, calib, metrics_all, oof
 
+# Search space for tune_temporal_cv: name -> (low, high, scale)
+TUNE_SPACE = dict(
+    num_leaves=(15, 255, "int_log"),
+    learning_rate=(0.01, 0.1, "log"),
+    min_child_samples=(10, 200, "int_log"),
+    colsample_bytree=(0.5, 1.0, "linear"),
+    reg_lambda=(1e-3, 10.0, "log"),
+)
+
+def sample_params(rng, space=TUNE_SPACE):
+    out = {}
+    for name, (lo, hi, scale) in space.items():
+        if scale == "linear":
+            out[name] = float(rng.uniform(lo, hi))
+        else:
+            v = float(np.exp(rng.uniform(np.log(lo), np.log(hi))))
+            out[name] = int(round(v)) if scale == "int_log" else v
+    return out
+
+def tune_temporal_cv(df, features, label_col, year_col, out_dir, n_trials=27, eta=3, use_focal=False,
+                     n_workers=1, cache_dir=None, seed=42):
+    """Successive-halving search over `temporal_folds`: every trial is scored on the
+    earliest fold(s) first, only the top 1/eta by mean PR-AUC move on to the next rung
+    with eta times more folds, until survivors have seen every fold. Trials within a
+    rung run in `n_workers` processes over the cached binned Dataset.
+    Writes tuning.json to out_dir and returns the best params (for make_lgbm / train_temporal_cv)."""
+    os.makedirs(out_dir, exist_ok=True)
+    folds = [(y, df.index.get_indexer(tr_idx), df.index.get_indexer(va_idx)) for y, tr_idx, va_idx in temporal_folds(df, year_col)]
+    if not folds:
+        return None
+    full, bin_path = cached_cv_dataset(df, features, label_col, cache_dir or out_dir)
+    label = df[label_col].values
+    rng = np.random.RandomState(seed)
+
+    trials = [dict(trial=i, params=sample_params(rng), scores={}, pruned_at=None) for i in range(n_trials)]
+    alive = list(trials)
+    n_folds, rung = 1, 0
+    while True:
+        n_workers_r = max(1, min(n_workers, len(alive) * n_folds))
+        threads = max(1, (os.cpu_count() or 1) // n_workers_r)
+        todo = [(t, fi) for t in alive for fi in range(n_folds) if fi not in t["scores"]]
+        if n_workers_r == 1:
+            res = [_score_fold(full, lgb_train_params(t["params"], use_focal, threads), folds[fi][1], folds[fi][2]) for t, fi in todo]
+        else:
+            with ProcessPoolExecutor(max_workers=n_workers_r) as ex:
+                futs = [ex.submit(_score_fold, bin_path, lgb_train_params(t["params"], use_focal, threads), folds[fi][1], folds[fi][2], label)
+                        for t, fi in todo]
+                res = [f.result() for f in futs]
+        for (t, fi), (pr, best_iter) in zip(todo, res):
+            t["scores"][fi] = dict(valid_year=int(folds[fi][0] + 1), pr_auc=pr, best_iteration=best_iter)
+        for t in alive:
+            t["mean_pr_auc"] = float(np.mean([v["pr_auc"] for v in t["scores"].values()]))
+        logging.info("Tuning rung %d: %d trials x %d folds, best mean PR-AUC %.4f",
+                     rung, len(alive), n_folds, max(t["mean_pr_auc"] for t in alive))
+        if n_folds >= len(folds) or len(alive) == 1:
+            break
+        alive.sort(key=lambda t: -t["mean_pr_auc"])
+        keep = max(1, len(alive) // eta)
+        for t in alive[keep:]:
+            t["pruned_at"] = rung
+        alive = alive[:keep]
+        n_folds, rung = min(len(folds), n_folds * eta), rung + 1
+
+    best = max(alive, key=lambda t: t["mean_pr_auc"])
+    best_params = best["params"]
+    with open(os.path.join(out_dir, "tuning.json"), "w") as f:
+        json.dump({"best_trial": best["trial"], "best_params": best_params, "eta": eta,
+                   "trials": [dict(t, scores=list(t["scores"].values())) for t in trials]}, f, indent=2)
+    return best_params
+
 def plot_curves(y_true, y_score, out_dir):
     os.makedirs(os.path.join(out_dir, "plots"), exist_ok=True)
     precision, recall, _ = precision_recall_curve(y_true, y_score)
@@ -128,8 +299,10 @@ def plot_curves(y_true, y_score, out_dir):
     plt.close()
 
 def shap_summary(model, X_sample, feature_names, out_dir):
-    explainer = shap.TreeExplainer(model)
-    sv = explainer.shap_values(X_sample)[1] if isinstance(model, lgb.LGBMClassifier) else explainer.shap_values(X_sample)
+    explainer = shap.TreeExplainer(model.booster_ if isinstance(model, BoosterModel) else model)
+    sv = explainer.shap_values(X_sample)
+    if isinstance(sv, list):  # older shap returns one array per class
+        sv = sv[1]
     shap.summary_plot(sv, features=X_sample, feature_names=feature_names, show=False)
     os.makedirs(os.path.join(out_dir, "plots"), exist_ok=True)
     import matplotlib.pyplot as plt
@@ -141,3 +314,33 @@ def shap_summary(model, X_sample, feature_names, out_dir):
     vals = np.abs(sv).mean(axis=0)
     idx = np.argsort(vals)[::-1][:10]
     return [feature_names[i] for i in idx]
+
+def model_version(model) -> str:
+    return hashlib.sha1(model.booster_.model_to_string().encode()).hexdigest()[:16]
+
+def top_drivers(model, X, feature_names, keys, topn=5, cache_dir=None):
+    """Per-row top risk drivers from LightGBM's native SHAP (pred_contrib), formatted as
+    'feature (+contribution)'. Rows are identified by `keys` (e.g. device_id|month) plus a
+    hash of their feature values, and cached per model version, so only unseen or changed
+    rows are explained. Cache files of other model versions are removed on write."""
+    row_hash = pd.util.hash_pandas_object(X, index=False).to_numpy()
+    keys = [f"{k}|{h:016x}" for k, h in zip(keys, row_hash)]
+    cache, path = {}, None
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        path = os.path.join(cache_dir, f"drivers_{model_version(model)}.pkl")
+        if os.path.exists(path):
+            cache = joblib.load(path)
+    todo = [i for i, k in enumerate(keys) if k not in cache]
+    if todo:
+        contrib = model.booster_.predict(X.iloc[todo], pred_contrib=True)[:, :-1]  # last column is the bias
+        order = np.argsort(-contrib, axis=1)[:, :topn]
+        for r, i in enumerate(todo):
+            cache[keys[i]] = ", ".join(f"{feature_names[j]} ({contrib[r, j]:+.3f})" for j in order[r] if contrib[r, j] > 0)
+        if path:
+            joblib.dump(cache, path)
+            for name in os.listdir(cache_dir):
+                if name.startswith("drivers_") and name.endswith(".pkl") and name != os.path.basename(path):
+                    os.remove(os.path.join(cache_dir, name))  # explanations of a replaced model
+    return pd.Series([cache[k] for k in keys], index=X.index)
+
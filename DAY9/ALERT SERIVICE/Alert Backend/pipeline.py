@@ -6,10 +6,11 @@ from dateutil import tz
 from tqdm import tqdm
 import joblib
 
-from .ingest import ingest_all
+from .ingest import ingest_all, ingest_all_typed
 from .features import build_device_month_frame, derive_serious_flags, label_device_months, rolling_features, add_static_and_manufacturer
 from .text_feats import keyword_flags, compute_embeddings
-from .modeling import train_temporal_cv, plot_curves, shap_summary
+from .modeling import train_temporal_cv, tune_temporal_cv, plot_curves, shap_summary, top_drivers
+from .memory import plan_dtypes, apply_plan, log_memory
 
 UTC = tz.UTC
 
@@ -26,10 +27,14 @@ def main(args):
 
     rng = np.random.RandomState(cfg["random_seed"])
     os.makedirs(args.out_dir, exist_ok=True)
+    cache_root = args.cache_dir or os.path.join(args.out_dir, "cache")
 
     # 1) Ingest
     logging.info("Ingesting data...")
-    data = ingest_all(args.data_dir, cfg["date_cols"])
+    if args.typed_ingest:
+        data = ingest_all_typed(args.data_dir, cfg["date_cols"], out_dir=os.path.join(args.out_dir, "ingested"))
+    else:
+        data = ingest_all(args.data_dir, cfg["date_cols"])
     event, device, manufacturer = data["event"], data["device"], data["manufacturer"]
     res, mdr, gudid = data["res"], data["mdr"], data["gudid"]
 
@@ -42,7 +47,7 @@ def main(args):
 
     # 3) Labels
     logging.info("Deriving serious flags...")
-    aligned = derive_serious_flags(event, mdr, cfg["serious_classes"])
+    aligned = derive_serious_flags(event, mdr, cfg["serious_classes"], cache_dir=cache_root)
     labels = label_device_months(frame, aligned, args.horizon_months)
 
     # 4) Features (<= t only)
@@ -60,10 +65,10 @@ def main(args):
     feats = feats.merge(dev_desc, on="device_id", how="left")
     text_source = feats["device_desc"].fillna("")
     try:
-        emb = compute_embeddings(text_source, cfg["embedding_model"])
+        emb = compute_embeddings(text_source, cfg["embedding_model"], cache_dir=os.path.join(cache_root, "embeddings"))
     except Exception as e:
         logging.warning(f"Embedding model failed ({e}); falling back to zeros")
-        emb = np.zeros((len(text_source), 384), dtype=float)  # MiniLM-L6
+        emb = np.zeros((len(text_source), 384), dtype=np.float32)  # MiniLM-L6
 
     emb_df = pd.DataFrame(emb, index=feats.index, columns=[f"emb_{i:03d}" for i in range(emb.shape[1])])
     kw = keyword_flags(feats, ["device_desc"], cfg["keywords"])
@@ -79,23 +84,35 @@ def main(args):
     drop_cols = {"device_id","month","created_at","updated_at","created_at_man","updated_at_man","name","name_man","address","parent_company","representative","device_desc","number","quantity_in_commerce"}
     features = [c for c in data_all.columns if c not in drop_cols and c not in ["y"]]
 
+    # Compact dtypes (counts -> int16/32, embeddings -> float32/16, flags -> uint8, strings -> category)
+    log_memory(data_all, "Training frame before dtype plan")
+    dtype_plan = plan_dtypes(data_all, features, emb_dtype=cfg.get("embedding_dtype", "float32"))
+    data_all = apply_plan(data_all, dtype_plan)
+    log_memory(data_all, "Training frame after dtype plan")
+
     # 5/6) Train models with temporal CV, optimize PR-AUC, early stopping
+    lgb_params = None
+    if args.tune:
+        logging.info("Tuning hyperparameters (successive halving over temporal folds)...")
+        lgb_params = tune_temporal_cv(
+            data_all, features, "y", "year", args.out_dir, n_trials=cfg.get("tune_trials", 27), eta=cfg.get("tune_eta", 3),
+            use_focal=cfg.get("use_focal_loss", False), n_workers=cfg.get("cv_workers", 1), cache_dir=os.path.join(cache_root, "lgb")
+        )
     logging.info("Training temporal CV...")
     best_model, calibrator, fold_metrics, oof = train_temporal_cv(
-        data_all, features, "y", "year", args.out_dir, topk_frac=cfg["topk_percent"], use_focal=cfg.get("use_focal_loss", False)
+        data_all, features, "y", "year", args.out_dir, topk_frac=cfg["topk_percent"], use_focal=cfg.get("use_focal_loss", False),
+        params=lgb_params, n_workers=cfg.get("cv_workers", 1), warm_start=cfg.get("cv_warm_start", False), cache_dir=os.path.join(cache_root, "lgb")
     )
 
     # 7) Final OOF curves
     if oof.notna().any():
         plot_curves(data_all.loc[oof.index, "y"].values, oof.values, args.out_dir)
 
-    # 8/9) SHAP
-    if best_model is not None:
+    # 8/9) SHAP: global summary plot only on request; per-device drivers for the watchlist below
+    if best_model is not None and args.shap_plot:
         logging.info("Computing SHAP summary on a sample...")
         idx_sample = np.random.choice(data_all.index, size=min(5000, len(data_all)), replace=False)
-        top_feats = shap_summary(best_model, data_all.loc[idx_sample, features], features, args.out_dir)
-    else:
-        top_feats = []
+        shap_summary(best_model, data_all.loc[idx_sample, features], features, args.out_dir)
 
     # 10) Watchlist
     logging.info("Creating watchlist for last month...")
@@ -110,19 +127,24 @@ def main(args):
             p = np.zeros(mask.sum())
         watch = data_all.loc[mask, ["device_id","month"]].copy()
         watch["score"] = p
-        watch["top_features"] = ", ".join(top_feats[:5]) if top_feats else ""
+        watch = watch.sort_values("score", ascending=False)
+        watch["top_features"] = ""
+        if best_model is not None:
+            top = watch.index[:cfg.get("watchlist_explain_top", 100)]
+            keys = watch.loc[top, "device_id"].astype(str) + "|" + last_month.strftime("%Y-%m")
+            watch.loc[top, "top_features"] = top_drivers(best_model, data_all.loc[top, features], features, keys,
+                                                         cache_dir=os.path.join(cache_root, "explain"))
         # naive recommended action by threshold quantiles
         q = np.quantile(watch["score"], 0.99) if len(watch) >= 100 else 0.9
         watch["recommended_action"] = np.where(watch["score"] >= q, "Immediate review & CAPA", "Monitor")
-        watch["valid_for_month"] = last_month.dt.strftime("%Y-%m")
-        watch = watch.sort_values("score", ascending=False)
+        watch["valid_for_month"] = last_month.strftime("%Y-%m")
         watch.to_csv(os.path.join(args.out_dir, "watchlist.csv"), index=False)
 
     # 11) Save artifacts / specs
-    preproc = dict(features=features, config=cfg)
+    preproc = dict(features=features, dtypes=dtype_plan, lgb_params=lgb_params, config=cfg)
     joblib.dump(preproc, os.path.join(args.out_dir, "preproc.pkl"))
     with open(os.path.join(args.out_dir, "feature_specs.json"), "w") as f:
-        json.dump({"features": features}, f, indent=2)
+        json.dump({"features": features, "dtypes": dtype_plan}, f, indent=2)
 
     logging.info("Done. Outputs saved to %s", args.out_dir)
 
@@ -132,5 +154,9 @@ if __name__ == "__main__":
     p.add_argument("--out_dir", type=str, default="./outputs")
     p.add_argument("--config", type=str, default="config.yaml")
     p.add_argument("--horizon_months", type=int, default=6)
+    p.add_argument("--cache_dir", type=str, default=None, help="Shared cache (seriousness flags, embeddings, binned datasets); default out_dir/cache")
+    p.add_argument("--tune", action="store_true", help="Successive-halving hyperparameter search before the final CV (writes tuning.json)")
+    p.add_argument("--shap_plot", action="store_true", help="Also render the global SHAP summary plot (5000-row sample)")
+    p.add_argument("--typed_ingest", action="store_true", help="Schema-typed parallel ingest; also writes deduplicated Parquet to out_dir/ingested")
     args = p.parse_args()
     main(args)
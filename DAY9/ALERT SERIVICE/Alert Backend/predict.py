@@ -3,6 +3,7 @@ import os, joblib, numpy as np, pandas as pd
 from dateutil import tz
 from .features import build_device_month_frame, derive_serious_flags, label_device_months, rolling_features, add_static_and_manufacturer
 from .text_feats import compute_embeddings, keyword_flags
+from .memory import apply_plan
 
 UTC = tz.UTC
 
@@ -30,12 +31,14 @@ def predict_next_horizon(dev_df, evt_df, man_df, asof_date, H=6, artifacts_dir="
 
     dev_desc = dev_df[["id","description"]].rename(columns={"id":"device_id","description":"device_desc"})
     feats = feats.merge(dev_desc, on="device_id", how="left")
-    emb = compute_embeddings(feats["device_desc"], cfg["embedding_model"])
+    emb = compute_embeddings(feats["device_desc"], cfg["embedding_model"], cache_dir=os.path.join(artifacts_dir, "cache", "embeddings"))
     emb_df = pd.DataFrame(emb, index=feats.index, columns=[f"emb_{i:03d}" for i in range(emb.shape[1])])
     kw = keyword_flags(feats, ["device_desc"], cfg["keywords"])
 
     X = feats.join(roll.set_index(["device_id","month"]), on=["device_id","month"]).join(emb_df).join(kw)
     X = X.reindex(columns=feats_spec, fill_value=0)
+    # Same dtypes as training (older artifacts have no plan)
+    X = apply_plan(X, preproc.get("dtypes", {}))
 
     p = model.predict_proba(X)[:,1]
     if calibrator is not None:
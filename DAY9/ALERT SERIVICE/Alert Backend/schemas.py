@@ -0,0 +1,85 @@
+
+import pandas as pd
+
+from .utils import parse_dates
+
+# Column dtypes are declared on snake_case names (after to_snake).
+# Anything not listed stays a plain string column.
+# date_format=None means "let pandas infer" (same as the legacy path).
+SCHEMAS = {
+    "event": dict(
+        dtypes={
+            "id": "Int64",
+            "device_id": "Int64",
+            "manufacturer_id": "Int64",
+            "action": "category",
+            "action_classification": "category",
+            "type": "category",
+            "status": "category",
+        },
+        date_cols=["date_initiated_by_firm", "date_posted", "date_terminated", "date_updated"],
+        date_format="%d-%m-%Y",
+        key=["id"],
+    ),
+    "device": dict(
+        dtypes={
+            "id": "Int64",
+            "manufacturer_id": "Int64",
+            "classification": "category",
+            "risk_class": "category",
+            "code": "category",
+            "implanted": "category",
+            "distributed_to": "category",
+            "country": "category",
+            "quantity_in_commerce": "float64",
+        },
+        date_cols=["created_at", "updated_at"],
+        date_format=None,
+        key=["id"],
+    ),
+    "manufacturer": dict(
+        dtypes={
+            "id": "Int64",
+            "parent_company": "category",
+            "representative": "category",
+        },
+        date_cols=["created_at", "updated_at"],
+        date_format=None,
+        key=["id"],
+    ),
+    "mdr": dict(
+        dtypes={
+            "device_id": "Int64",
+        },
+        date_cols=["date"],
+        date_format=None,
+        key=None,  # no stable report key across MAUDE extracts -> full-row dedup
+    ),
+}
+
+def get_schema(table: str) -> dict:
+    if table not in SCHEMAS:
+        raise KeyError(f"No schema registered for table '{table}'")
+    return SCHEMAS[table]
+
+def parse_dates_with_format(s: pd.Series, fmt=None) -> pd.Series:
+    # Explicit (or detected) format first; only distinct values that fail it go through inference
+    return parse_dates(s, fmt, utc=True)
+
+def apply_schema(df: pd.DataFrame, table: str, extra_date_cols=()) -> pd.DataFrame:
+    """Cast a freshly read (all-string, snake_case) frame in place to the registered dtypes."""
+    schema = get_schema(table)
+    for c, dt in schema["dtypes"].items():
+        if c not in df.columns:
+            continue
+        if dt in ("Int64", "Int32", "float64", "float32"):
+            df[c] = pd.to_numeric(df[c], errors="coerce").astype(dt)
+        else:
+            df[c] = df[c].astype(dt)
+    for c in schema["date_cols"]:
+        if c in df.columns:
+            df[c] = parse_dates_with_format(df[c], schema["date_format"])
+    for c in extra_date_cols:
+        if c in df.columns and c not in schema["date_cols"]:
+            df[c] = parse_dates_with_format(df[c], None)
+    return df
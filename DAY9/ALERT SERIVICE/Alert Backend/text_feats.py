@@ -1,17 +1,154 @@
 
+import os
+import re
+import json
+import hashlib
 from typing import List
 import numpy as np
 import pandas as pd
 
+try:
+    import ahocorasick  # pyahocorasick
+    AHOCORASICK_AVAILABLE = True
+except Exception:
+    AHOCORASICK_AVAILABLE = False
+
+def _keyword_hits(texts: pd.Series, keywords: List[str]):
+    """(row, keyword) hit pairs for already-lowercased texts, all keywords in one scan."""
+    rows, cols = [], []
+    if not keywords:
+        return rows, cols
+    if AHOCORASICK_AVAILABLE:
+        A = ahocorasick.Automaton()
+        for j, kw in enumerate(keywords):
+            A.add_word(kw, A.get(kw, ()) + (j,))
+        A.make_automaton()
+        for i, t in enumerate(texts):
+            for _, js in A.iter(t):
+                for j in js:
+                    rows.append(i)
+                    cols.append(j)
+    else:
+        for j, kw in enumerate(keywords):
+            hit = np.flatnonzero(texts.str.contains(kw, regex=False).to_numpy())
+            rows.extend(hit)
+            cols.extend([j] * len(hit))
+    return rows, cols
+
+# Keywords containing any of these are regex patterns (config keywords are regexes, as with
+# str.contains); plain words take the single-scan literal path
+_REGEX_META = set(".^$*+?{}[]\\|()")
+
+def keyword_matrix(df: pd.DataFrame, text_cols: List[str], keywords: List[str]):
+    """Sparse 0/1 matrix (rows of df x keywords), matched on distinct texts only."""
+    from scipy import sparse
+    # Columns joined with the ASCII unit separator so a keyword can never match across a column
+    # boundary (not NUL: pandas' string hashing stops at NUL, so factorize would merge texts)
+    text = df[text_cols[0]].astype(str)
+    for c in text_cols[1:]:
+        text = text + "\x1f" + df[c].astype(str)
+    codes, uniq = pd.factorize(text, sort=False)
+    low = pd.Series(uniq, dtype=object).str.lower()
+    kws = [kw.lower() for kw in keywords]
+    literal = [j for j, kw in enumerate(kws) if not _REGEX_META & set(kw)]
+    rows, cols = _keyword_hits(low, [kws[j] for j in literal])
+    cols = [literal[j] for j in cols]
+    regex = [j for j in range(len(kws)) if j not in set(literal)]
+    if regex:
+        # Regex keywords: matched per column, like the original per-column str.contains
+        parts = low.str.split("\x1f", expand=True, regex=False) if len(text_cols) > 1 else low.to_frame()
+        for j in regex:
+            hit = np.zeros(len(low), dtype=bool)
+            for c in parts.columns:
+                hit |= parts[c].str.contains(kws[j], regex=True, na=False).to_numpy()
+            idx = np.flatnonzero(hit)
+            rows.extend(idx)
+            cols.extend([j] * len(idx))
+    m = sparse.csr_matrix((np.ones(len(rows), dtype=np.uint8), (rows, cols)), shape=(len(uniq), len(keywords)))
+    m.data[:] = 1  # duplicates were summed
+    return m[codes]
+
 def keyword_flags(df: pd.DataFrame, text_cols: List[str], keywords: List[str]):
-    out = pd.DataFrame(index=df.index)
-    for kw in keywords:
-        patt = kw.lower()
-        out[f"kw_{kw}"] = df[text_cols].astype(str).apply(lambda s: s.str.lower().str.contains(patt, na=False)).any(axis=1).astype(int)
-    return out
-
-def compute_embeddings(texts: pd.Series, model_name: str):
-    from sentence_transformers import SentenceTransformer
-    model = SentenceTransformer(model_name)
-    emb = model.encode(texts.fillna("").astype(str).tolist(), batch_size=256, convert_to_numpy=True, normalize_embeddings=True, show_progress_bar=True)
-    return emb
+    keywords = list(dict.fromkeys(keywords))
+    m = keyword_matrix(df, text_cols, keywords)
+    return pd.DataFrame(m.toarray().astype(int), index=df.index, columns=[f"kw_{kw}" for kw in keywords])
+
+# Loaded SentenceTransformer models, kept resident for the life of the process
+_MODELS = {}
+
+def get_model(model_name: str):
+    if model_name not in _MODELS:
+        from sentence_transformers import SentenceTransformer
+        _MODELS[model_name] = SentenceTransformer(model_name)
+    return _MODELS[model_name]
+
+def text_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+class EmbeddingStore:
+    """Append-only on-disk vector cache: float16 rows in vectors.f16 (memory-mapped)
+    and a text-hash -> row index in index.json."""
+
+    def __init__(self, root: str, dim: int = None):
+        self.root = root
+        self.vec_path = os.path.join(root, "vectors.f16")
+        self.idx_path = os.path.join(root, "index.json")
+        os.makedirs(root, exist_ok=True)
+        meta = {"dim": dim, "rows": {}}
+        if os.path.exists(self.idx_path):
+            with open(self.idx_path, "r") as f:
+                meta = json.load(f)
+        self.dim = meta["dim"]
+        self.rows = meta["rows"]
+        self._mm = None
+
+    def __contains__(self, h):
+        return h in self.rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    @property
+    def vectors(self):
+        if self._mm is None and len(self.rows):
+            self._mm = np.memmap(self.vec_path, dtype=np.float16, mode="r", shape=(len(self.rows), self.dim))
+        return self._mm
+
+    def add(self, hashes, vecs):
+        vecs = np.asarray(vecs, dtype=np.float16)
+        if self.dim is None:
+            self.dim = vecs.shape[1]
+        start = len(self.rows)
+        with open(self.vec_path, "ab") as f:
+            # Drop orphan rows left by a crash between the vector write and the index write
+            f.truncate(start * self.dim * 2)
+            f.write(vecs.tobytes())
+        for i, h in enumerate(hashes):
+            self.rows[h] = start + i
+        tmp = self.idx_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"dim": self.dim, "rows": self.rows}, f)
+        os.replace(tmp, self.idx_path)
+        self._mm = None  # remap with the new length on next access
+
+    def get(self, hashes) -> np.ndarray:
+        if not len(hashes):
+            return np.zeros((0, self.dim or 0), dtype=np.float32)
+        return np.asarray(self.vectors[[self.rows[h] for h in hashes]], dtype=np.float32)
+
+def _encode(model_name, texts, batch_size):
+    return get_model(model_name).encode(texts, batch_size=batch_size, convert_to_numpy=True, normalize_embeddings=True, show_progress_bar=True)
+
+def compute_embeddings(texts: pd.Series, model_name: str, cache_dir: str = None, batch_size: int = 256):
+    # Encode each distinct text once (device_desc repeats for every month of a device)
+    codes, uniq = pd.factorize(texts.fillna("").astype(str), sort=False)
+    uniq = list(uniq)
+    if cache_dir is None:
+        return _encode(model_name, uniq, batch_size)[codes]
+
+    store = EmbeddingStore(os.path.join(cache_dir, re.sub(r"[^\w.-]+", "_", model_name)))
+    hashes = [text_hash(t) for t in uniq]
+    new = [i for i, h in enumerate(hashes) if h not in store]
+    if new:
+        store.add([hashes[i] for i in new], _encode(model_name, [uniq[i] for i in new], batch_size))
+    return store.get(hashes)[codes]
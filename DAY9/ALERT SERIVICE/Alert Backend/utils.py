@@ -1,5 +1,8 @@
 
+import os
 import re
+import json
+import hashlib
 import logging
 from contextlib import contextmanager
 from time import perf_counter
@@ -7,6 +10,9 @@ import numpy as np
 import pandas as pd
 from dateutil import parser, tz
 
+# Shared unique-value date parser (common package at the repo root)
+from common.fastdates import parse_dates
+
 UTC = tz.UTC
 
 def to_snake(name: str) -> str:
@@ -16,17 +22,28 @@ def to_snake(name: str) -> str:
     return s.lower()
 
 def standardize_columns(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
+    df = df.copy(deep=False)  # only the column labels change
     df.columns = [to_snake(c) for c in df.columns]
     return df
 
 def parse_dates_safe(df: pd.DataFrame, date_cols):
-    df = df.copy()
+    df = df.copy(deep=False)  # only the date columns are replaced
     for c in date_cols:
         if c in df.columns:
-            df[c] = pd.to_datetime(df[c], errors="coerce", utc=True, infer_datetime_format=True)
+            df[c] = parse_dates(df[c], utc=True)
     return df
 
+def file_fingerprint(paths):
+    # Cheap identity of the input files: path, size and mtime (no content hashing)
+    return [(os.path.abspath(p), os.path.getsize(p), os.path.getmtime(p)) for p in paths]
+
+def cache_key(*parts) -> str:
+    return hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+def frame_hash(df: pd.DataFrame) -> str:
+    # Vectorized content hash of a frame (values only, row order matters)
+    return hashlib.sha1(pd.util.hash_pandas_object(df, index=False).values.tobytes()).hexdigest()
+
 def coerce_numeric(df: pd.DataFrame, cols):
     df = df.copy()
     for c in cols:
@@ -7,6 +7,8 @@ import joblib
 import pandas as pd
 import joblib
 import os
+from common.model_registry import ModelRegistry, load_joblib_bundle
+from feature_store import FeatureFetcher, check_encoders, encode_features
 
 # Base path (directory where app.py is located)
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -157,7 +159,8 @@ def health_check():
     return jsonify({
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
-        "snowflake_connected": _test_snowflake_connection()
+        "snowflake_connected": _test_snowflake_connection(),
+        "models": {"logistic": logistic_registry.status()},
     })
 
 def _test_snowflake_connection():
@@ -361,58 +364,68 @@ def search_devices():
 #         print("❌ Internal Server Error:", str(e))
 #         return jsonify({"error": str(e)}), 500
 
-@app.route("/api/predictLogistic/<int:device_id>", methods=["GET"])
-def predict_device(device_id):
-    try:
-        # reload inside function (ensures no cached state)
-        model = joblib.load(os.path.join(BASE_DIR, "logistic", "device_failure_model.joblib"))
-        scaler = joblib.load(os.path.join(BASE_DIR, "logistic", "scaler.joblib"))
-        feature_cols = joblib.load(os.path.join(BASE_DIR, "logistic", "feature_columns.joblib"))
-
-        # 1. Fetch device row from Snowflake
-        conn = snowflake.connector.connect(**conn_params)
-        query = f"""
-            SELECT *
-            FROM EVENTS_CLEANED_LABEL_ENCODED
-            WHERE DEVICE_ID = {device_id}
-            LIMIT 1
-        """
-        df = pd.read_sql(query, conn)
-        conn.close()
-
-        if df.empty:
-            return jsonify({"error": f"Device ID {device_id} not found"}), 404
-
-        # 2. Align with feature columns
-        missing = [c for c in feature_cols if c not in df.columns]
-        for col in missing:
-            df[col] = 0
-
-        X_new = df[feature_cols].copy()
-
-        # Encode categorical
-        for col in X_new.select_dtypes(include=["object"]).columns:
-            X_new[col] = X_new[col].astype("category").cat.codes
-
-        # 3. Apply same scaler
+# Logistic Regression artifacts: loaded once, swapped in the background when the files change
+def _load_logistic_bundle(paths):
+    bundle = load_joblib_bundle(paths)
+    # Categorical columns + categories are saved at training time; never guessed at serving time
+    check_encoders(bundle["encoders"], bundle["feature_cols"])
+    return bundle
+
+logistic_registry = ModelRegistry("logistic", {
+    "model": os.path.join(BASE_DIR, "logistic", "device_failure_model.joblib"),
+    "scaler": os.path.join(BASE_DIR, "logistic", "scaler.joblib"),
+    "feature_cols": os.path.join(BASE_DIR, "logistic", "feature_columns.joblib"),
+    "encoders": os.path.join(BASE_DIR, "logistic", "feature_encoders.joblib"),  # feature_store.build_encoders
+}, loader=_load_logistic_bundle).start()
+
+logistic_fetcher = FeatureFetcher(conn_params, ttl_seconds=60)
+
+def predict_logistic_many(device_ids):
+    # one snapshot per call, so a reload never mixes model/scaler versions
+    bundle = logistic_registry.get().bundle
+    model, scaler, feature_cols = bundle["model"], bundle["scaler"], bundle["feature_cols"]
+
+    # 1. Fetch device rows from Snowflake (batched IN query, cached for a short TTL)
+    rows = logistic_fetcher.fetch(device_ids)
+    results = {}
+    if not rows.empty:
+        # 2. Align with feature columns + persisted categorical codes, 3. same scaler
+        X_new = encode_features(rows, feature_cols, bundle["encoders"])
         X_new = scaler.transform(X_new)
 
         # 4. Predict
-        pred_class = model.predict(X_new)[0]
-        pred_prob = model.predict_proba(X_new)[0][1]
-
-        result = {
-            "device_id": int(device_id),
-            "failure_prediction": int(pred_class),
-            "risk_percentage": round(float(pred_prob) * 100, 2),
-            "within_50_days": "Yes" if pred_class == 1 else "No"
-        }
+        probs = model.predict_proba(X_new)
+        preds = model.classes_[probs.argmax(axis=1)]
+        for did, pred_class, prob in zip(rows[logistic_fetcher.key], preds, probs[:, 1]):
+            results[int(did)] = {
+                "device_id": int(did),
+                "failure_prediction": int(pred_class),
+                "risk_percentage": round(float(prob) * 100, 2),
+                "within_50_days": "Yes" if pred_class == 1 else "No"
+            }
+    return [results.get(int(d), {"device_id": int(d), "error": f"Device ID {d} not found"}) for d in device_ids]
 
+@app.route("/api/predictLogistic/<int:device_id>", methods=["GET"])
+def predict_device(device_id):
+    try:
+        result = predict_logistic_many([device_id])[0]
+        if "error" in result:
+            return jsonify({"error": result["error"]}), 404
         return jsonify(result)
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route("/api/predictLogistic/bulk", methods=["POST"])
+def predict_device_bulk():
+    try:
+        device_ids = (request.get_json() or {}).get("device_ids", [])
+        if not device_ids:
+            return jsonify({"error": "No device IDs provided"}), 400
+        return jsonify(predict_logistic_many(device_ids))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 
 # model = joblib.load(os.path.join(BASE_DIR, "decision", "device_failure_model.joblib"))
 # feature_cols = joblib.load(os.path.join(BASE_DIR, "decision", "feature_columns.joblib"))
@@ -0,0 +1,164 @@
+"""
+Feature Fetch Layer (Snowflake)
+-------------------------------
+Rows of EVENTS_CLEANED_LABEL_ENCODED for the logistic model, fetched with
+parameterized, batched IN (...) queries over a small connection pool, with a
+short-TTL per-device cache (misses are cached too). The cache is an LRU
+bounded by max_cache entries; expired entries are dropped when they are read.
+
+Categorical columns are encoded with persisted category lists (the sorted
+distinct values of the whole table, i.e. what astype("category") gives on the
+full training frame), so a device's codes no longer depend on which other
+rows happen to be in the request. The encoders are built at training time,
+from the training frame and its categorical column list, and saved next to
+the model; serving never guesses them from a request batch.
+
+Usage:
+  # training
+  encoders = build_encoders(X_train, categorical_cols, "logistic/feature_encoders.joblib")
+  # serving
+  fetcher = FeatureFetcher(conn_params)
+  rows = fetcher.fetch([101, 102])                  # DataFrame, one row per found device
+  X = encode_features(rows, feature_cols, check_encoders(encoders, feature_cols))
+"""
+
+import time
+import queue
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import pandas as pd
+import joblib
+import snowflake.connector
+
+
+class SnowflakeConnectionPool:
+    """Reuses up to max_size open connections instead of connecting per request."""
+
+    def __init__(self, conn_params: dict, max_size: int = 4):
+        self.conn_params = conn_params
+        self._idle = queue.LifoQueue(maxsize=max_size)
+
+    @contextmanager
+    def connection(self):
+        conn = None
+        try:
+            conn = self._idle.get_nowait()
+            if conn.is_closed():
+                conn = None
+        except queue.Empty:
+            pass
+        if conn is None:
+            conn = snowflake.connector.connect(**self.conn_params)
+        try:
+            yield conn
+        except Exception:
+            # Broken/unknown state: drop it rather than hand it to the next request
+            conn.close()
+            raise
+        else:
+            try:
+                self._idle.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    def query(self, sql: str, params=None) -> pd.DataFrame:
+        with self.connection() as conn:
+            cs = conn.cursor()
+            try:
+                cs.execute(sql, params)
+                columns = [desc[0] for desc in cs.description]
+                return pd.DataFrame(cs.fetchall(), columns=columns)
+            finally:
+                cs.close()
+
+
+class FeatureFetcher:
+    def __init__(self, conn_params: dict, table: str = "EVENTS_CLEANED_LABEL_ENCODED", key: str = "DEVICE_ID",
+                 ttl_seconds: float = 60.0, max_batch: int = 500, pool_size: int = 4, max_cache: int = 50_000):
+        # table/key are fixed identifiers (never request input); values always go through %s params
+        self.table = table
+        self.key = key
+        self.ttl = ttl_seconds
+        self.max_batch = max_batch
+        self.pool = SnowflakeConnectionPool(conn_params, pool_size)
+        self.max_cache = max_cache
+        self._cache = OrderedDict()  # device_id -> (expires_at, row dict or None), least recently used first
+        self._lock = threading.Lock()
+
+    def _query_batch(self, ids: list) -> pd.DataFrame:
+        placeholders = ", ".join(["%s"] * len(ids))
+        # First row per device, like the old "WHERE DEVICE_ID = x LIMIT 1"
+        sql = (f"SELECT * FROM {self.table} WHERE {self.key} IN ({placeholders}) "
+               f"QUALIFY ROW_NUMBER() OVER (PARTITION BY {self.key} ORDER BY {self.key}) = 1")
+        return self.pool.query(sql, tuple(ids))
+
+    def fetch(self, device_ids) -> pd.DataFrame:
+        """One row per found device, in request order; unknown ids are simply absent."""
+        device_ids = [int(d) for d in device_ids]
+        now = time.monotonic()
+        rows = {}
+        with self._lock:
+            for d in device_ids:
+                hit = self._cache.get(d)
+                if hit is None:
+                    continue
+                if hit[0] > now:
+                    rows[d] = hit[1]
+                    self._cache.move_to_end(d)
+                else:
+                    del self._cache[d]
+        todo = list(dict.fromkeys(d for d in device_ids if d not in rows))
+        for s in range(0, len(todo), self.max_batch):
+            batch = todo[s:s + self.max_batch]
+            got = self._query_batch(batch)
+            found = {int(r[self.key]): r for r in got.to_dict("records")}
+            expires = time.monotonic() + self.ttl
+            with self._lock:
+                for d in batch:
+                    rows[d] = found.get(d)
+                    self._cache[d] = (expires, rows[d])
+                    self._cache.move_to_end(d)
+                while len(self._cache) > self.max_cache:
+                    self._cache.popitem(last=False)
+        records = [rows[d] for d in dict.fromkeys(device_ids) if rows.get(d) is not None]
+        return pd.DataFrame.from_records(records) if records else pd.DataFrame()
+
+
+
+def build_encoders(df: pd.DataFrame, categorical_cols, path: str = None) -> dict:
+    """Training time: sorted category list per categorical column of the training frame; saved to `path` when given.
+
+    The keys are the categorical column list, so it is persisted with the categories.
+    """
+    encoders = {c: sorted(df[c].dropna().astype(str).unique().tolist()) for c in categorical_cols}
+    if path:
+        joblib.dump(encoders, path)
+    return encoders
+
+
+def check_encoders(encoders, feature_cols) -> dict:
+    """Raise if the training-time encoders are missing or do not belong to feature_cols."""
+    if encoders is None:
+        raise FileNotFoundError("feature_encoders.joblib is missing; build it at training time with build_encoders().")
+    unknown = [c for c in encoders if c not in feature_cols]
+    if unknown:
+        raise ValueError(f"Encoders for columns the model does not use: {unknown}")
+    return encoders
+
+
+def encode_features(df: pd.DataFrame, feature_cols, encoders: dict) -> pd.DataFrame:
+    """Align to feature_cols (missing -> 0) and map categorical columns to their persisted codes (unknown -> -1)."""
+    X = df.reindex(columns=feature_cols)
+    for col in feature_cols:
+        if col not in df.columns:
+            X[col] = 0
+    for col in feature_cols:
+        if col in encoders:
+            s = X[col].where(X[col].isna(), X[col].astype(str))
+            X[col] = pd.Categorical(s, categories=encoders[col]).codes
+        elif X[col].dtype == object:
+            # e.g. an all-NULL numeric column in a small batch
+            X[col] = pd.to_numeric(X[col], errors="coerce")
+    return X
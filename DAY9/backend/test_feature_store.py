@@ -0,0 +1,60 @@
+"""
+Tests for feature_store.py (in-memory pool: no Snowflake connection needed)
+Run: python -m pytest -q test_feature_store.py
+"""
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("snowflake.connector")
+
+import feature_store as fs
+
+
+class CountingPool:
+    """Answers the batched IN query from a frame and counts round trips."""
+
+    def __init__(self, table: pd.DataFrame):
+        self.table = table
+        self.queries = 0
+
+    def query(self, sql, params=None):
+        self.queries += 1
+        return self.table[self.table["DEVICE_ID"].isin(params)].drop_duplicates("DEVICE_ID")
+
+
+def _fetcher(n=100, **kw):
+    f = fs.FeatureFetcher({}, **kw)
+    f.pool = CountingPool(pd.DataFrame({"DEVICE_ID": range(n), "TYPE": ["Recall", "FSN"] * (n // 2)}))
+    return f
+
+
+def test_cache_is_bounded_lru():
+    f = _fetcher(max_cache=10)
+    f.fetch(range(8))
+    f.fetch([0])          # 0 becomes most recently used
+    f.fetch(range(8, 12))
+    assert len(f._cache) == 10 and 0 in f._cache and 1 not in f._cache
+    queries = f.pool.queries
+    f.fetch([0, 11])
+    assert f.pool.queries == queries
+
+
+def test_expired_entries_are_refetched_and_dropped():
+    f = _fetcher(ttl_seconds=0)
+    assert f.fetch([1, 2, 999])["DEVICE_ID"].tolist() == [1, 2]
+    f.fetch([1])
+    assert f.pool.queries == 2 and list(f._cache) == [2, 999, 1]
+
+
+def test_encoders_from_training_frame():
+    train = pd.DataFrame({"TYPE": ["Recall", "FSN", None, "Recall"], "QTY": [1, 2, 3, 4]})
+    encoders = fs.build_encoders(train, ["TYPE"])
+    assert encoders == {"TYPE": ["FSN", "Recall"]}
+    X = fs.encode_features(pd.DataFrame({"TYPE": ["Recall", "Safety Alert"]}), ["TYPE", "QTY"],
+                           fs.check_encoders(encoders, ["TYPE", "QTY"]))
+    assert X["TYPE"].tolist() == [1, -1] and X["QTY"].tolist() == [0, 0]
+    with pytest.raises(FileNotFoundError):
+        fs.check_encoders(None, ["TYPE"])
+    with pytest.raises(ValueError, match="TYPE"):
+        fs.check_encoders(encoders, ["QTY"])
@@ -0,0 +1,12 @@
+"""
+Shared helpers used across the DAY* scripts and backends
+--------------------------------------------------------
+- fastdates: unique-value date parsing
+- textrules: compiled keyword rules
+- star_join: events -> devices -> manufacturers star join
+- model_registry: hot-reloaded model bundles for the Flask backends
+
+Import as `from common.fastdates import parse_dates`. The repo root has to be
+importable: `pip install -e .` once at the repo root, or run with
+PYTHONPATH=<repo root>. pytest picks it up from pyproject.toml.
+"""
@@ -0,0 +1,116 @@
+"""
+Fast date parsing
+-----------------
+pd.to_datetime on the distinct values of a column only, mapped back to the
+rows with a take on the factorized codes. Date columns here repeat heavily
+(e.g. dd-mm-YYYY strings from the event generator), so a 10M-row column
+usually holds a few thousand distinct strings.
+
+- Format: explicit `fmt`, else the one remembered in the caller's `cache`
+  dict for this column (`key`, default the Series name), else detected from
+  a sample of distinct values. There is no process-wide cache: a long-running
+  service parsing many frames gets a fresh detection per call unless it
+  passes its own cache.
+- A remembered format that leaves any value unparsed is checked against a
+  fresh detection, and the one parsing more values wins, so a new layout
+  under an old column name is never read with the old format
+- Values the format does not parse are retried one by one with inference
+  (dateutil), so a few odd rows no longer turn into NaT
+
+Usage:
+  df["date_posted"] = parse_dates(df["date_posted"], dayfirst=True)
+  df["created_at"] = parse_dates(df["created_at"], "%Y-%m-%d %H:%M:%S", utc=True)
+  formats = {}                                        # one per file, shared by its chunks
+  for chunk in chunks: chunk["date_posted"] = parse_dates(chunk["date_posted"], dayfirst=True, cache=formats)
+"""
+
+import warnings
+
+import numpy as np
+import pandas as pd
+
+try:
+    from pandas.tseries.api import guess_datetime_format
+except ImportError:  # pandas < 2.2
+    from pandas._libs.tslibs.parsing import guess_datetime_format
+
+def _to_datetime(values, fmt=None, dayfirst=False, utc=False):
+    with warnings.catch_warnings():
+        # "Could not infer format, so each element will be parsed individually"
+        warnings.simplefilter("ignore", UserWarning)
+        if fmt is None:
+            return pd.to_datetime(values, errors="coerce", dayfirst=dayfirst, utc=utc)
+        return pd.to_datetime(values, errors="coerce", format=fmt, utc=utc)
+
+
+def _swap_day_month(fmt: str) -> str:
+    return fmt.replace("%d", "\0").replace("%m", "%d").replace("\0", "%m")
+
+
+def detect_format(values, dayfirst: bool = False, n_candidates: int = 5, sample: int = 1_000):
+    """strftime format that parses the most of a sample of `values` (None if none is guessable).
+    Candidates are guessed from the first few strings of an evenly spaced sample, plus each guess with
+    day and month swapped (ISO strings guess as %Y-%d-%m under dayfirst when the day is <= 12).
+    On a tie the earliest wins, which is the format pd.to_datetime itself would infer from the first value."""
+    values = np.asarray(values, dtype=object)
+    if len(values) > sample:
+        values = values[np.linspace(0, len(values) - 1, sample).astype(int)]
+    strings = [v for v in values if isinstance(v, str) and v.strip()]
+    candidates = []
+    for v in strings[:n_candidates]:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", UserWarning)  # "Parsing dates in %d-%m-%Y format when dayfirst=False"
+            fmt = guess_datetime_format(v, dayfirst=dayfirst)
+        if fmt and fmt not in candidates:
+            candidates.append(fmt)
+    candidates += [f for f in dict.fromkeys(map(_swap_day_month, candidates)) if f not in candidates]
+    if len(candidates) <= 1:
+        return candidates[0] if candidates else None
+    hits = [_to_datetime(strings, fmt).notna().sum() for fmt in candidates]
+    return candidates[int(np.argmax(hits))]
+
+
+def parse_dates(s, fmt: str = None, dayfirst: bool = False, utc: bool = False, cache: dict = None,
+                key=None, fallback: bool = True) -> pd.Series:
+    """Datetime Series for `s` (unparseable -> NaT), parsing each distinct value once.
+    cache: {(key, dayfirst): format} owned by the caller, read and updated here."""
+    s = s if isinstance(s, pd.Series) else pd.Series(s)
+    if pd.api.types.is_datetime64_any_dtype(s) or pd.api.types.is_numeric_dtype(s):
+        return _to_datetime(s, dayfirst=dayfirst, utc=utc)
+
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        codes, uniq = s.cat.codes.to_numpy(), s.cat.categories.to_numpy(dtype=object)
+    else:
+        codes, uniq = pd.factorize(s)
+        uniq = np.asarray(uniq, dtype=object)
+
+    key = s.name if key is None else key
+    cache_key = (key, dayfirst)
+    cached = fmt is None and cache is not None and cache_key in cache
+    if fmt is None:
+        fmt = cache[cache_key] if cached else detect_format(uniq, dayfirst)
+
+    parsed = pd.DatetimeIndex(_to_datetime(uniq, fmt, dayfirst, utc))
+    blank = np.array([not (isinstance(v, str) and v.strip()) for v in uniq], dtype=bool)
+    if cached and (parsed.isna() & ~blank).any():
+        # The remembered format does not cover this column: only keep it if nothing detected fits better
+        fresh = detect_format(uniq, dayfirst)
+        if fresh is not None and fresh != fmt:
+            alt = pd.DatetimeIndex(_to_datetime(uniq, fresh, dayfirst, utc))
+            if alt.notna().sum() > parsed.notna().sum():
+                fmt, parsed = fresh, alt
+    if cache is not None and fmt is not None and len(uniq) and parsed.notna().mean() >= 0.5:
+        cache[cache_key] = fmt
+
+    if fallback and fmt is not None:
+        miss = np.flatnonzero(parsed.isna() & ~blank)
+        if len(miss):
+            retry = [_to_datetime(v, dayfirst=dayfirst, utc=utc) for v in uniq[miss]]
+            if not utc:  # an offset-aware straggler in a naive column: keep its UTC wall time
+                retry = [t.tz_convert(None) if pd.notna(t) and t.tzinfo is not None else t for t in retry]
+            values = pd.Series(parsed)
+            values.iloc[miss] = pd.DatetimeIndex(retry, tz="UTC" if utc else None)
+            parsed = pd.DatetimeIndex(values)
+
+    out = parsed.take(codes, allow_fill=True, fill_value=pd.NaT)
+    return pd.Series(out, index=s.index, name=s.name)
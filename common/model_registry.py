@@ -0,0 +1,129 @@
+"""
+Model Registry
+--------------
+Load a model bundle (one or more artifact files) once, watch the files in a
+background thread and swap to the new version atomically when they change.
+
+- Version = short sha1 over the bundle's file contents (only re-hashed when mtime/size change)
+- Requests call registry.get() once and keep that snapshot, so a swap never
+  changes the model under an in-flight request
+- A failed reload (e.g. a half-written file) keeps serving the previous version;
+  last_error is cleared again by the next poll that succeeds
+
+Usage:
+  from common.model_registry import ModelRegistry
+  registry = ModelRegistry("logistic", {"model": "logistic/device_failure_model.joblib"})
+  registry.start()
+  current = registry.get()          # ModelVersion(version, bundle, loaded_at)
+  current.bundle["model"].predict_proba(X)
+"""
+
+import os
+import hashlib
+import threading
+from datetime import datetime
+from collections import namedtuple
+
+import joblib
+
+ModelVersion = namedtuple("ModelVersion", ["version", "bundle", "loaded_at"])
+
+
+def _stat(path):
+    try:
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+    except FileNotFoundError:
+        return None
+
+
+def _content_hash(paths: dict) -> str:
+    h = hashlib.sha1()
+    for key in sorted(paths):
+        h.update(key.encode())
+        if os.path.exists(paths[key]):
+            with open(paths[key], "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    h.update(block)
+    return h.hexdigest()[:12]
+
+
+def load_joblib_bundle(paths: dict) -> dict:
+    # Missing optional files load as None
+    return {key: joblib.load(p) if os.path.exists(p) else None for key, p in paths.items()}
+
+
+class ModelRegistry:
+    def __init__(self, name: str, paths: dict, loader=load_joblib_bundle, poll_seconds: float = 5.0):
+        self.name = name
+        self.paths = dict(paths)
+        self.loader = loader
+        self.poll_seconds = poll_seconds
+        self._current = None
+        self._stats = None
+        self._lock = threading.Lock()  # serializes reloads, never taken by get()
+        self._stop = threading.Event()
+        self._thread = None
+        self.last_error = None
+
+    def _file_stats(self) -> tuple:
+        return tuple((k, _stat(p)) for k, p in sorted(self.paths.items()))
+
+    def reload(self, force: bool = False) -> bool:
+        """Load the bundle if its files changed; returns True when a new version went live."""
+        with self._lock:
+            stats = self._file_stats()
+            if not force and stats == self._stats:
+                self.last_error = None
+                return False
+            version = _content_hash(self.paths)
+            if not force and self._current is not None and version == self._current.version:
+                self._stats = stats  # touched but identical (or reverted after a failed reload)
+                self.last_error = None
+                return False
+            try:
+                bundle = self.loader(self.paths)
+            except Exception as e:
+                # Keep serving the previous version; retried on the next poll
+                self.last_error = f"{type(e).__name__}: {e}"
+                print(f"❌ [{self.name}] reload failed, keeping {self._current.version if self._current else None}: {e}")
+                return False
+            self._current = ModelVersion(version, bundle, datetime.now().isoformat())  # single reference swap
+            self._stats = stats
+            self.last_error = None
+            print(f"✅ [{self.name}] model version {version} live.")
+            return True
+
+    def get(self) -> ModelVersion:
+        current = self._current
+        if current is None:
+            self.reload()
+            current = self._current
+        if current is None:
+            raise RuntimeError(f"Model '{self.name}' is not loaded: {self.last_error}")
+        return current
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_seconds):
+            try:
+                self.reload()
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+
+    def start(self) -> "ModelRegistry":
+        self.reload()
+        if self._thread is None and self.poll_seconds:
+            self._thread = threading.Thread(target=self._watch, name=f"registry-{self.name}", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self) -> dict:
+        current = self._current
+        return {
+            "version": current.version if current else None,
+            "loaded_at": current.loaded_at if current else None,
+            "last_error": self.last_error,
+        }
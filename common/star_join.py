@@ -0,0 +1,153 @@
+"""
+Star-schema join
+----------------
+The severity models (Class_Pred / Class-Risk_Pred) used to merge
+events -> devices -> manufacturers into one wide frame holding every column
+of all three tables, then pick a handful of feature columns out of it and
+scan it with df[df["device_id"] == id] for each prediction.
+
+StarJoin keeps the three tables as they are. Devices and manufacturers are
+dimensions: each event row gets the integer position of its device row and
+of that device's manufacturer row (-1 when there is none). A column is only
+materialized when asked for, by a positional take on those arrays, so a
+model matrix costs its own columns and nothing else.
+
+- Column names are the ones the wide merge would produce
+  (suffixes "_device" / "_manufacturer" on clashes), and so are dtypes
+  (int -> float64 / bool -> object when some event has no match)
+- where(mask) keeps a subset of event rows, like df[mask] on the wide frame;
+  frame() returns those rows with the wide frame's index
+- device_rows(device_id) reads the event rows of a device from a
+  device_id -> row offsets index instead of scanning the frame
+- memory_report() compares the index arrays with what the wide merge allocates
+
+Usage:
+  star = StarJoin(events, devices, manufacturers)
+  star = star.where(star.column("action_classification").notna())
+  X = star.frame(["classification", "risk_class", "type"])
+  X_new = star.frame(feature_cols, star.device_rows(12710))
+"""
+
+import numpy as np
+import pandas as pd
+from pandas.api.extensions import take
+
+
+def _positions(keys: pd.Index, values) -> np.ndarray:
+    """Position of each value in keys (-1 when missing); keys must be unique."""
+    if not keys.is_unique:
+        raise ValueError(f"Dimension key '{keys.name}' is not unique; the wide merge would duplicate event rows.")
+    return keys.get_indexer(values)
+
+
+class StarJoin:
+    def __init__(self, events: pd.DataFrame, devices: pd.DataFrame, manufacturers: pd.DataFrame,
+                 device_fk: str = "device_id", device_key: str = "id",
+                 manufacturer_fk: str = "manufacturer_id", manufacturer_key: str = "id",
+                 suffixes=("_device", "_manufacturer")):
+        self.tables = {"events": events, "devices": devices, "manufacturers": manufacturers}
+        self.device_fk = device_fk
+
+        # wide column name -> (table, column), named the way the chained merge names them
+        self.sources = {c: ("events", c) for c in events.columns}
+        for c in devices.columns:
+            self.sources[c + suffixes[0] if c in events.columns else c] = ("devices", c)
+        left = list(self.sources)
+        for c in manufacturers.columns:
+            self.sources[c + suffixes[1] if c in left else c] = ("manufacturers", c)
+
+        # event row -> dimension row (-1: no match)
+        n = len(events)
+        self.pos, self.unmatched = {}, {}
+        self._link("devices", _positions(pd.Index(devices[device_key]), events[device_fk]))
+        fk = self._gather(manufacturer_fk, np.arange(n))  # resolved on the devices, as the second merge does
+        self._link("manufacturers", _positions(pd.Index(manufacturers[manufacturer_key]), fk))
+
+        self.rows = np.arange(n)
+        self._build_device_index()
+
+    def _link(self, table: str, pos: np.ndarray):
+        self.pos[table] = pos.astype(np.int64, copy=False)
+        self.unmatched[table] = bool((pos == -1).any())
+
+    @property
+    def columns(self):
+        return list(self.sources)
+
+    # ---------- row selection ----------
+    def _build_device_index(self):
+        codes, self._device_ids = pd.factorize(self.tables["events"][self.device_fk].to_numpy()[self.rows])
+        self._device_ids = pd.Index(self._device_ids)
+        order = np.argsort(codes, kind="stable")
+        self._order = self.rows[order[codes[order] >= 0]]  # null device ids are not indexed
+        self._offsets = np.zeros(len(self._device_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(codes[codes >= 0], minlength=len(self._device_ids)), out=self._offsets[1:])
+
+    def where(self, mask) -> "StarJoin":
+        """Copy restricted to the current rows where mask (aligned with them) is true."""
+        mask = np.asarray(mask, dtype=bool)
+        if len(mask) != len(self.rows):
+            raise ValueError(f"Mask has {len(mask)} values for {len(self.rows)} rows.")
+        out = object.__new__(StarJoin)
+        out.__dict__.update(self.__dict__)
+        out.rows = self.rows[mask]
+        out._build_device_index()
+        return out
+
+    def device_rows(self, device_id) -> np.ndarray:
+        """Event rows (in order) of device_id among the current rows; empty when unknown."""
+        code = self._device_ids.get_indexer([device_id])[0]
+        if code == -1:
+            return self._order[:0]
+        return self._order[self._offsets[code]:self._offsets[code + 1]]
+
+    # ---------- column materialization ----------
+    def _gather(self, name: str, rows: np.ndarray):
+        if name not in self.sources:
+            raise KeyError(f"Column '{name}' is in none of the events, devices or manufacturers tables.")
+        table, col = self.sources[name]
+        s = self.tables[table][col]
+        values = s.array if isinstance(s.dtype, pd.api.extensions.ExtensionDtype) else s.to_numpy()
+        if table == "events":
+            return take(values, rows)
+        idx = self.pos[table][rows]
+        if self.unmatched[table]:
+            # promote like the merge does when *any* event has no match, even if these rows all do
+            return take(values, np.append(idx, -1), allow_fill=True)[:-1]
+        return take(values, idx)
+
+    def column(self, name: str, rows=None) -> pd.Series:
+        rows = self.rows if rows is None else np.asarray(rows, dtype=np.int64)
+        return pd.Series(self._gather(name, rows), index=rows, name=name)
+
+    def frame(self, columns, rows=None) -> pd.DataFrame:
+        """Wide-merge columns for the given event rows (default: the current rows)."""
+        rows = self.rows if rows is None else np.asarray(rows, dtype=np.int64)
+        return pd.DataFrame({c: self._gather(c, rows) for c in columns}, index=rows)
+
+    # ---------- memory ----------
+    def _wide_itemsize(self, name: str) -> float:
+        table, col = self.sources[name]
+        s = self.tables[table][col]
+        if isinstance(s.dtype, pd.api.extensions.ExtensionDtype):
+            return s.array.nbytes / max(len(s), 1)
+        if table != "events" and self.unmatched[table] and s.dtype.kind in "iub":
+            return 8  # int -> float64, bool -> object pointers
+        return s.dtype.itemsize
+
+    def memory_report(self) -> dict:
+        """Bytes the wide merge would add on top of the three tables (shallow, as in
+        DataFrame.memory_usage: strings are shared, object columns cost a pointer per row)
+        against the index arrays held here."""
+        n = len(self.tables["events"])
+        wide = sum(self._wide_itemsize(c) for c in self.sources) * n
+        arrays = [self.rows, self._order, self._offsets, *self.pos.values()]
+        index = sum(a.nbytes for a in arrays) + self._device_ids.memory_usage()
+        mb = 1 << 20
+        return {
+            "rows": n,
+            "wide_columns": len(self.sources),
+            "wide_merge_mb": round(wide / mb, 1),
+            "star_index_mb": round(index / mb, 1),
+            "saved_mb": round((wide - index) / mb, 1),
+        }
@@ -0,0 +1,102 @@
+"""
+Tests for fastdates.parse_dates
+Run: python -m pytest -q test_fastdates.py
+Benchmark: python -m common.test_fastdates --rows 10000000
+"""
+
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from common import fastdates as fd
+
+
+def make_column(n=50_000, fmt="%d-%m-%Y", seed=0, p_null=0.1, name="date_posted"):
+    """Generator-like date strings: ~5.5k distinct days over 2010-2024, some missing."""
+    rng = np.random.default_rng(seed)
+    days = pd.Timestamp("2010-01-01") + pd.to_timedelta(rng.integers(0, 5_480, n), unit="D")
+    s = pd.Series(days.strftime(fmt), dtype=object, name=name)
+    s[rng.random(n) < p_null] = None
+    return s
+
+
+@pytest.mark.parametrize("fmt,dayfirst", [("%d-%m-%Y", True), ("%Y-%m-%d", False), ("%m/%d/%Y %H:%M", False),
+                                          ("%d/%m/%Y", True), ("%Y-%m-%d %H:%M:%S", True)])
+def test_matches_to_datetime_on_a_format(fmt, dayfirst):
+    s = make_column(fmt=fmt)
+    s[5] = ""
+    expected = pd.to_datetime(s, errors="coerce", format=fmt)
+    pd.testing.assert_series_equal(fd.parse_dates(s, dayfirst=dayfirst), expected)
+    pd.testing.assert_series_equal(fd.parse_dates(s, fmt, utc=True), expected.dt.tz_localize("UTC"))
+    pd.testing.assert_series_equal(fd.parse_dates(s.astype("category"), dayfirst=dayfirst), expected)
+
+
+def test_per_value_fallback_and_inputs():
+    s = pd.Series(["01-02-2020", "13-02-2020", "2020-02-05", "not a date", None, "  ", "03-02-2020"], name="d")
+    out = fd.parse_dates(s, dayfirst=True)
+    assert out.tolist()[:3] == [pd.Timestamp("2020-02-01"), pd.Timestamp("2020-02-13"), pd.Timestamp("2020-05-02")]
+    assert out[3:6].isna().all() and out[6] == pd.Timestamp("2020-02-03")
+    assert fd.parse_dates(s, dayfirst=True, fallback=False)[2] is pd.NaT
+    assert list(out.index) == list(s.index) and out.name == "d"
+    # already parsed / numeric / empty columns
+    pd.testing.assert_series_equal(fd.parse_dates(out), out)
+    assert fd.parse_dates(pd.Series([], dtype=object)).dtype == "datetime64[ns]"
+    assert str(fd.parse_dates(pd.Series([None, None], dtype=object), utc=True).dtype) == "datetime64[ns, UTC]"
+
+
+def test_iso_dates_with_dayfirst():
+    # to_datetime(dayfirst=True) guesses %Y-%d-%m from "2015-03-04" and NaTs every day past the 12th
+    s = pd.Series(["2015-03-04", "2012-11-30", "2011-01-22"])
+    assert fd.parse_dates(s, dayfirst=True).tolist() == pd.to_datetime(s, format="%Y-%m-%d").tolist()
+
+
+def test_no_state_between_calls():
+    # a format seen earlier in the process must not decide how a later frame is read
+    fd.parse_dates(pd.Series(["05-03-2020", "13-03-2020", "28-02-2021"], name="date_posted"))
+    later = pd.Series(["03-05-2020", "03-13-2020", "04-20-2021", "01-02-2021"], name="date_posted")
+    assert fd.parse_dates(later).tolist() == pd.to_datetime(later, format="%m-%d-%Y").tolist()
+
+
+def test_caller_cache_reused_and_redetected():
+    cache = {}
+    fd.parse_dates(make_column(1_000, "%d-%m-%Y"), dayfirst=True, cache=cache)
+    assert cache == {("date_posted", True): "%d-%m-%Y"}
+    # a later chunk of the same file whose values are all ambiguous keeps the file's format
+    chunk = pd.Series(["02-03-2020", "04-01-2021"], name="date_posted")
+    assert fd.parse_dates(chunk, dayfirst=True, cache=cache).tolist() == [pd.Timestamp("2020-03-02"), pd.Timestamp("2021-01-04")]
+    # a new layout under the same name: the remembered format leaves values over, so it is detected again
+    # and no row is read with the old one
+    cache = {("date_posted", False): "%d-%m-%Y"}
+    later = pd.Series(["03-05-2020", "03-13-2020", "04-20-2021", "01-02-2021"], name="date_posted")
+    assert fd.parse_dates(later, cache=cache).tolist() == pd.to_datetime(later, format="%m-%d-%Y").tolist()
+    assert cache[("date_posted", False)] == "%m-%d-%Y"
+    iso = make_column(1_000, "%Y/%m/%d", seed=1)
+    pd.testing.assert_series_equal(fd.parse_dates(iso, dayfirst=True, cache=cache), pd.to_datetime(iso, format="%Y/%m/%d"))
+    assert cache[("date_posted", True)] == "%Y/%m/%d"
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser()
+    p.add_argument("--rows", type=int, default=10_000_000)
+    args = p.parse_args()
+    s = make_column(args.rows)
+    print(f"{args.rows:,} rows, {s.nunique():,} distinct")
+    runs = [
+        ("pd.to_datetime(dayfirst=True)", lambda: pd.to_datetime(s, errors="coerce", dayfirst=True)),
+        ("pd.to_datetime(format=...)", lambda: pd.to_datetime(s, errors="coerce", format="%d-%m-%Y")),
+        ("parse_dates (detected format)", lambda: fd.parse_dates(s, dayfirst=True)),
+        ("parse_dates (cached format)", lambda: fd.parse_dates(s, dayfirst=True, cache=cache)),
+        ("parse_dates (categorical column)", lambda: fd.parse_dates(cat, dayfirst=True)),
+    ]
+    cat = s.astype("category")
+    cache = {("date_posted", True): "%d-%m-%Y"}
+    outs = []
+    for name, fn in runs:
+        t = time.perf_counter()
+        outs.append(fn())
+        print(f"  {name:34s} {time.perf_counter() - t:7.2f} s")
+    assert all(o.equals(outs[0]) for o in outs)
+    print("identical output")
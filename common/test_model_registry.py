@@ -0,0 +1,87 @@
+"""
+Tests for model_registry.py
+Run: python -m pytest -q test_model_registry.py
+"""
+
+import os
+import time
+
+import joblib
+import pytest
+
+from common.model_registry import ModelRegistry
+
+
+def _write(path, obj):
+    joblib.dump(obj, path)
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))  # mtime granularity
+
+
+def test_loads_once_and_swaps_on_change(tmp_path):
+    path = str(tmp_path / "model.joblib")
+    _write(path, {"coef": 1})
+    reg = ModelRegistry("m", {"model": path}, poll_seconds=0).start()
+    first = reg.get()
+    assert first.bundle["model"] == {"coef": 1}
+    assert reg.reload() is False  # unchanged files are not reloaded
+
+    _write(path, {"coef": 2})
+    assert reg.reload() is True
+    second = reg.get()
+    assert second.bundle["model"] == {"coef": 2}
+    assert second.version != first.version
+    assert first.bundle["model"] == {"coef": 1}  # in-flight snapshot untouched
+
+
+def test_failed_reload_keeps_previous_version(tmp_path):
+    path = str(tmp_path / "model.joblib")
+    _write(path, {"coef": 1})
+    reg = ModelRegistry("m", {"model": path}, poll_seconds=0).start()
+    version = reg.get().version
+
+    with open(path, "wb") as f:
+        f.write(b"half-written")
+    assert reg.reload() is False
+    assert reg.get().version == version
+    assert reg.status()["last_error"]
+
+
+def test_error_cleared_when_file_reverts(tmp_path):
+    path = str(tmp_path / "model.joblib")
+    _write(path, {"coef": 1})
+    reg = ModelRegistry("m", {"model": path}, poll_seconds=0).start()
+    version = reg.get().version
+    with open(path, "rb") as f:
+        good = f.read()
+
+    with open(path, "wb") as f:
+        f.write(b"half-written")
+    assert reg.reload() is False and reg.status()["last_error"]
+    with open(path, "wb") as f:
+        f.write(good)  # same content as the live version: nothing to load
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 2_000_000_000))
+    assert reg.reload() is False
+    assert reg.status() == {"version": version, "loaded_at": reg.get().loaded_at, "last_error": None}
+
+
+def test_background_watcher_picks_up_new_version(tmp_path):
+    path = str(tmp_path / "model.joblib")
+    _write(path, {"coef": 1})
+    reg = ModelRegistry("m", {"model": path}, poll_seconds=0.05).start()
+    try:
+        _write(path, {"coef": 3})
+        deadline = time.time() + 5
+        while reg.get().bundle["model"] != {"coef": 3} and time.time() < deadline:
+            time.sleep(0.05)
+        assert reg.get().bundle["model"] == {"coef": 3}
+    finally:
+        reg.stop()
+
+
+def test_missing_model_raises(tmp_path):
+    reg = ModelRegistry("m", {"model": str(tmp_path / "nope.joblib")},
+                        loader=lambda paths: joblib.load(paths["model"]), poll_seconds=0).start()
+    with pytest.raises(RuntimeError):
+        reg.get()
@@ -0,0 +1,121 @@
+"""
+Tests for star_join.StarJoin against the events -> devices -> manufacturers wide merge it replaces
+Run: python -m pytest -q test_star_join.py
+Benchmark: python -m common.test_star_join --events 2000000 --devices 200000
+"""
+
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from common.star_join import StarJoin
+
+FEATURES = ["classification", "code", "implanted", "number", "quantity_in_commerce", "risk_class", "country", "type"]
+
+
+def wide_merge(events, devices, manufacturers):
+    """The merge Class_Pred.py / Class-Risk_Pred.py used."""
+    return (
+        events.merge(devices, left_on="device_id", right_on="id", how="left", suffixes=("", "_device"))
+              .merge(manufacturers, left_on="manufacturer_id", right_on="id", how="left", suffixes=("", "_manufacturer"))
+    )
+
+
+def make_tables(n_events=20_000, n_devices=2_000, n_manufacturers=200, seed=0):
+    """Schema-like tables: clashing names (id, name, country), events whose device or manufacturer is unknown."""
+    rng = np.random.default_rng(seed)
+    manufacturers = pd.DataFrame({
+        "id": np.arange(1, n_manufacturers + 1),
+        "name": [f"Manufacturer {i}" for i in range(n_manufacturers)],
+        "country": rng.choice(["US", "DE", "IN", None], n_manufacturers),
+        "parent_company": rng.choice(["A", "B", None], n_manufacturers),
+    })
+    devices = pd.DataFrame({
+        "id": rng.permutation(n_devices) + 1,
+        "manufacturer_id": rng.integers(1, int(n_manufacturers * 1.1) + 1, n_devices),
+        "name": [f"Device {i}" for i in range(n_devices)],
+        "classification": rng.choice(["Class I", "Class II", "Class III"], n_devices),
+        "code": rng.choice(["LLZ", "DXY", "FRN", None], n_devices),
+        "implanted": rng.choice([True, False], n_devices),
+        "number": rng.integers(0, 10_000, n_devices).astype(str),
+        "quantity_in_commerce": rng.integers(0, 5_000, n_devices),
+        "risk_class": rng.integers(1, 4, n_devices),
+        "country": rng.choice(["US", "FR"], n_devices),
+    })
+    events = pd.DataFrame({
+        "id": np.arange(n_events),
+        "device_id": rng.integers(1, int(n_devices * 1.05) + 1, n_events),
+        "type": rng.choice(["Recall", "FSN", "Safety Alert"], n_events),
+        "action_classification": rng.choice(["Class I", "Class II", "Class III", None], n_events),
+        "reason": rng.choice(["label error", "software", "sterility breach"], n_events),
+    })
+    return events, devices, manufacturers
+
+
+def test_columns_and_values_match_wide_merge():
+    tables = make_tables()
+    wide, star = wide_merge(*tables), StarJoin(*tables)
+    assert star.columns == list(wide.columns)
+    pd.testing.assert_frame_equal(star.frame(star.columns), wide, check_index_type=False)
+    # every device matched: no float promotion, like the merge
+    events, devices, manufacturers = tables
+    known = events[events["device_id"].isin(devices["id"])].reset_index(drop=True)
+    pd.testing.assert_frame_equal(StarJoin(known, devices, manufacturers).frame(["risk_class", "implanted"]),
+                                  wide_merge(known, devices, manufacturers)[["risk_class", "implanted"]],
+                                  check_index_type=False)
+
+
+def test_filtered_rows_and_device_lookup():
+    tables = make_tables(seed=1)
+    df = wide_merge(*tables)
+    df = df[df["action_classification"].notna()].copy()
+    star = StarJoin(*tables)
+    star = star.where(star.column("action_classification").notna())
+    pd.testing.assert_frame_equal(star.frame(FEATURES), df[FEATURES])
+    for device_id in [1, 17, 2_050, -5]:
+        pd.testing.assert_frame_equal(star.frame(FEATURES, star.device_rows(device_id)),
+                                      df.loc[df["device_id"] == device_id, FEATURES], check_index_type=False)
+
+
+def test_memory_report_and_errors():
+    tables = make_tables(5_000, 500, 50, seed=2)
+    star = StarJoin(*tables)
+    report = star.memory_report()
+    wide_bytes = wide_merge(*tables).memory_usage(index=False).sum()
+    assert report["wide_merge_mb"] == round(wide_bytes / (1 << 20), 1)
+    assert report["saved_mb"] > 0 and report["wide_columns"] == len(star.columns)
+    events, devices, manufacturers = tables
+    with pytest.raises(ValueError):
+        StarJoin(events, pd.concat([devices, devices.head(1)]), manufacturers)
+    with pytest.raises(KeyError):
+        star.frame(["not_a_column"])
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser()
+    p.add_argument("--events", type=int, default=2_000_000)
+    p.add_argument("--devices", type=int, default=200_000)
+    args = p.parse_args()
+    tables = make_tables(args.events, args.devices, 5_000)
+    lookups = np.random.default_rng(3).integers(1, args.devices, 200)
+
+    def bench(name, fn):
+        t = time.perf_counter()
+        out = fn()
+        print(f"  {name:44s} {time.perf_counter() - t:7.2f} s")
+        return out
+
+    print(f"{args.events:,} events, {args.devices:,} devices")
+    df = bench("wide merge + filter", lambda: (lambda w: w[w["action_classification"].notna()].copy())(wide_merge(*tables)))
+    X_wide = bench("feature matrix from wide frame", lambda: df[FEATURES].copy())
+    bench("200 lookups df[df.device_id == id]", lambda: [df.loc[df["device_id"] == d, FEATURES] for d in lookups])
+
+    star = bench("StarJoin + where", lambda: (lambda s: s.where(s.column("action_classification").notna()))(StarJoin(*tables)))
+    X_star = bench("feature matrix by take", lambda: star.frame(FEATURES))
+    bench("200 lookups device_rows", lambda: [star.frame(FEATURES, star.device_rows(d)) for d in lookups])
+    pd.testing.assert_frame_equal(X_star, X_wide)
+    print(f"identical features; wide frame {df.memory_usage(index=True).sum() / (1 << 20):.1f} MB held, "
+          f"report {star.memory_report()}")
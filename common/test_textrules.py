@@ -0,0 +1,178 @@
+"""
+Tests for textrules.KeywordRules, and parity of the DAY1 / DAY2 rule families with the per-row functions they replaced
+Run: python -m pytest -q test_textrules.py
+Benchmark: python -m common.test_textrules --texts 200000
+"""
+
+import os
+import re
+import time
+import argparse
+import importlib.util
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from common import textrules
+from common.textrules import KeywordRules
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def _load_script(*parts):
+    """Import a DAY* script by path (its folder name has spaces, so it is not a package)."""
+    path = os.path.join(HERE, "..", *parts)
+    spec = importlib.util.spec_from_file_location(os.path.splitext(parts[-1])[0], path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+ev = _load_script("DAY1", "Data Preprocessing", "Eventpreprocess.py")
+dp = _load_script("DAY2", "Data Preprocessing", "dataprepipynb1.py")
+
+MATCHERS = [False, True] if textrules.AHOCORASICK_AVAILABLE else [False]
+
+
+# ---------- DAY1 per-row rules as they were before textrules ----------
+def _contains_any(text, keywords):
+    t = ev._norm(text)
+    return any(k in t for k in keywords)
+
+
+def reference_action_keywords(reason, summary):
+    """The keyword part of classify_action (None where it fell through to TF-IDF)."""
+    recall_kw = ["remove", "return", "destroy", "stop use", "cease use", "quarantine", "withdraw", "recall", "retrieve", "dispose"]
+    fsn_kw = ["field safety notice", "field action", "advisory notice", "customer letter", "communication to", "distributor", "hospital"]
+    corr_kw = ["incorrect label", "label", "labelling", "labeling", "ifu", "dfu", "instructions", "malfunction", "software", "bug", "anomaly", "update", "correction", "product correction", "field correction", "warning", "alert", "dose", "monitor units"]
+    combo = ev._norm(f"{reason or ''} {summary or ''}")
+    if _contains_any(combo, recall_kw):
+        return "Recall"
+    if _contains_any(combo, fsn_kw):
+        return "FSN"
+    if _contains_any(combo, corr_kw):
+        return "Safety Alert"
+    return None
+
+
+def reference_determine_type(action, summary, reason):
+    text = ev._norm(f"{summary or ''} {reason or ''}")
+    if _contains_any(text, ["remove", "return", "destroy", "stop use", "quarantine", "withdraw", "recall", "retrieve", "dispose"]):
+        return "Recall"
+    if _contains_any(text, ["distributor", "hospital", "field safety notice", "advisory notice", "field action", "customer letter", "communication"]):
+        return "FSN"
+    if _contains_any(text, ["alert", "warning", "label", "labelling", "labeling", "ifu", "dfu", "instructions", "malfunction", "software", "update", "correction", "product correction", "field correction"]):
+        return "Safety Alert"
+    return action if action in {"Recall", "FSN", "Safety Alert"} else "Safety Alert"
+
+
+def reference_severity_class(reason, summary):
+    text = ev._norm(f"{reason or ''} {summary or ''}")
+    scores = {c: 0 for c in ev.CLASS_KEYWORDS}
+    for cls, kws in ev.CLASS_KEYWORDS.items():
+        for k in kws:
+            if k in text:
+                scores[cls] += 1
+    if all(v == 0 for v in scores.values()):
+        if any(w in text for w in ["recall", "remove", "stop use", "electric", "shock", "over infusion", "dose"]):
+            return "Class I"
+        if any(w in text for w in ["false", "inaccurate", "sterility", "malfunction", "label", "software"]):
+            return "Class II"
+        return "Class III"
+    ordered = sorted(scores.items(), key=lambda kv: (-kv[1], {"Class I": 0, "Class II": 1, "Class III": 2}[kv[0]]))
+    return ordered[0][0]
+
+
+def make_texts(n=5_000, seed=0):
+    """Generator/FullDataset-like texts plus keyword soup (overlaps, ties, case and whitespace noise)."""
+    rng = np.random.default_rng(seed)
+    words = sorted({w for _, kws in ev.CLASS_KEYWORDS.items() for w in kws}
+                   | {w for _, kws in ev.TYPE_RULES.rules for w in kws}
+                   | {w for kws in dp.SEVERITY_KEYWORDS.values() for w in kws}
+                   | {"the", "device", "Class II", "  ", "FIELD   Safety notice", "recalls", "design"}
+                   | {"cease use", "bug", "anomaly", "monitor units", "communication to", "incorrect label"})
+    soup = [" ".join(rng.choice(words, rng.integers(0, 6))) for _ in range(n // 2)]
+    pool = list(ev.REASON_VALUES) + list(ev.SUMMARY_VALUES) + [None, ""]
+    real = [pool[i] for i in rng.integers(0, len(pool), n - len(soup))]
+    return soup + real
+
+
+# ---------- library semantics ----------
+@pytest.mark.parametrize("use_automaton", MATCHERS)
+def test_first_most_default_and_ties(use_automaton):
+    rules = [("A", ["ab", "x"]), ("B", ["abc", "y", "y"]), ("C", ["z"])]
+    first = KeywordRules(rules, default="-", use_automaton=use_automaton)
+    most = KeywordRules(rules, default="-", scoring="most", use_automaton=use_automaton)
+    assert [first.match(t) for t in ["zzz abc", "y", "", None, "q"]] == ["A", "B", "-", "-", "-"]
+    # "abc" hits ab (A) and abc (B); B's duplicate "y" counts twice, repeated text counts once
+    assert [most.match(t) for t in ["abc", "abc y", "x y y", "ab z", "q"]] == ["A", "B", "B", "A", "-"]
+    assert list(most.classify(pd.Series(["abc y", None, "abc y"]))) == ["B", "-", "B"]
+
+
+def test_regex_rules_and_memo():
+    r = KeywordRules([("Recall", [r"\brecall(s)?\b"]), ("Alert", [r"\balert\b", r"warn"])], default="none", regex=True,
+                     memo_size=2)
+    assert list(r.classify(["recalls issued", "alert raised", "warning alert recall", "alerted", np.nan])) == \
+        ["Recall", "Alert", "Recall", "none", "none"]
+    assert len(r._memo) <= 2
+    with pytest.raises(ValueError):
+        KeywordRules([("a", ["b"])], scoring="max")
+
+
+# ---------- parity with the per-row rules ----------
+@pytest.mark.parametrize("use_automaton", MATCHERS)
+def test_day1_families_match_per_row_rules(use_automaton):
+    texts = make_texts(4_000, seed=1)
+    reasons, summaries = texts[::2], texts[1::2]
+    rebuild = lambda r: KeywordRules(r.rules, r.default, r.scoring, r.regex, r.normalize, use_automaton=use_automaton)
+    action, typ = rebuild(ev.ACTION_KEYWORD_RULES), rebuild(ev.TYPE_RULES)
+    sev, sev_fb = rebuild(ev.SEVERITY_CLASS_RULES), rebuild(ev.SEVERITY_CLASS_FALLBACK_RULES)
+    for r, s in zip(reasons, summaries):
+        assert action.match(f"{r or ''} {s or ''}") == reference_action_keywords(r, s)
+        assert (typ.match(f"{s or ''} {r or ''}") or "Safety Alert") == reference_determine_type("x", s, r)
+        assert (sev.match(f"{r or ''} {s or ''}") or sev_fb.match(f"{r or ''} {s or ''}")) == reference_severity_class(r, s)
+        assert ev.classify_severity_class(r, s) == reference_severity_class(r, s)
+        assert ev.determine_type("FSN", s, r) == reference_determine_type("FSN", s, r)
+
+
+def test_day2_families_match_per_row_rules():
+    s = pd.Series(make_texts(4_000, seed=2), dtype=object)
+    assert list(dp.extract_severity_vec(s)) == [dp.extract_severity(x) for x in s]
+    for vec, fn in [(dp.normalize_cause_vec, dp.normalize_cause), (dp.normalize_classification_vec, dp.normalize_classification)]:
+        pd.testing.assert_series_equal(vec(s), s.apply(fn), check_dtype=False)
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser()
+    p.add_argument("--texts", type=int, default=200_000)
+    args = p.parse_args()
+    texts = make_texts(args.texts)
+    reasons, summaries = texts[::2], texts[1::2]
+    print(f"pyahocorasick: {textrules.AHOCORASICK_AVAILABLE}, {len(reasons):,} (reason, summary) pairs, "
+          f"{len(set(zip(reasons, summaries))):,} distinct")
+
+    def bench(name, fn):
+        t = time.perf_counter()
+        out = fn()
+        print(f"  {name:44s} {time.perf_counter() - t:7.2f} s")
+        return out
+
+    pairs = [f"{r or ''} {s or ''}" for r, s in zip(reasons, summaries)]
+    a = bench("classify_severity_class (per-row, before)", lambda: [reference_severity_class(r, s) for r, s in zip(reasons, summaries)])
+    b = bench("SEVERITY_CLASS_RULES.classify (batch)", lambda: np.where(
+        (hit := ev.SEVERITY_CLASS_RULES.classify(pairs)) != None, hit, ev.SEVERITY_CLASS_FALLBACK_RULES.classify(pairs)))  # noqa: E711
+    assert list(a) == list(b)
+    a = bench("determine_type (per-row, before)", lambda: [reference_determine_type("FSN", s, r) for r, s in zip(reasons, summaries)])
+    pairs = [f"{s or ''} {r or ''}" for r, s in zip(reasons, summaries)]
+    b = bench("TYPE_RULES.classify (batch)", lambda: ev.TYPE_RULES.classify(pairs))
+    assert [x or "FSN" for x in b] == a
+
+    s = pd.Series(texts, dtype=object).str.lower()
+    a = bench("normalize_cause (per-row apply)", lambda: s.apply(dp.normalize_cause))
+    b = bench("normalize_cause_vec (batch)", lambda: dp.normalize_cause_vec(s))
+    pd.testing.assert_series_equal(a, b, check_dtype=False)
+    a = bench("extract_severity (per-row apply)", lambda: s.apply(dp.extract_severity))
+    b = bench("extract_severity_vec (batch)", lambda: dp.extract_severity_vec(s))
+    pd.testing.assert_series_equal(a, b, check_dtype=False)
+    print("identical labels")
@@ -0,0 +1,137 @@
+"""
+Compiled keyword rules
+----------------------
+One implementation of the "which label do these keywords point to" heuristics
+used by the event generator (DAY1 Eventpreprocess) and the recall
+preprocessing (DAY2 dataprepipynb1).
+
+A rule family is a priority-ordered list of (label, keywords). It is compiled
+once: all literal keywords go into a single Aho-Corasick automaton when
+pyahocorasick is installed, otherwise each rule becomes one alternation regex.
+Regex rules (regex=True) are compiled per rule.
+
+- scoring="first": label of the first rule with any hit (the usual if/elif chain)
+- scoring="most":  label with the most distinct keyword hits, ties going to the
+                   earlier rule (classify_severity_class)
+- no hit -> default
+
+match() classifies one text and memoizes by text; classify() batch-classifies
+an array, evaluating each distinct text once.
+
+Usage:
+  TYPE_RULES = KeywordRules([("Recall", ["recall", "remove"]), ("FSN", ["distributor"])], default="Safety Alert")
+  TYPE_RULES.match("Device recall")            # "Recall"
+  TYPE_RULES.classify(df["reason"])            # object array, one label per row
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+try:
+    import ahocorasick  # pyahocorasick
+    AHOCORASICK_AVAILABLE = True
+except Exception:
+    AHOCORASICK_AVAILABLE = False
+
+
+class KeywordRules:
+    def __init__(self, rules, default=None, scoring: str = "first", regex: bool = False,
+                 normalize=None, memo_size: int = 200_000, use_automaton: bool = None):
+        if scoring not in ("first", "most"):
+            raise ValueError(f"scoring must be 'first' or 'most', got {scoring!r}")
+        self.rules = [(label, list(kws)) for label, kws in rules]
+        self.labels = [label for label, _ in self.rules]
+        self.default = default
+        self.scoring = scoring
+        self.regex = regex
+        self.normalize = normalize  # text -> str, applied before matching (e.g. lower-casing)
+        self.memo_size = memo_size
+        self._memo = {}
+
+        if use_automaton is None:
+            use_automaton = AHOCORASICK_AVAILABLE
+        self._automaton = None
+        if use_automaton and not regex:
+            # keyword -> rule indices (repeated when a rule lists the keyword twice, as the loops counted it)
+            owners = {}
+            for i, (_, kws) in enumerate(self.rules):
+                for k in kws:
+                    owners.setdefault(k, []).append(i)
+            self._automaton = False  # no keywords at all
+            if owners:
+                A = ahocorasick.Automaton()
+                for kid, (k, idx) in enumerate(owners.items()):
+                    A.add_word(k, (kid, tuple(idx)))
+                A.make_automaton()
+                self._automaton = A
+        elif scoring == "first":
+            as_pattern = (lambda k: f"(?:{k})") if regex else re.escape
+            self._patterns = [re.compile("|".join(as_pattern(k) for k in kws)) if kws else None
+                              for _, kws in self.rules]
+        elif regex:
+            self._keyword_patterns = [[re.compile(k) for k in kws] for _, kws in self.rules]
+
+    # ---------- matching ----------
+    def _rule_index(self, t: str):
+        """Index of the winning rule for a normalized text, or None."""
+        if self._automaton is not None:
+            if self._automaton is False:
+                return None
+            if self.scoring == "first":
+                best = None
+                for _, (_, idx) in self._automaton.iter(t):
+                    i = idx[0]
+                    if best is None or i < best:
+                        best = i
+                        if best == 0:
+                            break
+                return best
+            # distinct keywords only: a keyword found twice still counts once
+            found = dict(value for _, value in self._automaton.iter(t))
+            scores = [0] * len(self.rules)
+            for idx in found.values():
+                for i in idx:
+                    scores[i] += 1
+            return self._best_score(scores)
+
+        if self.scoring == "first":
+            for i, p in enumerate(self._patterns):
+                if p is not None and p.search(t):
+                    return i
+            return None
+        if self.regex:
+            scores = [sum(1 for p in pats if p.search(t)) for pats in self._keyword_patterns]
+        else:
+            scores = [sum(1 for k in kws if k in t) for _, kws in self.rules]
+        return self._best_score(scores)
+
+    @staticmethod
+    def _best_score(scores):
+        top = max(scores, default=0)
+        return scores.index(top) if top > 0 else None  # index() = earliest rule on ties
+
+    def match(self, text):
+        """Label for one text (memoized by text)."""
+        hit = self._memo.get(text) if isinstance(text, str) else None
+        if hit is not None:
+            return hit[0]
+        if self.normalize is not None:
+            t = self.normalize(text)
+        else:
+            t = text if isinstance(text, str) else ""
+        i = self._rule_index(t)
+        label = self.default if i is None else self.labels[i]
+        if isinstance(text, str):
+            if len(self._memo) >= self.memo_size:
+                self._memo.clear()
+            self._memo[text] = (label,)
+        return label
+
+    def classify(self, texts) -> np.ndarray:
+        """Labels for an array of texts (object ndarray), matching each distinct text once."""
+        codes, uniq = pd.factorize(pd.Series(texts, dtype=object).to_numpy(), use_na_sentinel=False)
+        labels = np.empty(len(uniq), dtype=object)
+        labels[:] = [self.match(t) for t in uniq]
+        return labels[codes]